@@ -0,0 +1,80 @@
+"""
+"Has anything changed?" latency on a large tree: the old os.walk + getmtime loop
+versus tools/change_detector.py in deep, quick and watch modes.
+
+Usage (from example/):
+  python benchmarks/bench_change_detection.py --files 200000 --dirs 2000
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from tools.change_detector import ChangeDetector
+
+def old_latest_mod_time(directory):
+    latest_time = 0.0
+    for root, _, files in os.walk(directory):
+        for file in files:
+            latest_time = max(latest_time, os.path.getmtime(os.path.join(root, file)))
+    return latest_time
+
+def make_tree(root: str, n_files: int, n_dirs: int):
+    for i in range(n_files):
+        d = os.path.join(root, f"d{i % n_dirs:05d}")
+        if i < n_dirs:
+            os.makedirs(d, exist_ok=True)
+        with open(os.path.join(d, f"f{i:07d}.txt"), "w") as f:
+            f.write("x")
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=200000)
+    ap.add_argument("--dirs", type=int, default=2000)
+    ap.add_argument("--dir", default=None, help="Reuse/keep the tree in this directory")
+    args = ap.parse_args()
+
+    root = args.dir or tempfile.mkdtemp()
+    os.makedirs(root, exist_ok=True)
+    try:
+        if not any(n for n in os.listdir(root) if not n.startswith(".")):
+            t = time.perf_counter()
+            make_tree(root, args.files, args.dirs)
+            print(f"generated {args.files:,} files in {args.dirs:,} dirs in {time.perf_counter() - t:.1f}s")
+        shutil.rmtree(os.path.join(root, ".cache"), ignore_errors=True)
+
+        print(f"os.walk + getmtime (old)   {timed(lambda: old_latest_mod_time(root)):9.1f} ms")
+        for mode in ("deep", "quick", "watch"):
+            det = ChangeDetector(root, mode=mode, state_path=os.path.join(root, ".cache", f"{mode}.pkl"))
+            t = time.perf_counter()
+            det.poll()
+            det.commit()
+            first = (time.perf_counter() - t) * 1000
+            print(f"{mode:<6} first poll + save     {first:9.1f} ms")
+            print(f"{mode:<6} has_changes()          {timed(det.has_changes):9.3f} ms")
+            path = os.path.join(root, "d00007", "f0000007.txt")
+            with open(path, "a") as f:
+                f.write("y")
+            time.sleep(0.2)  # let the watcher thread see the write
+            t = time.perf_counter()
+            changes = det.poll()
+            print(f"{mode:<6} poll after 1 write     {(time.perf_counter() - t) * 1000:9.3f} ms  -> "
+                  f"{len(changes.modified)} modified")
+            det.commit()
+    finally:
+        if not args.dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Indexing throughput of tools/indexing_pipeline.py, fully offline.
+
+Generates a synthetic text corpus (--files files averaging --file-kb KB, with a
+few large ones), then indexes it with a tiny hashing embedder standing in for
+SentenceTransformer and an in-memory collection standing in for Chroma (or a
+real chromadb collection with --chroma, if installed). Reports MB/s, chunks/s
+and peak RSS; --compare-old also times the previous read-everything,
+embed-everything approach.
+
+Usage (from example/):
+  python benchmarks/bench_indexing.py --files 2000 --file-kb 64 --compare-old
+"""
+import os
+import sys
+import time
+import random
+import resource
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from tools import indexing_pipeline
+
+WORDS = ("edge data agent vector index chunk embed batch sensor invoice ledger payment "
+         "deadlock worker registry cache query retrieval document local model").split()
+
+class HashingEmbedder:
+    """Bag-of-words hashed into `dim` buckets and L2-normalised; no model download."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size: int = 32):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for w in text.split():
+                out[i, hash(w) % self.dim] += 1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-9)
+
+class MemoryCollection:
+    """Keeps ids and a running count only, like a remote store would from our side."""
+
+    def __init__(self):
+        self.ids, self.count = set(), 0
+
+    def add(self, ids, documents, embeddings, metadatas=None):
+        assert len(ids) == len(documents) == len(embeddings)
+        self.ids.update(ids)
+        self.count += len(ids)
+
+def write_corpus(root: str, n_files: int, file_kb: int, seed: int = 0):
+    rnd = random.Random(seed)
+    for i in range(n_files):
+        d = os.path.join(root, f"dir{i % 20:02d}")
+        os.makedirs(d, exist_ok=True)
+        size = file_kb * 1024 * (50 if i % 500 == 0 else 1)  # a few large files
+        words, n = [], 0
+        while n < size:
+            w = rnd.choice(WORDS)
+            words.append(w)
+            n += len(w) + 1
+        with open(os.path.join(d, f"doc{i:05d}.txt"), "w", encoding="utf-8") as f:
+            f.write(" ".join(words))
+
+def index_old(data_dir: str, model):
+    """The previous ChromaRAGTool approach: read every file whole, one encode() over all."""
+    documents = []
+    for root, _, files in os.walk(data_dir):
+        for file in files:
+            with open(os.path.join(root, file), "r", encoding="utf-8") as f:
+                documents.append(f.read())
+    return model.encode(documents)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=2000)
+    ap.add_argument("--file-kb", type=int, default=64)
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--dir", default=None, help="Reuse/keep the corpus in this directory")
+    ap.add_argument("--chroma", action="store_true", help="Add to a real in-memory chromadb collection")
+    ap.add_argument("--compare-old", action="store_true", help="Also time the read-all/encode-all approach")
+    args = ap.parse_args()
+
+    root = args.dir or tempfile.mkdtemp()
+    if not os.listdir(root):
+        t = time.perf_counter()
+        write_corpus(root, args.files, args.file_kb)
+        print(f"generated corpus in {root} in {time.perf_counter() - t:.1f}s")
+
+    model = HashingEmbedder()
+    if args.chroma:
+        import chromadb
+        collection = chromadb.Client().create_collection("bench")
+    else:
+        collection = MemoryCollection()
+
+    pipeline = indexing_pipeline.IndexingPipeline(
+        embed_fn=lambda texts: model.encode(texts, batch_size=len(texts)),
+        add_fn=collection.add, batch_size=args.batch_size, read_workers=args.workers,
+        progress=indexing_pipeline.print_progress, progress_every=500)
+    stats = pipeline.run(root)
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    mb = stats["bytes"] / 2**20
+    print(f"pipeline: {stats['files']} files, {mb:,.0f} MB, {stats['chunks']:,} chunks in {stats['seconds']:.1f}s "
+          f"({mb / stats['seconds']:,.1f} MB/s, {stats['chunks'] / stats['seconds']:,.0f} chunks/s), peak RSS {peak_mb:,.0f} MB")
+
+    if args.compare_old:
+        t = time.perf_counter()
+        index_old(root, model)
+        dt = time.perf_counter() - t
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"old approach: {dt:.1f}s, one embedding per file, peak RSS {peak_mb:,.0f} MB")
+
+if __name__ == "__main__":
+    main()
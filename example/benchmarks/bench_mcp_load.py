@@ -0,0 +1,85 @@
+"""
+Load test for mcp_server.py over stdio: starts the server as a subprocess, opens
+one MCP client session and fires --requests tool calls with --concurrency in
+flight at a time, then reports throughput and p50/p95/p99 latency.
+
+Requires the `mcp` package (as does the server itself).
+
+The default target is `index_status`, which answers without a model, so the
+numbers are the server's own round-trip and dispatch cost. `run_rag_mcp` runs
+the full EDA pipeline on the pool and needs credentials for EDA_MODEL_ID.
+If the warm-up call fails, the benchmark stops instead of timing error replies.
+
+Usage (from example/):
+  python benchmarks/bench_mcp_load.py --requests 200 --concurrency 20
+  python benchmarks/bench_mcp_load.py --requests 20 --concurrency 4 \
+      --tool run_rag_mcp --args '{"query": "total revenue by region"}'
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import numpy as np
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def _text(result) -> str:
+    return " ".join(c.text for c in getattr(result, "content", []) if hasattr(c, "text"))
+
+async def one_call(session: ClientSession, tool: str, args: dict, sem: asyncio.Semaphore, timeout: float):
+    async with sem:
+        t = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(session.call_tool(tool, args), timeout)
+            ok = not getattr(result, "isError", False)
+            error = "" if ok else _text(result)
+        except Exception as e:
+            ok, error = False, repr(e)
+        return time.perf_counter() - t, ok, error
+
+async def main_async(args):
+    server = StdioServerParameters(command=sys.executable, args=[args.server],
+                                   cwd=os.path.dirname(os.path.abspath(args.server)), env=dict(os.environ))
+    async with stdio_client(server) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            tools = [t.name for t in (await session.list_tools()).tools]
+            if args.tool not in tools:
+                raise SystemExit(f"server has no tool {args.tool!r}; available: {', '.join(tools)}")
+            call_args = json.loads(args.args)
+            _, ok, error = await one_call(session, args.tool, call_args, asyncio.Semaphore(1), args.timeout)  # warm-up
+            if not ok:
+                raise SystemExit(f"warm-up call of {args.tool} failed: {error[:500]}")
+            sem = asyncio.Semaphore(args.concurrency)
+            t0 = time.perf_counter()
+            results = await asyncio.gather(*[one_call(session, args.tool, call_args, sem, args.timeout)
+                                             for _ in range(args.requests)])
+            wall = time.perf_counter() - t0
+            if "server_stats" in tools:
+                stats = await session.call_tool("server_stats", {})
+                print("server:", _text(stats).replace("\n", " "))
+
+    lat = np.array([r[0] for r in results]) * 1000
+    errors = sum(1 for r in results if not r[1])
+    print(f"{args.requests} calls of {args.tool} at concurrency {args.concurrency}: "
+          f"{wall:.2f}s wall, {args.requests / wall:.1f} req/s, {errors} errors")
+    print(f"latency ms  p50 {np.percentile(lat, 50):.1f}  p95 {np.percentile(lat, 95):.1f}  "
+          f"p99 {np.percentile(lat, 99):.1f}  max {lat.max():.1f}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--server", default=os.path.join(HERE, "..", "mcp_server.py"))
+    ap.add_argument("--tool", default="index_status")
+    ap.add_argument("--args", default="{}", help='JSON tool arguments, e.g. \'{"query": "What data is available?"}\'')
+    ap.add_argument("--requests", type=int, default=100)
+    ap.add_argument("--concurrency", type=int, default=10)
+    ap.add_argument("--timeout", type=float, default=300)
+    asyncio.run(main_async(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+ReceiptQueryAgent (pack11_sql/receipt_agent.py) on a scaled receipts database:
+per-query latency of the direct path (fresh connection, query over `receipts`)
+versus an interactive ReceiptSession (one connection, TEMP summary tables).
+It also checks that both paths return the same rows and that a write from
+another connection triggers a summary rebuild.
+
+Usage (from example/):
+  python benchmarks/bench_receipt_agent.py --receipts 1000000
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PACK = os.path.join(HERE, "..", "..", "sandbox", "local_retrieval", "local_agent_eval_suite", "pack11_sql")
+sys.path.insert(0, PACK)
+import receipt_agent
+
+QUERIES = [
+    "What is the total amount spent (including tips)?",
+    "What's the average tip given by each customer?",
+    "List all customers who tipped more than $1.",
+    "Which receipt has the highest price?",
+    "What’s the smallest tip recorded?",
+    "Show me all purchases by 'Customer 0042'.",
+    "Which customers spent more than $20 in total?",
+    "How many receipts are there in the database?",
+]
+
+def make_db(path: str, n: int, customers: int):
+    shutil.copyfile(os.path.join(PACK, "receipts.db"), path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    rng = random.Random(0)
+    rows = ((i, f"Customer {rng.randrange(customers):04d}", round(rng.uniform(1, 80), 2),
+             round(rng.uniform(0, 0.25) * 20, 2)) for i in range(100, 100 + n))
+    conn.executemany("INSERT INTO receipts VALUES (?,?,?,?)", rows)
+    conn.commit()
+    conn.close()
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t)
+    times.sort()
+    return times[len(times) // 2] * 1000, result
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--receipts", type=int, default=1000000)
+    ap.add_argument("--customers", type=int, default=5000)
+    args = ap.parse_args()
+
+    root = tempfile.mkdtemp()
+    db = os.path.join(root, "receipts.db")
+    try:
+        t = time.perf_counter()
+        make_db(db, args.receipts, args.customers)
+        print(f"generated {args.receipts:,} receipts in {time.perf_counter() - t:.1f}s")
+
+        session = receipt_agent.ReceiptSession(db)
+        t = time.perf_counter()
+        session.refresh_summary()
+        print(f"summary build: {(time.perf_counter() - t) * 1000:.0f} ms (once per session / per change)")
+
+        print(f"{'query':<52} {'direct ms':>10} {'session ms':>11}  same")
+        for q in QUERIES:
+            intent, params = receipt_agent.parse_query(q)
+            direct_ms, direct = timed(lambda: receipt_agent.execute_query(db, intent, params), 3)
+            session_ms, pooled = timed(lambda: session.execute(intent, params), 200)
+            same = [tuple(r) for r in direct[0]] == [tuple(r) for r in pooled[0]]
+            print(f"{q[:52]:<52} {direct_ms:10.1f} {session_ms:11.3f}  {same}")
+
+        writer = sqlite3.connect(db)
+        writer.execute("INSERT INTO receipts VALUES (?,?,?,?)", (1, "Late Customer", 10.0, 99.0))
+        writer.commit()
+        writer.close()
+        rows, _ = session.execute(*receipt_agent.parse_query("What’s the smallest tip recorded?"))
+        rows, _ = session.execute(*receipt_agent.parse_query("List all customers who tipped more than $90"))
+        print("after a write from another connection:", [r[0] for r in rows])
+        session.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
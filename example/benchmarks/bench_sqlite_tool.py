@@ -0,0 +1,116 @@
+"""
+SQLiteTool query path: the old connect-per-query + fetchall() + format-everything
+versus tools/sqlite_pool.py (pooled read-only connections, statement cache,
+fetchmany with a row/byte cap).
+
+The pack3 sales database is copied and scaled up (orders and order_lines
+duplicated with new ids) to --orders orders.
+
+Usage (from example/):
+  python benchmarks/bench_sqlite_tool.py --orders 1000000
+"""
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+from tools.sqlite_pool import SQLitePool, stream_rows
+
+SALES_DB = os.path.join(HERE, "..", "..", "sandbox", "local_retrieval", "local_agent_eval_suite",
+                        "pack3", "sql", "sales.db")
+
+def scale_up(src: str, dst: str, n_orders: int):
+    shutil.copyfile(src, dst)
+    conn = sqlite3.connect(dst)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    seed_orders = conn.execute("SELECT id, customer_id, date, total_usd FROM orders").fetchall()
+    seed_lines = conn.execute("SELECT order_id, sku, qty, unit_price FROM order_lines").fetchall()
+    lines_by_order = {}
+    for line in seed_lines:
+        lines_by_order.setdefault(line[0], []).append(line)
+    batch_o, batch_l = [], []
+    for i in range(n_orders - len(seed_orders)):
+        oid, cust, date, total = seed_orders[i % len(seed_orders)]
+        new_id = f"{oid}-{i:08d}"
+        batch_o.append((new_id, cust, date, round(total * (1 + (i % 97) / 100), 2)))
+        batch_l.extend((new_id, f"{sku}-{i % 500}", qty + i % 5, price)
+                       for _, sku, qty, price in lines_by_order.get(oid, []))
+        if len(batch_o) >= 50000:
+            conn.executemany("INSERT INTO orders VALUES (?,?,?,?)", batch_o)
+            conn.executemany("INSERT INTO order_lines VALUES (?,?,?,?)", batch_l)
+            batch_o, batch_l = [], []
+    conn.executemany("INSERT INTO orders VALUES (?,?,?,?)", batch_o)
+    conn.executemany("INSERT INTO order_lines VALUES (?,?,?,?)", batch_l)
+    conn.commit()
+    conn.close()
+
+def old_forward(db_path: str, sql: str) -> str:
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+        lines = [" | ".join(columns)]
+        for row in rows:
+            lines.append(" | ".join(str(value) for value in row))
+        return "\n".join(lines)
+
+def make_new_forward(pool: SQLitePool):
+    def new_forward(db_path: str, sql: str) -> str:
+        with pool.connection(db_path) as conn:
+            return stream_rows(conn.execute(sql))["text"]
+    return new_forward
+
+def measure(fn, db_path: str, sql: str, repeat: int):
+    tracemalloc.start()
+    times, out = [], ""
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn(db_path, sql)
+        times.append(time.perf_counter() - t)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    times.sort()
+    return times[len(times) // 2] * 1000, peak / 1e6, len(out)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--orders", type=int, default=1000000)
+    ap.add_argument("--db", default=None, help="Reuse/keep the scaled database at this path")
+    args = ap.parse_args()
+
+    db = args.db or os.path.join(tempfile.mkdtemp(), "sales_scaled.db")
+    if not os.path.exists(db):
+        os.makedirs(os.path.dirname(os.path.abspath(db)), exist_ok=True)
+        t = time.perf_counter()
+        scale_up(SALES_DB, db, args.orders)
+        print(f"scaled sales.db to {args.orders:,} orders in {time.perf_counter() - t:.1f}s "
+              f"({os.path.getsize(db) / 1e6:.0f} MB)")
+    n_lines = sqlite3.connect(db).execute("SELECT count(*) FROM order_lines").fetchone()[0]
+    print(f"order_lines: {n_lines:,} rows")
+
+    queries = [
+        ("point lookup", "SELECT * FROM orders WHERE id = 'O-2007-00012346'", 50),
+        ("aggregate", "SELECT customer_id, count(*), sum(total_usd) FROM orders GROUP BY customer_id", 3),
+        ("full scan", "SELECT * FROM order_lines", 3),
+    ]
+    new_forward = make_new_forward(SQLitePool())
+    print(f"{'query':<13} {'path':<5} {'p50 ms':>10} {'py peak MB':>11} {'chars out':>11}")
+    try:
+        for label, sql, repeat in queries:
+            for name, fn in (("old", old_forward), ("new", new_forward)):
+                ms, mb, chars = measure(fn, db, sql, repeat)
+                print(f"{label:<13} {name:<5} {ms:10.2f} {mb:11.1f} {chars:11,}")
+    finally:
+        if not args.db:
+            shutil.rmtree(os.path.dirname(db), ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
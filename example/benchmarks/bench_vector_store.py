@@ -0,0 +1,137 @@
+"""
+Recall@k and query latency of tools/compact_store.py (int8 / float16) against
+float32 storage, fully offline.
+
+Vectors are synthetic but clustered like real sentence embeddings (dim 384 as
+for all-MiniLM-L6-v2); queries are perturbed stored vectors. The float32
+baseline is the exact cosine top-k over a float32 matrix, the same result
+llama-index's default SimpleVectorStore computes. Its recall is 1 by definition.
+When llama-index is installed, --llama also times SimpleVectorStore itself
+(for sizes up to --llama-max; it keeps the vectors as Python lists in RAM and
+persists them as JSON).
+
+Usage (from example/):
+  python benchmarks/bench_vector_store.py --sizes 10000,100000,1000000
+"""
+import os
+import sys
+import time
+import shutil
+import resource
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from tools.compact_store import CompactVectorStore, DTYPES, normalize
+
+GEN_BLOCK = 50000
+
+def gen_vectors(n: int, dim: int, clusters: int = 256, seed: int = 0):
+    """Yield (start, float32 block) of clustered vectors, deterministic in n and seed."""
+    rng = np.random.default_rng(seed)
+    centers = normalize(rng.standard_normal((clusters, dim)))
+    for s in range(0, n, GEN_BLOCK):
+        m = min(GEN_BLOCK, n - s)
+        block = centers[rng.integers(0, clusters, m)] + 0.35 * rng.standard_normal((m, dim)).astype(np.float32)
+        yield s, normalize(block)
+
+def exact_topk(base: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    out_s = np.full((len(queries), 0), -np.inf, np.float32)
+    out_r = np.zeros((len(queries), 0), np.int64)
+    for s in range(0, len(base), GEN_BLOCK):
+        scores = queries @ base[s:s + GEN_BLOCK].T
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        out_s = np.concatenate([out_s, np.take_along_axis(scores, part, 1)], 1)
+        out_r = np.concatenate([out_r, part + s], 1)
+        keep = np.argsort(-out_s, axis=1)[:, :k]
+        out_s, out_r = np.take_along_axis(out_s, keep, 1), np.take_along_axis(out_r, keep, 1)
+    return out_r
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+def time_queries(fn, queries) -> tuple:
+    """(p50 ms, p95 ms) over one-query-at-a-time calls."""
+    times = []
+    for q in queries:
+        t = time.perf_counter()
+        fn(q)
+        times.append((time.perf_counter() - t) * 1000)
+    return float(np.percentile(times, 50)), float(np.percentile(times, 95))
+
+def bench_llama(base: np.ndarray, queries: np.ndarray, k: int, truth: np.ndarray):
+    from llama_index.core.vector_stores import SimpleVectorStore, VectorStoreQuery
+    from llama_index.core.schema import TextNode
+    store = SimpleVectorStore()
+    store.add([TextNode(id_=str(i), text="", embedding=v.tolist()) for i, v in enumerate(base)])
+    found = []
+    def query(q):
+        res = store.query(VectorStoreQuery(query_embedding=q.tolist(), similarity_top_k=k))
+        found.append([int(i) for i in res.ids])
+    p50, p95 = time_queries(query, queries)
+    print(f"  llama SimpleVectorStore  recall@{k} {recall(np.array(found), truth):.3f}  p50 {p50:8.2f} ms  p95 {p95:8.2f} ms")
+
+def run(n: int, dim: int, k: int, n_queries: int, root: str, args):
+    print(f"\n== {n:,} chunks x {dim} dims ==")
+    base = np.lib.format.open_memmap(os.path.join(root, "f32.npy"), "w+", np.float32, (n, dim))
+    stores = {}
+    for dtype in DTYPES:
+        shutil.rmtree(os.path.join(root, dtype), ignore_errors=True)
+        stores[dtype] = CompactVectorStore(os.path.join(root, dtype), dim=dim, dtype=dtype)
+    t = time.perf_counter()
+    for s, block in gen_vectors(n, dim):
+        base[s:s + len(block)] = block
+        ids = [str(i) for i in range(s, s + len(block))]
+        for store in stores.values():
+            store.add(ids=ids, documents=[""] * len(ids), embeddings=block)
+    base.flush()
+    print(f"  built in {time.perf_counter() - t:.1f}s")
+
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, n, n_queries)
+    queries = normalize(base[np.sort(picks)] + 0.1 * rng.standard_normal((n_queries, dim)).astype(np.float32))
+    truth = exact_topk(base, queries, k)
+
+    p50, p95 = time_queries(lambda q: exact_topk(base, q[None], k), queries)
+    print(f"  float32 (exact)          recall@{k} 1.000  p50 {p50:8.2f} ms  p95 {p95:8.2f} ms  "
+          f"vectors {n * dim * 4 / 2**20:8.1f} MB")
+    for dtype, store in stores.items():
+        _, rows = store.search_rows(queries, k)
+        p50, p95 = time_queries(lambda q: store.search_rows(q, k), queries)
+        t = time.perf_counter()
+        store.search_rows(queries, k)
+        batch_ms = (time.perf_counter() - t) * 1000 / n_queries
+        print(f"  {dtype:<8} (compact)       recall@{k} {recall(rows, truth):.3f}  p50 {p50:8.2f} ms  p95 {p95:8.2f} ms  "
+              f"vectors {store.nbytes() / 2**20:8.1f} MB  batched {batch_ms:.2f} ms/query")
+    if args.llama and n <= args.llama_max:
+        try:
+            bench_llama(base, queries, k, truth)
+        except ImportError:
+            print("  llama-index not installed; skipped SimpleVectorStore")
+    del base
+    print(f"  peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MB")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--dir", default=None, help="Working directory (default: a temp dir, removed afterwards)")
+    ap.add_argument("--llama", action="store_true", help="Also time llama-index SimpleVectorStore")
+    ap.add_argument("--llama-max", type=int, default=100000)
+    args = ap.parse_args()
+
+    root = args.dir or tempfile.mkdtemp()
+    os.makedirs(root, exist_ok=True)
+    try:
+        for n in [int(x) for x in args.sizes.split(",")]:
+            run(n, args.dim, args.k, args.queries, root, args)
+    finally:
+        if not args.dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,13 @@ pip install llama-index
 pip install llama-index-embeddings-huggingface
 """
 import os
+import sys
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from smolagents import ToolCallingAgent, LiteLLMModel, CodeAgent
+from smolagents.memory import ActionStep, FinalAnswerStep, TaskStep
 import yaml
 
 from smolagents import Tool
@@ -34,26 +40,33 @@ class RAGTool(Tool):
         from llama_index.core import Settings       
         from llama_index.core.llms import MockLLM
         from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+        from tools import index_cache
         Settings.llm = MockLLM()  # Not used in this tool
-        Settings.embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        # Shared with tools/tool_rag.py: one model instance per process
+        Settings.embed_model = index_cache.get_embedding_model(
+            "huggingface", "sentence-transformers/all-MiniLM-L6-v2", lambda name: HuggingFaceEmbedding(model_name=name))
 
     def forward(self, data_dir: str, question: str, similarity_top_k: str) -> str:
         # Determine the cache directory for the vector index
         persist_dir = os.path.join(data_dir, ".cache", "storage")
 
         if not os.path.exists(persist_dir):
-            print(f"[INFO] Rebuilding index for '{data_dir}'.")
+            print(f"[INFO] Rebuilding index for '{data_dir}'.", file=sys.stderr)
             os.makedirs(persist_dir, exist_ok=True)            
             # Load documents and build the vector index
             from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
             documents = SimpleDirectoryReader(data_dir).load_data()
             index = VectorStoreIndex.from_documents(documents)
             index.storage_context.persist(persist_dir=persist_dir)
+            from tools import index_cache
+            index_cache.put_index(persist_dir, index_cache.dir_version(persist_dir), index)
         else:
-            print(f"[INFO] Loading cached index from '{persist_dir}'.")
             from llama_index.core import StorageContext, load_index_from_storage
-            storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
-            index = load_index_from_storage(storage_context)
+            from tools import index_cache
+            # Loaded once per process; reloaded if the persisted files change
+            index = index_cache.get_index(
+                persist_dir, index_cache.dir_version(persist_dir),
+                lambda: load_index_from_storage(StorageContext.from_defaults(persist_dir=persist_dir)))
 
         # Execute the query with the specified top_k
         k = int(similarity_top_k)
@@ -139,39 +152,293 @@ class FilePreviewer(Tool):
             return f.read(1000)  # limit to first 1k characters
 
 
-# 
-def eda_by_smol(task):
+# ------------------------------------------------------------------------------
+# Agent pipeline: directory analysis -> data viewing -> code generation
+# ------------------------------------------------------------------------------
+MODEL_ID = os.environ.get("EDA_MODEL_ID", "xai/grok-3-latest")  # gemini/gemini-1.5-pro
+MAX_STAGE_CONTEXT = int(os.environ.get("EDA_MAX_STAGE_CONTEXT", "6000"))  # chars passed between stages
+MAX_PREVIEWS = 8
 
-    with open("prompts/custom_agent.yaml", 'r') as stream:
-        prompt_templates = yaml.safe_load(stream)
+def cap_context(text: str, max_chars: int = MAX_STAGE_CONTEXT) -> str:
+    """Keeps the head and tail of a long stage output (the tail usually holds the conclusion)."""
+    text = str(text or "")
+    if len(text) <= max_chars:
+        return text
+    head = max_chars * 2 // 3
+    tail = max_chars - head
+    return f"{text[:head]}\n...[{len(text) - max_chars} characters omitted]...\n{text[-tail:]}"
 
-    with open("prompts/data_analysis_agent.yaml", 'r') as stream:
-        data_viewer_prompt_templates = yaml.safe_load(stream)
+def data_roots(dirs: Optional[list] = None) -> list:
+    """Directories previews may read: `dirs`, else EDA_DATA_DIRS (os.pathsep-separated), else the registered data directories."""
+    if dirs is None:
+        env = os.environ.get("EDA_DATA_DIRS")
+        if env:
+            dirs = env.split(os.pathsep)
+        else:
+            from tools import registry_store
+            dirs = [e["data_directory"] for e in registry_store.default_registry().entries()]
+    return [os.path.realpath(d) for d in dirs if d]
 
-    coder = CodeAgent(
-        name="coding_agent",
-        description="implement the idea into an agent code",
-        tools=[CodeFileWriter()],
-        model=LiteLLMModel(model_id="xai/grok-3-latest")
-        )
+def _under(path: str, roots: list) -> bool:
+    return any(path == r or path.startswith(r.rstrip(os.sep) + os.sep) for r in roots)
+
+def paths_in(text: str, roots: list) -> list:
+    """Existing files or directories under `roots` mentioned in free text, in order of appearance.
+    Relative words are resolved against each root, never against the working directory."""
+    found = []
+    for token in re.findall(r"[\w./~-]+", str(text)):
+        word = os.path.expanduser(token.strip(".,;:'\""))
+        if not word:
+            continue
+        candidates = [word] if os.path.isabs(word) else [os.path.join(r, word) for r in roots]
+        for path in map(os.path.realpath, candidates):
+            if _under(path, roots) and os.path.exists(path):
+                if path not in found:
+                    found.append(path)
+                break
+    return found
+
+def candidate_files(paths: list, limit: int = MAX_PREVIEWS) -> list:
+    """Data files worth previewing: the files named, then the top-level files of the directories named."""
+    files = [p for p in paths if os.path.isfile(p)]
+    for d in (p for p in paths if os.path.isdir(p)):
+        with os.scandir(d) as it:
+            files.extend(sorted(e.path for e in it if e.is_file() and not e.name.startswith(".")))
+    return list(dict.fromkeys(files))[:max(limit, 0)]
+
+class _Stopped(Exception):
+    """Another stage of the same request failed; the remaining stages stop between steps."""
+
+class StageFeed:
+    """
+    What one stage hands the next: previews and observations while it runs
+    (speculative input), then its complete final answer.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.items = []
+        self.answer = None
+        self.closed = False
+
+    def put(self, text: str):
+        with self.cond:
+            if not self.closed and text:
+                self.items.append(str(text))
+                self.cond.notify_all()
+
+    def finish(self, answer: str):
+        with self.cond:
+            if not self.closed:
+                self.answer, self.closed = str(answer), True
+                self.cond.notify_all()
+
+    def close(self):
+        """Closed without an answer: the stage failed or was stopped."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def drain(self) -> str:
+        """Previews and observations put since the last drain (non-blocking)."""
+        with self.cond:
+            items, self.items = self.items, []
+        return "\n\n".join(items)
+
+    def first(self) -> tuple:
+        """
+        Blocks until the upstream stage has produced something, or finished.
+        Returns (text so far, complete); complete means text ends with the final answer.
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.items or self.closed)
+            answer = self.answer
+        text = self.drain()
+        if answer is None:
+            return text, False
+        return (text + "\n\n" if text else "") + f"Final answer: {answer}", True
+
+    def result(self) -> Optional[str]:
+        """Blocks until the upstream stage is done; its final answer, or None if it failed."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.closed)
+            return self.answer
+
+class EDAPipeline:
+    """
+    The three stages of eda_by_smol: directory analysis -> data viewer -> coding.
+
+    Prompt files and the model are loaded once, in __init__; agents keep
+    per-run memory, so every request gets its own agent set and concurrent
+    requests do not wait for each other.
 
-    viewer = ToolCallingAgent(
-        prompt_templates=data_viewer_prompt_templates,
-        name="data_viewer_agent",
-        description="an agent can retrieve or view the file direclty, and return the data schema",
-        tools=[RAGTool(), FilePreviewer()],
-        model=LiteLLMModel(model_id="xai/grok-3-latest")
+    Stages are pipelined. A stage starts as soon as the previous one produces
+    its first preview or observation, and later ones are handed to the running
+    agent between its steps. That input is speculative: a stage that started
+    before the previous one finished gets one more run, continuing its memory,
+    with the previous stage's complete final answer, so no stage returns
+    without having seen it. File previews start right away for the data paths
+    named in the task, and for those seen in the analysis. Only paths under
+    the data directories (data_roots()) are previewed. Everything passed
+    between stages is capped (MAX_STAGE_CONTEXT).
+    """
+
+    def __init__(self, model_id: str = MODEL_ID, prompts_dir: str = "prompts",
+                 max_context: int = MAX_STAGE_CONTEXT, preview_workers: int = 4,
+                 data_dirs: Optional[list] = None):
+        with open(os.path.join(prompts_dir, "custom_agent.yaml"), "r") as stream:
+            self.prompt_templates = yaml.safe_load(stream)
+        with open(os.path.join(prompts_dir, "data_analysis_agent.yaml"), "r") as stream:
+            self.data_viewer_prompt_templates = yaml.safe_load(stream)
+        self.max_context = max_context
+        self.data_dirs = data_dirs
+        self.model = LiteLLMModel(model_id=model_id)  # stateless per call; shared by every agent
+        self.previewer = FilePreviewer()
+        self.tools = {"rag": RAGTool(), "dirs": DirectoryAnalyzer(), "writer": CodeFileWriter()}  # stateless
+        self.previews = ThreadPoolExecutor(max_workers=preview_workers, thread_name_prefix="preview")
+
+    def _updates(self, owner: list, inbox: Optional[StageFeed], source: str, stop: threading.Event):
+        """
+        Step callback for the agent in owner[0]: stops once `stop` is set, else hands
+        it the previews and observations `source` produced since its last step.
+        """
+        def callback(step, agent=None):  # not every smolagents version passes agent=
+            if stop.is_set():
+                raise _Stopped()
+            text = inbox.drain() if inbox else ""
+            if text:
+                update = cap_context(text, self.max_context)
+                owner[0].memory.steps.append(TaskStep(task=f"Update from the {source} stage:\n{update}"))
+        return callback
+
+    def _agent(self, cls, stop: threading.Event, inbox: Optional[StageFeed] = None, source: str = "", **kwargs):
+        owner = []
+        agent = cls(model=self.model, step_callbacks=[self._updates(owner, inbox, source, stop)], **kwargs)
+        owner.append(agent)
+        return agent
+
+    def _agents(self, found: StageFeed, schema: StageFeed, stop: threading.Event):
+        """A fresh agent set for one request; model, prompts and tools are shared."""
+        agent = self._agent(
+            ToolCallingAgent, stop,
+            prompt_templates=self.prompt_templates,
+            tools=[self.tools["dirs"]],
         )
+        viewer = self._agent(
+            ToolCallingAgent, stop, found, "directory_analysis",
+            prompt_templates=self.data_viewer_prompt_templates,
+            name="data_viewer_agent",
+            description="an agent can retrieve or view the file direclty, and return the data schema",
+            tools=[self.tools["rag"], self.previewer],
+        )
+        coder = self._agent(
+            CodeAgent, stop, schema, "data_viewer",
+            name="coding_agent",
+            description="implement the idea into an agent code",
+            tools=[self.tools["writer"]],
+        )
+        return agent, viewer, coder
+
+    def _preview(self, path: str) -> str:
+        try:
+            return self.previewer.forward(path)
+        except (OSError, UnicodeDecodeError) as e:
+            return f"(not previewable: {e})"
 
-    agent = ToolCallingAgent(
-        prompt_templates=prompt_templates,
-        tools=[DirectoryAnalyzer()],
-        model=LiteLLMModel(model_id="xai/grok-3-latest"),#gemini/gemini-1.5-pro
-        #managed_agents=[viewer, coder], #pipeline may work better
-    )
+    def _stream(self, agent, task: str, on_step=None, on_text=None, reset: bool = True) -> str:
+        """Runs an agent in streaming mode; returns its final answer."""
+        final = None
+        for step in agent.run(task, stream=True, reset=reset):
+            if on_step:
+                on_step(step)
+            if isinstance(step, ActionStep) and step.observations and on_text:
+                on_text(str(step.observations))
+            if isinstance(step, FinalAnswerStep):
+                final = step.output
+        return "" if final is None else str(final)
 
-    response = agent.run(task)
-    response1 = viewer.run(task +response)
-    response2 = coder.run(task + response1)
+    def run(self, task: str, on_step=None) -> str:
+        """on_step(stage_name, step) receives every intermediate step as it happens, from any stage."""
+        stop = threading.Event()
+        found, schema = StageFeed(), StageFeed()  # directory_analysis -> data_viewer -> coding
+        agent, viewer, coder = self._agents(found, schema, stop)
+        roots = data_roots(self.data_dirs)
+        previews = {}
 
-    return response2
\ No newline at end of file
+        def report(stage):
+            return on_step and (lambda s: on_step(stage, s))
+
+        def schedule(text: str):
+            for path in candidate_files(paths_in(text, roots), MAX_PREVIEWS - len(previews)):
+                if path not in previews:
+                    previews[path] = self.previews.submit(self._preview, path)
+                    previews[path].add_done_callback(
+                        lambda f, p=path: found.put(f"--- {p} (first 1000 chars) ---\n{f.result()}"))
+
+        def analyse() -> str:
+            def seen(text):
+                schedule(text)
+                found.put(cap_context(text, self.max_context))
+            schedule(task)  # previews of the named data start before the first model call
+            answer = self._stream(agent, task, on_step=report("directory_analysis"), on_text=seen)
+            for f in list(previews.values()):
+                f.result()  # every preview is put before the final answer
+            found.finish(answer)
+            return answer
+
+        def downstream(stage, source, stage_agent, inbox: StageFeed, outbox: Optional[StageFeed]) -> str:
+            upstream, complete = inbox.first()
+            if stop.is_set():
+                return ""
+            answer = self._stream(stage_agent, task + "\n\n" + cap_context(upstream, self.max_context),
+                                  on_step=report(stage), on_text=outbox and outbox.put)
+            if not complete:
+                final = inbox.result()  # the complete upstream answer, however few steps this stage took
+                if stop.is_set() or final is None:
+                    return ""
+                answer = self._stream(stage_agent,
+                                      f"The {source} stage has finished. Its final answer is below; "
+                                      f"revise your answer against it and give the final version.\n\n"
+                                      f"{cap_context(final, self.max_context)}",
+                                      on_step=report(stage), on_text=outbox and outbox.put, reset=False)
+            if outbox:
+                outbox.finish(answer)
+            return answer
+
+        def stage(fn, outbox, *args):
+            try:
+                return fn(*args)
+            except _Stopped:
+                return ""
+            except BaseException:
+                stop.set()  # the other stages stop at their next step
+                found.close()
+                schema.close()
+                raise
+            finally:
+                if outbox:
+                    outbox.close()
+
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="eda-stage") as stages:
+            viewing = stages.submit(stage, downstream, schema, "data_viewer", "directory_analysis", viewer, found, schema)
+            coding = stages.submit(stage, downstream, None, "coding", "data_viewer", coder, schema, None)
+            try:
+                stage(analyse, found)
+            finally:
+                viewing.exception()  # wait for every stage before surfacing the first error
+                coding.exception()
+            viewing.result()
+            return coding.result()
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def get_pipeline() -> EDAPipeline:
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = EDAPipeline()
+        return _pipeline
+
+def eda_by_smol(task):
+    return get_pipeline().run(task)
@@ -1,17 +1,77 @@
 #!/usr/bin/env python3
 import sys
-from mcp.server.fastmcp import FastMCP
-from run_edge_data_agent import run_edge_data_agent  # ensure run_rag_all is importable from here
+import yaml
+from mcp.server.fastmcp import FastMCP, Context
+from eda_sample import get_pipeline
+from tools import index_service
+from tools.async_pool import AsyncPool, RequestTimeout
 
 mcp = FastMCP("Edge Data Agent")
+pool = AsyncPool()  # bounded worker pool: slow queries do not block other clients
+
+STAGES = ("directory_analysis", "data_viewer", "coding")
+STEP_PREVIEW = 2000  # characters of each intermediate step sent as progress
+
+class _Cancelled(Exception):
+    pass
+
+def _run_agent(query: str, progress, cancelled) -> str:
+    """Runs the EDA pipeline, reporting every agent step as it happens and stopping between steps once cancelled."""
+    def on_step(stage, step):
+        if cancelled.is_set():
+            raise _Cancelled
+        text = getattr(step, "observations", None) or getattr(step, "model_output", None) or ""
+        progress(f"[{stage}] {str(text)[:STEP_PREVIEW]}", STAGES.index(stage) / len(STAGES))
+
+    progress("started", 0.0)
+    try:
+        return get_pipeline().run(query, on_step=on_step)
+    except _Cancelled:
+        return ""
 
 @mcp.tool()
-def run_rag_mcp(query: str) -> str:
+async def run_rag_mcp(query: str, ctx: Context) -> str:
     """
     Runs the aggregated RAG process for all data directories in the registry.
+    Intermediate agent steps are streamed as progress messages while it runs.
+    """
+    async def send(message, fraction):
+        if fraction is not None:
+            await ctx.report_progress(fraction, 1.0)
+        await ctx.info(message)
+
+    try:
+        answer = await pool.run(_run_agent, query, on_progress=send)
+    except RequestTimeout as e:
+        return f"Query timed out ({e}); try a narrower question."
+    return answer or ""
+
+@mcp.tool()
+def index_status() -> str:
     """
-    return run_edge_data_agent(query)
+    Build state of every registered data directory: current index generation,
+    whether a (re)build is queued or running, last build time and errors.
+    """
+    rows = index_service.start_service().status()
+    return yaml.safe_dump(rows, sort_keys=False) if rows else "No registered data directories."
+
+@mcp.tool()
+def reindex(data_directory: str = "") -> str:
+    """
+    Queues a background (re)build of one data directory, or of every registered
+    directory when none is given. Queries keep using the current index until the
+    new generation is ready.
+    """
+    queued = index_service.start_service().reindex(data_directory or None)
+    return f"Queued: {', '.join(queued)}" if queued else "Nothing queued (already pending or no registered directories)."
+
+@mcp.tool()
+def server_stats() -> str:
+    """Worker pool load: running and waiting requests, timeouts and cancellations."""
+    return yaml.safe_dump(pool.stats, sort_keys=False)
 
 if __name__ == "__main__":
+    # Build/refresh indexes in the background so queries never wait on a rebuild
+    index_service.start_service()
     # Run the server; this is blocking
     mcp.run(transport="stdio")
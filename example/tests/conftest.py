@@ -0,0 +1,4 @@
+import os, sys
+
+# The example modules (tools, eda_sample) are imported as top-level names.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
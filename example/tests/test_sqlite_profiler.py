@@ -0,0 +1,24 @@
+import sqlite3
+
+from tools import sqlite_profiler
+
+def test_index_names_are_matched_whole():
+    plan = ["SEARCH payments USING COVERING INDEX eda_idx_payments_order_id_status_amount_usd (order_id=?)"]
+    assert sqlite_profiler._uses_index(plan, "eda_idx_payments_order_id") == []
+    assert sqlite_profiler._uses_index(plan, "eda_idx_payments_order_id_status_amount_usd") == plan
+
+def test_apply_ignores_a_longer_index_with_the_same_prefix(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "shadow.db"))
+    conn.execute("CREATE TABLE payments (order_id INTEGER, status TEXT, amount_usd REAL)")
+    conn.executemany("INSERT INTO payments VALUES (?, ?, ?)", [(i, "paid", i * 1.5) for i in range(2000)])
+    conn.execute("CREATE INDEX eda_idx_payments_order_id_status ON payments (order_id, status)")
+    conn.commit()
+    sql = "SELECT status FROM payments WHERE order_id = 7"
+    s = {"sql": sql, "index": "eda_idx_payments_order_id",
+         "ddl": "CREATE INDEX IF NOT EXISTS eda_idx_payments_order_id ON payments (amount_usd)",
+         "plan_before": ["SCAN payments"]}
+    sqlite_profiler._apply(str(tmp_path / "sales.db"), conn, [s])
+    assert any("eda_idx_payments_order_id_status" in d for d in s["plan_after"])
+    assert s["applied"] is False
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'eda_idx_payments_order_id'").fetchone() is None
+    conn.close()
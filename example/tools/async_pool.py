@@ -0,0 +1,116 @@
+"""
+Runs blocking tool functions (retrieval, agent runs) from async MCP handlers.
+
+A bounded thread pool keeps CPU-heavy calls off the event loop, so one slow
+query no longer blocks every other client on the server. Each call gets:
+  - admission control: at most `workers` calls run, the rest wait their turn
+  - a timeout (EDA_MCP_TIMEOUT seconds, default 120)
+  - cooperative cancellation: the function receives a threading.Event that is
+    set when the request times out or the client cancels. Python threads cannot
+    be killed, so long loops should check it.
+  - progress: the function may call progress(message, fraction) from its thread.
+    The handler forwards these to the client as they happen.
+A timed-out or cancelled call keeps its slot until the function really returns
+(counted in stats["abandoned"]), so new requests wait for a free thread instead
+of queueing unseen behind abandoned work. Work that had not started is dropped.
+
+  pool = AsyncPool()
+  text = await pool.run(fn, arg, on_progress=send)   # fn(arg, progress=..., cancelled=...)
+"""
+import os
+import time
+import asyncio
+import threading
+import concurrent.futures
+from typing import Awaitable, Callable, Optional
+
+WORKERS = int(os.environ.get("EDA_MCP_WORKERS", str(min(8, os.cpu_count() or 1))))
+TIMEOUT = float(os.environ.get("EDA_MCP_TIMEOUT", "120"))
+
+class RequestTimeout(Exception):
+    pass
+
+class AsyncPool:
+    def __init__(self, workers: int = WORKERS, timeout: float = TIMEOUT):
+        self.timeout = timeout
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcp-worker")
+        self.slots = asyncio.Semaphore(workers)
+        self.stats = {"running": 0, "waiting": 0, "done": 0, "timeouts": 0, "cancelled": 0, "abandoned": 0}
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None,
+                  on_progress: Optional[Callable[[str, Optional[float]], Awaitable[None]]] = None, **kwargs):
+        """
+        Awaits fn(*args, progress=..., cancelled=..., **kwargs) on the pool.
+        Raises RequestTimeout after `timeout` seconds; asyncio cancellation of the
+        caller is propagated to fn through the `cancelled` event.
+
+        A slot is held until fn actually returns, not until the caller gives up:
+        a timed-out call that keeps running still occupies its worker thread, so
+        new calls wait for a free thread instead of queueing behind it.
+        """
+        loop = asyncio.get_running_loop()
+        cancelled = threading.Event()
+        updates: "asyncio.Queue" = asyncio.Queue()
+
+        def progress(message: str, fraction: Optional[float] = None):
+            if not cancelled.is_set():
+                loop.call_soon_threadsafe(updates.put_nowait, (message, fraction))
+
+        self.stats["waiting"] += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.stats["waiting"] -= 1
+        self.stats["running"] += 1
+        try:
+            work = self.executor.submit(lambda: fn(*args, progress=progress, cancelled=cancelled, **kwargs))
+        except BaseException:
+            self.stats["running"] -= 1
+            self.slots.release()
+            raise
+
+        def finished(_):
+            def release():
+                self.stats["running"] -= 1
+                self.stats["done"] += 1
+                self.slots.release()
+            try:
+                loop.call_soon_threadsafe(release)
+            except RuntimeError:  # event loop already closed
+                pass
+        work.add_done_callback(finished)
+
+        future = asyncio.wrap_future(work, loop=loop)
+        deadline = time.monotonic() + (timeout or self.timeout)
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                getter = asyncio.ensure_future(updates.get())
+                done, _ = await asyncio.wait({future, getter}, timeout=remaining,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    if on_progress:
+                        await on_progress(*getter.result())
+                else:
+                    getter.cancel()
+                if future in done:
+                    while on_progress and not updates.empty():  # sent just before returning
+                        await on_progress(*updates.get_nowait())
+                    return future.result()
+        except asyncio.TimeoutError:
+            self._abandon(work, future, cancelled)
+            self.stats["timeouts"] += 1
+            raise RequestTimeout(f"request exceeded {timeout or self.timeout:g}s") from None
+        except asyncio.CancelledError:
+            self._abandon(work, future, cancelled)
+            self.stats["cancelled"] += 1
+            raise
+
+    def _abandon(self, work: concurrent.futures.Future, future: asyncio.Future, cancelled: threading.Event):
+        """Stops work nobody waits for: drops it if still queued, else asks fn to return early."""
+        cancelled.set()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())  # nobody will retrieve it
+        if not work.cancel() and not work.done():
+            self.stats["abandoned"] += 1  # still running; its slot frees when fn returns
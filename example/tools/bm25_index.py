@@ -0,0 +1,194 @@
+"""
+On-disk BM25 inverted index (SQLite) kept next to a vector store, plus
+reciprocal-rank fusion for hybrid retrieval.
+
+Identifiers such as INV-1043 or EU-818 are kept whole by the tokenizer (and also
+split into their parts), so an identifier lookup is a couple of primary-key
+reads in SQLite and never needs the embedding model.
+
+  bm25 = BM25Index(os.path.join(cache_dir, "bm25.sqlite"))
+  bm25.add(ids, texts, metadatas)
+  hits = bm25.search("invoice INV-1043", k=5)      # [(id, score, text, metadata)]
+  fused = reciprocal_rank_fusion([bm25_ids, vector_ids])
+"""
+import re
+import json
+import math
+import heapq
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+K1, B = 1.2, 0.75
+COMMON_DF = 0.2  # a term in more than this fraction of documents is "common"
+RRF_K = 60
+MODES = ("vector", "bm25", "hybrid")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+_PART_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word/identifier tokens; 'INV-1043' -> ['inv-1043', 'inv', '1043']."""
+    out = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        out.append(tok)
+        if not tok.isalnum():
+            out.extend(_PART_RE.findall(tok))
+    return out
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: score(id) = sum over lists of 1 / (k + rank), best first."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+
+class BM25Index:
+    """Documents, postings and per-term document frequencies in one SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS docs (
+              rowid INTEGER PRIMARY KEY,
+              id TEXT UNIQUE NOT NULL,
+              path TEXT,
+              text TEXT NOT NULL,
+              meta TEXT,
+              len INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS docs_path ON docs(path);
+            CREATE TABLE IF NOT EXISTS postings (
+              term TEXT NOT NULL,
+              doc INTEGER NOT NULL,
+              tf INTEGER NOT NULL,
+              PRIMARY KEY (term, doc)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings(doc);
+            CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), n_docs INTEGER, total_len INTEGER);
+            INSERT OR IGNORE INTO totals VALUES (0, 0, 0);
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT n_docs FROM totals").fetchone()[0]
+
+    def add(self, ids: Sequence[str], texts: Sequence[str], metadatas: Optional[Sequence[dict]] = None):
+        """Insert or replace documents (one transaction)."""
+        metadatas = metadatas or [{}] * len(ids)
+        with self.lock, self.conn:
+            self._delete_where("id IN (%s)" % ",".join("?" * len(ids)), list(ids))
+            df = Counter()
+            for doc_id, text, meta in zip(ids, texts, metadatas):
+                tf = Counter(tokenize(text))
+                cur = self.conn.execute(
+                    "INSERT INTO docs (id, path, text, meta, len) VALUES (?,?,?,?,?)",
+                    (doc_id, (meta or {}).get("path") or (meta or {}).get("file_path"), text,
+                     json.dumps(meta or {}, default=str), sum(tf.values())))
+                self.conn.executemany("INSERT INTO postings VALUES (?,?,?)",
+                                      [(t, cur.lastrowid, n) for t, n in tf.items()])
+                df.update(tf.keys())
+            self.conn.executemany(
+                "INSERT INTO terms VALUES (?,?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                list(df.items()))
+            self._update_totals()
+
+    def delete_paths(self, paths: Iterable[str]):
+        """Remove every document that came from one of these source paths."""
+        paths = list(paths)
+        if paths:
+            with self.lock, self.conn:
+                self._delete_where("path IN (%s)" % ",".join("?" * len(paths)), paths)
+
+    def _delete_where(self, where: str, params: list):
+        rows = [r[0] for r in self.conn.execute(f"SELECT rowid FROM docs WHERE {where}", params)]
+        if not rows:
+            return
+        marks = ",".join("?" * len(rows))
+        gone = self.conn.execute(
+            f"SELECT term, COUNT(*) FROM postings WHERE doc IN ({marks}) GROUP BY term", rows).fetchall()
+        self.conn.executemany("UPDATE terms SET df = df - ? WHERE term = ?", [(n, t) for t, n in gone])
+        self.conn.execute("DELETE FROM terms WHERE df <= 0")
+        self.conn.execute(f"DELETE FROM postings WHERE doc IN ({marks})", rows)
+        self.conn.execute(f"DELETE FROM docs WHERE rowid IN ({marks})", rows)
+        self._update_totals()
+
+    def _update_totals(self):
+        # Kept in a one-row table so a search never scans docs.
+        self.conn.execute("UPDATE totals SET (n_docs, total_len) = "
+                          "(SELECT COUNT(*), COALESCE(SUM(len), 0) FROM docs) WHERE id = 0")
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.executescript("DELETE FROM postings; DELETE FROM terms; DELETE FROM docs; "
+                                    "UPDATE totals SET n_docs = 0, total_len = 0;")
+
+    def _query_terms(self, query: str) -> List[str]:
+        """Query tokens; an identifier known to the index is not split into its parts."""
+        out = []
+        for tok in _TOKEN_RE.findall(query.lower()):
+            if tok.isalnum() or self.conn.execute("SELECT 1 FROM terms WHERE term = ?", (tok,)).fetchone():
+                out.append(tok)
+            else:
+                out.extend(_PART_RE.findall(tok))
+        return list(dict.fromkeys(out))
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float, str, dict]]:
+        """
+        Top-k (id, bm25 score, text, metadata) for the query's tokens.
+
+        Terms in more than COMMON_DF of the documents are scored only for documents
+        already matched by a rarer query term (when those are at least k), which keeps
+        lookups of rare identifiers to a few index reads.
+        """
+        with self.lock:
+            terms = self._query_terms(query)
+            if not terms:
+                return []
+            n_docs, total_len = self.conn.execute("SELECT n_docs, total_len FROM totals").fetchone()
+            if not n_docs:
+                return []
+            avgdl = total_len / n_docs
+            marks = ",".join("?" * len(terms))
+            dfs = dict(self.conn.execute(f"SELECT term, df FROM terms WHERE term IN ({marks})", terms))
+            if not dfs:
+                return []
+            idf = {t: math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) for t, df in dfs.items()}
+            rare = [t for t, df in dfs.items() if df <= COMMON_DF * n_docs]
+            common = [t for t in dfs if t not in rare]
+
+            scores: Dict[int, float] = {}
+            def accumulate(rows):
+                for term, doc, tf, dl in rows:
+                    scores[doc] = scores.get(doc, 0.0) + idf[term] * tf * (K1 + 1) / (tf + K1 * (1 - B + B * dl / avgdl))
+            select = "SELECT p.term, p.doc, p.tf, d.len FROM postings p JOIN docs d ON d.rowid = p.doc "
+            if rare:
+                accumulate(self.conn.execute(
+                    select + "WHERE p.term IN (%s)" % ",".join("?" * len(rare)), rare))
+            if common and len(scores) >= k:
+                cands = list(scores)
+                for i in range(0, len(cands), 500):
+                    part = cands[i:i + 500]
+                    accumulate(self.conn.execute(
+                        select + "WHERE p.term IN (%s) AND p.doc IN (%s)" % (
+                            ",".join("?" * len(common)), ",".join("?" * len(part))), common + part))
+            elif common:
+                scores.clear()
+                accumulate(self.conn.execute(select + f"WHERE p.term IN ({marks})", terms))
+
+            top = heapq.nlargest(k, scores.items(), key=lambda kv: (kv[1], -kv[0]))
+            out = []
+            for rowid, score in top:
+                doc_id, text, meta = self.conn.execute(
+                    "SELECT id, text, meta FROM docs WHERE rowid = ?", (rowid,)).fetchone()
+                out.append((doc_id, score, text, json.loads(meta or "{}")))
+            return out
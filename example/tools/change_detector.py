@@ -0,0 +1,367 @@
+"""
+Change detection for data directories without walking and stat-ing every file
+on every query.
+
+A snapshot keeps, per directory, its mtime, its subdirectories and the
+(size, mtime) of its files; it is saved under <root>/.cache/. Three ways to
+bring it up to date (EDA_CHANGE_DETECTION):
+
+  watch  (default) an inotify watcher thread (Linux, no extra packages) records
+         which directories saw events; a poll re-lists only those, and
+         has_changes() is a set-emptiness check. The first poll in a process
+         is a deep one, to catch what changed while nobody was watching.
+         Falls back to deep where inotify is unavailable.
+  quick  os.scandir with cached directory mtimes: a directory whose mtime is
+         unchanged is not re-listed and its files are not stat-ed. A directory's
+         mtime only changes when entries are created, deleted or renamed, so an
+         in-place write to an existing file (echo >> f, truncate-and-rewrite)
+         is NOT seen; editors that save via rename are. Use with care.
+  deep   one os.scandir pass that stats every file; always correct.
+
+Hidden entries (including .cache/ itself) are ignored, like the readers do.
+
+  detector = change_detector.get_detector(data_dir)
+  changes = detector.poll()            # Changes(added, modified, deleted), absolute paths
+  ...update the index...
+  detector.commit(tag)                 # accept the polled state as the new baseline
+"""
+import os
+import sys
+import errno
+import pickle
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set
+
+MODES = ("watch", "quick", "deep")
+DEFAULT_MODE = os.environ.get("EDA_CHANGE_DETECTION", "watch")
+STATE_VERSION = 1
+
+class Changes(NamedTuple):
+    added: List[str]
+    modified: List[str]
+    deleted: List[str]
+
+    def __bool__(self):
+        return bool(self.added or self.modified or self.deleted)
+
+# A directory: (mtime_ns, {file name: (size, mtime_ns)}, [subdirectory names])
+_Dir = tuple
+
+def _scan_dir(path: str, recursive: bool) -> Optional[_Dir]:
+    try:
+        mtime = os.stat(path).st_mtime_ns  # before listing: a change during the scan shows up next poll
+        files, subdirs = {}, []
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir():
+                        if recursive:
+                            subdirs.append(entry.name)
+                    elif entry.is_file():
+                        st = entry.stat()
+                        files[entry.name] = (st.st_size, st.st_mtime_ns)
+                except FileNotFoundError:
+                    continue
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return None
+    return mtime, files, sorted(subdirs)
+
+class ChangeDetector:
+    """Snapshot of one directory tree; poll() diffs it against the disk, commit() accepts the result."""
+
+    def __init__(self, root: str, recursive: bool = True, mode: str = DEFAULT_MODE, state_path: Optional[str] = None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        self.root = os.path.abspath(root)
+        self.recursive = recursive
+        self.state_path = state_path or os.path.join(
+            self.root, ".cache", f"changes{'' if recursive else '-top'}.pkl")
+        self.lock = threading.RLock()
+        self.dirs: Dict[str, _Dir] = {}
+        self.tag = None
+        self._pending = None
+        self._load()
+        self.watcher = None
+        self._watched_baseline = False  # a poll has run since the watcher started
+        if mode == "watch":
+            self.watcher = InotifyWatcher.start(self.root, recursive)
+            if self.watcher is None:
+                mode = "deep"
+        self.mode = mode
+
+    def _load(self):
+        try:
+            with open(self.state_path, "rb") as f:
+                state = pickle.load(f)
+            if state.get("version") == STATE_VERSION and state.get("recursive") == self.recursive:
+                self.dirs, self.tag = state["dirs"], state["tag"]
+        except (OSError, EOFError, pickle.UnpicklingError, KeyError, AttributeError):
+            pass
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump({"version": STATE_VERSION, "recursive": self.recursive,
+                             "dirs": self.dirs, "tag": self.tag}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.state_path)
+        except OSError:
+            pass  # read-only data directory: the snapshot lives for this process only
+
+    @property
+    def has_baseline(self) -> bool:
+        return bool(self.dirs)
+
+    def _abs(self, rel: str, name: str = "") -> str:
+        return os.path.join(self.root, rel, name) if rel else os.path.join(self.root, name)
+
+    def has_changes(self) -> bool:
+        """With a live watcher, constant time; otherwise a poll()."""
+        with self.lock:
+            if self.watcher and self.watcher.healthy and self._watched_baseline:
+                return self.watcher.has_events() or bool(self._pending and self._pending[1])
+            return bool(self.poll())
+
+    def poll(self, deep: bool = False) -> Changes:
+        """Changes since the last commit(); the scanned state is kept until commit()."""
+        with self.lock:
+            live = self.watcher is not None and self.watcher.healthy and self._watched_baseline
+            if live and not deep and not self.watcher.overflowed:
+                dirty = self.watcher.drain()
+                dirs = dict(self._pending[0] if self._pending else self.dirs)
+                changes = Changes([], [], [])
+                for rel in sorted(dirty, key=len):
+                    if rel in dirs or self._abs(rel) == self.root:
+                        self._rescan(dirs, rel, changes, force=True)
+                    elif os.path.dirname(rel) in dirs:
+                        self._rescan(dirs, os.path.dirname(rel), changes, force=True)
+                if self._pending:  # carry over what earlier polls found but nobody committed
+                    changes = _merge(self._pending[1], changes)
+            else:
+                if self.watcher:
+                    self.watcher.drain()
+                    self.watcher.overflowed = False
+                dirs = dict(self.dirs)
+                changes = Changes([], [], [])
+                self._walk(dirs, "", changes, deep or self.mode != "quick")
+                self._watched_baseline = self.watcher is not None and self.watcher.healthy
+            self._pending = (dirs, changes)
+            return changes
+
+    def _walk(self, dirs: dict, rel: str, changes: Changes, deep: bool):
+        stack = [rel]
+        while stack:
+            rel = stack.pop()
+            self._rescan(dirs, rel, changes, force=deep, recurse=False)
+            if rel in dirs:
+                stack.extend(os.path.join(rel, d) if rel else d for d in dirs[rel][2])
+
+    def _rescan(self, dirs: dict, rel: str, changes: Changes, force: bool, recurse: bool = True):
+        """Re-list one directory if needed and diff it into `changes`; new subtrees are scanned whole."""
+        path = self._abs(rel)
+        old = dirs.get(rel)
+        if not force and old is not None:
+            try:
+                if os.stat(path).st_mtime_ns == old[0]:
+                    return
+            except OSError:
+                pass
+        new = _scan_dir(path, self.recursive)
+        if new is None:
+            self._drop(dirs, rel, changes)
+            return
+        dirs[rel] = new
+        if old is not None and old[1] == new[1] and old[2] == new[2]:
+            return
+        old_files, old_subdirs = (old[1], old[2]) if old else ({}, [])
+        for name, stat in new[1].items():
+            if name not in old_files:
+                changes.added.append(self._abs(rel, name))
+            elif old_files[name] != stat:
+                changes.modified.append(self._abs(rel, name))
+        changes.deleted.extend(self._abs(rel, name) for name in old_files if name not in new[1])
+        for name in old_subdirs:
+            if name not in new[2]:
+                self._drop(dirs, os.path.join(rel, name) if rel else name, changes)
+        if recurse:
+            for name in new[2]:
+                sub = os.path.join(rel, name) if rel else name
+                if sub not in dirs:
+                    self._walk(dirs, sub, changes, True)
+
+    def _drop(self, dirs: dict, rel: str, changes: Changes):
+        old = dirs.pop(rel, None)
+        if old is None:
+            return
+        changes.deleted.extend(self._abs(rel, name) for name in old[1])
+        for name in old[2]:
+            self._drop(dirs, os.path.join(rel, name) if rel else name, changes)
+
+    def commit(self, tag=None):
+        """
+        Accept the last poll() as the baseline and record the caller's tag (e.g. the
+        index version it now matches). Only the index owner should commit; other
+        readers just poll().
+        """
+        with self.lock:
+            if self._pending is not None:
+                self.dirs = self._pending[0]
+                self._pending = None
+            self.tag = tag
+            self._save()
+
+    def _current(self) -> Dict[str, _Dir]:
+        return self._pending[0] if self._pending else self.dirs
+
+    @property
+    def latest_mtime(self) -> float:
+        """Latest file mtime (seconds) as of the last poll()."""
+        with self.lock:
+            return max((max((s[1] for s in d[1].values()), default=0) for d in self._current().values()),
+                       default=0) / 1e9
+
+    @property
+    def file_count(self) -> int:
+        with self.lock:
+            return sum(len(d[1]) for d in self._current().values())
+
+def _merge(a: Changes, b: Changes) -> Changes:
+    added, modified, deleted = set(a.added), set(a.modified), set(a.deleted)
+    for p in b.added:
+        if p in deleted:
+            deleted.discard(p)
+            modified.add(p)
+        else:
+            added.add(p)
+    modified.update(p for p in b.modified if p not in added)
+    for p in b.deleted:
+        if p in added:
+            added.discard(p)
+        else:
+            modified.discard(p)
+            deleted.add(p)
+    return Changes(sorted(added), sorted(modified), sorted(deleted))
+
+# ------------------------------------------------------------------------------
+# inotify (Linux) through libc, no third-party package
+# ------------------------------------------------------------------------------
+IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+IN_DELETE_SELF, IN_MOVE_SELF, IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x400, 0x800, 0x4000, 0x8000, 0x40000000
+IN_NONBLOCK, IN_CLOEXEC = 0o4000, 0o2000000
+_WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+               IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT = struct.Struct("iIII")
+
+class InotifyWatcher:
+    """Background thread turning inotify events into a set of dirty directories (relative to root)."""
+
+    @classmethod
+    def start(cls, root: str, recursive: bool) -> Optional["InotifyWatcher"]:
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return cls(root, recursive)
+        except OSError as e:
+            print(f"[warn] inotify watcher unavailable for {root} ({e}); falling back to scanning", file=sys.stderr)
+            return None
+
+    def __init__(self, root: str, recursive: bool):
+        self.root, self.recursive = root, recursive
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.wds: Dict[int, str] = {}
+        self.dirty: Set[str] = set()
+        self.overflowed = False
+        self.healthy = True
+        self.lock = threading.Lock()
+        self._add_tree("")
+        self.thread = threading.Thread(target=self._run, name=f"inotify:{root}", daemon=True)
+        self.thread.start()
+
+    def _add_tree(self, rel: str):
+        stack = [rel]
+        while stack:
+            rel = stack.pop()
+            path = os.path.join(self.root, rel) if rel else self.root
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err in (errno.ENOSPC, errno.ENOMEM):  # out of watches: stop trusting the dirty set
+                    self.healthy = False
+                    print(f"[warn] inotify watch limit reached under {self.root}; falling back to scanning", file=sys.stderr)
+                    return
+                continue
+            self.wds[wd] = rel
+            if self.recursive:
+                try:
+                    with os.scandir(path) as it:
+                        stack.extend(os.path.join(rel, e.name) if rel else e.name for e in it
+                                     if not e.name.startswith(".") and e.is_dir(follow_symlinks=False))
+                except OSError:
+                    pass
+
+    def _run(self):
+        while self.healthy:
+            try:
+                ready, _, _ = select.select([self.fd], [], [], 1.0)
+                if not ready:
+                    continue
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                self.healthy = False
+                return
+            self._handle(data)
+
+    def _handle(self, data: bytes):
+        pos = 0
+        with self.lock:
+            while pos + _EVENT.size <= len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, pos)
+                name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0").decode(errors="surrogateescape")
+                pos += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    self.overflowed = True
+                    continue
+                rel = self.wds.get(wd)
+                if rel is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self.wds[wd]
+                    continue
+                if name.startswith("."):
+                    continue
+                self.dirty.add(rel)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and self.recursive:
+                    self._add_tree(os.path.join(rel, name) if rel else name)
+
+    def has_events(self) -> bool:
+        with self.lock:
+            return bool(self.dirty) or self.overflowed
+
+    def drain(self) -> Set[str]:
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            return dirty
+
+_detectors: Dict[tuple, ChangeDetector] = {}
+_detectors_lock = threading.Lock()
+
+def get_detector(root: str, recursive: bool = True) -> ChangeDetector:
+    """One detector (and watcher) per (directory, recursive) per process."""
+    key = (os.path.abspath(root), recursive)
+    with _detectors_lock:
+        if key not in _detectors:
+            _detectors[key] = ChangeDetector(root, recursive)
+        return _detectors[key]
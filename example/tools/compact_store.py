@@ -0,0 +1,243 @@
+"""
+Compact on-disk vector store: int8- or float16-quantized embeddings in one
+memory-mapped matrix, with an id -> (text, metadata) sidecar.
+
+  <dir>/store.json    dim, dtype, row count and capacity (rewritten atomically)
+  <dir>/vectors.bin   capacity x dim, int8 or float16, rows L2-normalised
+  <dir>/scales.f32    per-row dequantisation scale (int8 only)
+  <dir>/alive.u8      1 for live rows, 0 for deleted ones
+  <dir>/offsets.u64   byte offset of each row's record in meta.jsonl
+  <dir>/meta.jsonl    {"id", "text", "meta"} per row, append-only
+
+A search is a batched matrix multiply over the rows (BLAS, so SIMD on any CPU
+numpy supports) followed by argpartition per block; rows are dequantised a few
+thousand at a time into a reused float32 buffer, so memory stays bounded while
+the matrix itself is paged in by the OS. int8 needs about a quarter of the
+float32 bytes at float32 speed; float16 is near-lossless but numpy's float16
+conversion makes it several times slower to scan.
+
+  store = CompactVectorStore(path, dim=384, dtype="int8")
+  store.add(ids=ids, documents=texts, embeddings=vectors, metadatas=metas)
+  hits = store.search(query_vector, k=5)     # [(id, score, text, metadata)]
+"""
+import os
+import json
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DTYPES = ("int8", "float16")
+BLOCK_ROWS = 65536
+CONVERT_ROWS = 2048  # rows dequantised per matmul; the float32 buffer stays in L2
+_FILES = ("vectors.bin", "scales.f32", "alive.u8", "offsets.u64")
+
+def normalize(x) -> np.ndarray:
+    """Rows of x as float32 with unit L2 norm (zero rows stay zero)."""
+    x = np.atleast_2d(np.asarray(x, dtype=np.float32))
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.where(norms == 0, 1, norms)
+
+def quantize_int8(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8: x ~= q * scale[:, None]."""
+    scale = np.abs(x).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    q = np.rint(x / scale[:, None]).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+class CompactVectorStore:
+    """Append-only quantized vector store; deletes are tombstones. Cosine similarity."""
+
+    def __init__(self, path: str, dim: Optional[int] = None, dtype: str = "int8"):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {DTYPES}")
+        self.path = path
+        self.lock = threading.RLock()
+        self._rows_by_id = None
+        os.makedirs(path, exist_ok=True)
+        header = os.path.join(path, "store.json")
+        if os.path.exists(header):
+            with open(header) as f:
+                self.info = json.load(f)
+        else:
+            self.info = {"version": 1, "dim": dim, "dtype": dtype, "count": 0, "capacity": 0, "extra": {}}
+        self._map()
+
+    # -- files --------------------------------------------------------------
+
+    def _map(self):
+        cap, dim = self.info["capacity"], self.info["dim"]
+        if not cap:
+            self.vectors = self.scales = self.alive = self.offsets = None
+            return
+        mode = "r+" if os.access(os.path.join(self.path, "vectors.bin"), os.W_OK) else "r"
+        self.vectors = np.memmap(os.path.join(self.path, "vectors.bin"), self.info["dtype"], mode, shape=(cap, dim))
+        self.scales = np.memmap(os.path.join(self.path, "scales.f32"), np.float32, mode, shape=(cap,))
+        self.alive = np.memmap(os.path.join(self.path, "alive.u8"), np.uint8, mode, shape=(cap,))
+        self.offsets = np.memmap(os.path.join(self.path, "offsets.u64"), np.uint64, mode, shape=(cap,))
+
+    def _grow(self, needed: int):
+        cap = self.info["capacity"]
+        if needed <= cap:
+            return
+        new_cap = max(needed, 2 * cap, 1024)
+        itemsizes = (self.info["dim"] * np.dtype(self.info["dtype"]).itemsize, 4, 1, 8)
+        self.flush()
+        self.vectors = self.scales = self.alive = self.offsets = None
+        for name, size in zip(_FILES, itemsizes):
+            with open(os.path.join(self.path, name), "ab") as f:
+                f.truncate(new_cap * size)
+        self.info["capacity"] = new_cap
+        self._map()
+
+    def flush(self):
+        for m in (self.vectors, self.scales, self.alive, self.offsets):
+            if m is not None and m.mode != "r":
+                m.flush()
+        tmp = os.path.join(self.path, "store.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.info, f)
+        os.replace(tmp, os.path.join(self.path, "store.json"))
+
+    def nbytes(self) -> int:
+        """Bytes on disk for the vectors and per-row arrays (excluding the text sidecar)."""
+        n, dim = self.info["count"], self.info["dim"] or 0
+        return n * (dim * np.dtype(self.info["dtype"]).itemsize + 4 + 1 + 8)
+
+    def __len__(self) -> int:
+        n = self.info["count"]
+        return int(self.alive[:n].sum()) if n else 0
+
+    @property
+    def extra(self) -> dict:
+        """Free-form caller state saved in store.json (e.g. the corpus version indexed)."""
+        return self.info.setdefault("extra", {})
+
+    # -- writes -------------------------------------------------------------
+
+    def _id_index(self) -> dict:
+        if self._rows_by_id is None:
+            self._rows_by_id, self._rows_by_path = {}, {}
+            for row, rec in self._records(range(self.info["count"])):
+                if self.alive[row]:
+                    self._rows_by_id[rec["id"]] = row
+                    self._rows_by_path.setdefault((rec["meta"] or {}).get("path"), []).append(row)
+        return self._rows_by_id
+
+    def add(self, ids: Sequence[str], documents: Sequence[str], embeddings, metadatas: Optional[Sequence[dict]] = None):
+        """Append rows (keyword arguments match collection.add); an existing id is replaced."""
+        if not len(ids):
+            return
+        vecs = normalize(embeddings)
+        metadatas = metadatas or [{}] * len(ids)
+        with self.lock:
+            if self.info["dim"] is None:
+                self.info["dim"] = vecs.shape[1]
+            if vecs.shape[1] != self.info["dim"]:
+                raise ValueError(f"expected {self.info['dim']}-dim embeddings, got {vecs.shape[1]}")
+            rows_by_id = self._id_index()
+            stale = [rows_by_id.pop(i) for i in ids if i in rows_by_id]
+            start, n = self.info["count"], len(ids)
+            self._grow(start + n)
+            if stale:
+                self.alive[stale] = 0
+            if self.info["dtype"] == "int8":
+                q, scale = quantize_int8(vecs)
+                self.vectors[start:start + n] = q
+                self.scales[start:start + n] = scale
+            else:
+                self.vectors[start:start + n] = vecs.astype(np.float16)
+                self.scales[start:start + n] = 1.0
+            with open(os.path.join(self.path, "meta.jsonl"), "ab") as f:
+                pos = f.tell()
+                for j, (doc_id, text, meta) in enumerate(zip(ids, documents, metadatas)):
+                    line = (json.dumps({"id": doc_id, "text": text, "meta": meta or {}}, default=str) + "\n").encode()
+                    self.offsets[start + j] = pos
+                    f.write(line)
+                    pos += len(line)
+                    rows_by_id[doc_id] = start + j
+                    self._rows_by_path.setdefault((meta or {}).get("path"), []).append(start + j)
+            self.alive[start:start + n] = 1
+            self.info["count"] = start + n
+            self.flush()
+
+    def delete_paths(self, paths: Iterable[str]):
+        """Tombstone every row whose metadata path is one of `paths`."""
+        with self.lock:
+            rows_by_id = self._id_index()
+            rows = [r for p in paths for r in self._rows_by_path.pop(p, [])]
+            if rows:
+                self.alive[rows] = 0
+                gone = set(rows)
+                for doc_id in [i for i, r in rows_by_id.items() if r in gone]:
+                    del rows_by_id[doc_id]
+                self.flush()
+
+    def clear(self):
+        with self.lock:
+            self.vectors = self.scales = self.alive = self.offsets = None
+            for name in _FILES + ("meta.jsonl",):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    pass
+            self.info.update(count=0, capacity=0, extra={})
+            self._rows_by_id = None
+            self.flush()
+
+    # -- reads --------------------------------------------------------------
+
+    def _records(self, rows: Iterable[int]):
+        path = os.path.join(self.path, "meta.jsonl")
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            for row in rows:
+                f.seek(int(self.offsets[row]))
+                yield row, json.loads(f.readline())
+
+    def search_rows(self, queries, k: int, block_rows: int = BLOCK_ROWS) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k (scores, rows) for each query row, best first; shape (n_queries, k).
+        Queries are scored together: stored rows are dequantised CONVERT_ROWS at a time
+        into a reused cache-sized float32 buffer and multiplied in, and top-k candidates
+        are taken once per block_rows.
+        """
+        q = normalize(queries)
+        n = self.info["count"]
+        k = min(k, n)
+        best_s = np.full((len(q), 0), -np.inf, dtype=np.float32)
+        best_r = np.zeros((len(q), 0), dtype=np.int64)
+        if not k:
+            return best_s, best_r
+        int8 = self.info["dtype"] == "int8"
+        buf = np.empty((min(CONVERT_ROWS, n), self.info["dim"]), dtype=np.float32)
+        scores = np.empty((len(q), min(block_rows, n)), dtype=np.float32)
+        for s in range(0, n, block_rows):
+            e = min(s + block_rows, n)
+            for c in range(s, e, CONVERT_ROWS):
+                ce = min(c + CONVERT_ROWS, e)
+                rows = buf[:ce - c]
+                np.copyto(rows, self.vectors[c:ce], casting="unsafe")
+                np.matmul(q, rows.T, out=scores[:, c - s:ce - s])
+            block = scores[:, :e - s]
+            if int8:
+                block *= self.scales[s:e]
+            block[:, self.alive[s:e] == 0] = -np.inf
+            kk = min(k, e - s)
+            part = np.argpartition(-block, kk - 1, axis=1)[:, :kk]
+            best_s = np.concatenate([best_s, np.take_along_axis(block, part, 1)], axis=1)
+            best_r = np.concatenate([best_r, part + s], axis=1)
+            if best_s.shape[1] > k:
+                keep = np.argpartition(-best_s, k - 1, axis=1)[:, :k]
+                best_s, best_r = np.take_along_axis(best_s, keep, 1), np.take_along_axis(best_r, keep, 1)
+        order = np.argsort(-best_s, axis=1, kind="stable")
+        return np.take_along_axis(best_s, order, 1), np.take_along_axis(best_r, order, 1)
+
+    def search(self, query, k: int = 5) -> List[Tuple[str, float, str, dict]]:
+        """Top-k (id, cosine score, text, metadata) for one query vector."""
+        with self.lock:
+            scores, rows = self.search_rows(query, k)
+            hits = [(int(r), float(s)) for r, s in zip(rows[0], scores[0]) if np.isfinite(s)]
+            recs = dict(self._records(r for r, _ in hits))
+            return [(recs[r]["id"], s, recs[r]["text"], recs[r]["meta"]) for r, s in hits]
@@ -0,0 +1,149 @@
+"""
+Process-wide cache of loaded indexes, vector-store clients and embedding models.
+
+Loading a persisted index or an embedding model costs seconds; tools call these
+helpers instead so only the first query against a data directory pays for it.
+
+Entries are keyed by (kind, key) and carry a version. A lookup with a different
+version reloads; for indexes the version is taken from the registry entry
+(its timestamp and last_data_update), so an index rebuilt by another tool or
+process is picked up. Least-recently-used entries are evicted once the estimated
+total size exceeds the budget (EDA_INDEX_CACHE_MB, default 2048).
+"""
+import os
+import threading
+from concurrent.futures import Future
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+DEFAULT_BUDGET_BYTES = int(os.environ.get("EDA_INDEX_CACHE_MB", "2048")) << 20
+
+def dir_size(path: str) -> int:
+    """Total size of the files under path (a proxy for a loaded index's footprint)."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+def dir_version(path: str) -> float:
+    """Latest mtime under path; a cheap version for stores that have no registry entry."""
+    latest = 0.0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                latest = max(latest, os.path.getmtime(os.path.join(root, f)))
+            except OSError:
+                pass
+    return latest
+
+def model_size(model: Any) -> int:
+    """Parameter bytes of a torch-backed model (HuggingFaceEmbedding wraps one in _model)."""
+    inner = getattr(model, "_model", model)
+    try:
+        return sum(p.numel() * p.element_size() for p in inner.parameters())
+    except Exception:
+        return 0
+
+def registry_version(entry: Optional[dict]) -> tuple:
+    """Index version from a registry entry; changes whenever the entry is rewritten."""
+    if not entry:
+        return (None, None)
+    return (entry.get("timestamp"), entry.get("last_data_update"))
+
+class LRUCache:
+    """Thread-safe LRU of (kind, key) -> (version, value, size_bytes) under a byte budget."""
+
+    def __init__(self, budget_bytes: int = DEFAULT_BUDGET_BYTES):
+        self.budget = budget_bytes
+        self.items = OrderedDict()
+        self.lock = threading.RLock()  # dictionary bookkeeping only; never held while loading
+        self.loading = {}  # (kind, key, version) -> Future of the load in progress
+        self.hits = self.misses = 0
+
+    def get(self, kind: str, key: Hashable, version: Hashable = None):
+        with self.lock:
+            item = self.items.get((kind, key))
+            if item is None or item[0] != version:
+                self.misses += 1
+                return None
+            self.items.move_to_end((kind, key))
+            self.hits += 1
+            return item[1]
+
+    def put(self, kind: str, key: Hashable, value: Any, version: Hashable = None, size_bytes: int = 0):
+        with self.lock:
+            self.items[(kind, key)] = (version, value, size_bytes)
+            self.items.move_to_end((kind, key))
+            total = sum(item[2] for item in self.items.values())
+            while total > self.budget and len(self.items) > 1:
+                _, (_, _, size) = self.items.popitem(last=False)
+                total -= size
+
+    def get_or_load(self, kind: str, key: Hashable, loader: Callable[[], Any], version: Hashable = None,
+                    size_of: Callable[[Any], int] = lambda v: 0):
+        """
+        The cached value, or loader()'s result. Concurrent first calls for one entry
+        share a single load; loads of other entries and cache hits do not wait for it.
+        """
+        with self.lock:
+            value = self.get(kind, key, version)
+            if value is not None:
+                return value
+            pending = self.loading.get((kind, key, version))
+            owner = pending is None
+            if owner:
+                pending = self.loading[(kind, key, version)] = Future()
+        if not owner:
+            return pending.result()  # re-raises the loader's exception
+        try:
+            value = loader()
+            self.put(kind, key, value, version, size_of(value))
+            pending.set_result(value)
+            return value
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.loading.pop((kind, key, version), None)
+
+    def invalidate(self, kind: Optional[str] = None, key: Optional[Hashable] = None):
+        with self.lock:
+            for k in [k for k in self.items if (kind is None or k[0] == kind) and (key is None or k[1] == key)]:
+                del self.items[k]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"entries": len(self.items), "bytes": sum(i[2] for i in self.items.values()),
+                    "budget": self.budget, "hits": self.hits, "misses": self.misses}
+
+CACHE = LRUCache()
+
+_dir_locks = {}
+_dir_locks_lock = threading.Lock()
+
+def dir_lock(path: str) -> threading.Lock:
+    """One lock per directory, held by tools while they check and update that directory's index."""
+    with _dir_locks_lock:
+        return _dir_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+def get_embedding_model(backend: str, model_name: str, factory: Callable[[str], Any]):
+    """One instance per (backend, model_name) per process; factory(model_name) builds it."""
+    return CACHE.get_or_load("embed", (backend, model_name), lambda: factory(model_name), size_of=model_size)
+
+def get_index(persist_dir: str, version: Hashable, loader: Callable[[], Any]):
+    """A loaded index for persist_dir, reloaded when `version` differs from the cached one."""
+    return CACHE.get_or_load("index", os.path.abspath(persist_dir), loader, version,
+                             size_of=lambda _: dir_size(persist_dir))
+
+def put_index(persist_dir: str, version: Hashable, index: Any):
+    """Store an index the caller just built or updated in place."""
+    CACHE.put("index", os.path.abspath(persist_dir), index, version, dir_size(persist_dir))
+
+def get_client(persist_dir: str, factory: Callable[[], Any]):
+    """A vector-store client per persist directory (e.g. a chromadb client)."""
+    return CACHE.get_or_load("client", os.path.abspath(persist_dir), factory)
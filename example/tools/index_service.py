@@ -0,0 +1,206 @@
+"""
+Background index builder: a job queue and worker thread that build and refresh
+the index of every registered data directory ahead of queries.
+
+Builds are double-buffered. Each build writes a new generation directory
+(<data_dir>/.cache/generations/<n>/) while queries keep using the current one.
+The swap is a single registry upsert that points cache_file_directory at the
+new generation, plus putting the loaded index into index_cache. Queries that
+arrive mid-build are served from the previous generation. Older generations
+beyond the last KEEP_GENERATIONS are deleted.
+
+A scheduler thread re-queues directories whose change detector reports changes
+every EDA_REFRESH_SECONDS (default 30). The builder is pluggable. The default is
+tool_rag.refresh_generation (llama-index), imported on first use.
+
+  service = index_service.start_service()     # process-wide; mcp_server.py does this
+  service.reindex(data_dir)                   # queue one directory (or all with None)
+  service.status()                            # [{data_directory, state, generation, ...}]
+"""
+import os
+import sys
+import time
+import queue
+import shutil
+import datetime
+import threading
+from typing import Callable, Dict, List, Optional
+
+try:
+    from . import change_detector, registry_store
+except ImportError:  # run from inside tools/
+    import change_detector, registry_store
+
+REFRESH_SECONDS = float(os.environ.get("EDA_REFRESH_SECONDS", "30"))
+KEEP_GENERATIONS = 2
+
+def generations_dir(data_dir: str) -> str:
+    return os.path.join(os.path.abspath(data_dir), ".cache", "generations")
+
+def next_generation_dir(data_dir: str) -> str:
+    root = generations_dir(data_dir)
+    os.makedirs(root, exist_ok=True)
+    numbers = [int(n) for n in os.listdir(root) if n.isdigit()]
+    return os.path.join(root, f"{max(numbers, default=0) + 1:06d}")
+
+def prune_generations(data_dir: str, current: str, keep: int = KEEP_GENERATIONS):
+    """Deletes generation directories older than the newest `keep`, never the current one."""
+    root = generations_dir(data_dir)
+    if not os.path.isdir(root):
+        return
+    names = sorted((n for n in os.listdir(root) if n.isdigit()), reverse=True)
+    for name in names[keep:]:
+        path = os.path.join(root, name)
+        if os.path.abspath(path) != os.path.abspath(current):
+            shutil.rmtree(path, ignore_errors=True)
+
+def _default_builder(data_dir: str) -> dict:
+    try:
+        from .tool_rag import refresh_generation
+    except ImportError:
+        from tool_rag import refresh_generation
+    return refresh_generation(data_dir)
+
+class IndexService:
+    """
+    builder(data_dir) -> dict brings data_dir's index up to date (a new generation
+    when files changed) and returns a summary, e.g. {"generation", "files", "changed"}.
+    """
+
+    def __init__(self, builder: Callable[[str], dict] = _default_builder, workers: int = 1,
+                 refresh_seconds: float = REFRESH_SECONDS):
+        self.builder = builder
+        self.refresh_seconds = refresh_seconds
+        self.jobs: "queue.Queue[str]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.state: Dict[str, dict] = {}
+        self.pending: set = set()   # queued, not yet picked up
+        self.building: set = set()
+        self.done: Dict[str, threading.Event] = {}
+        self.stop_event = threading.Event()
+        self.threads = [threading.Thread(target=self._worker, name=f"index-worker-{i}", daemon=True)
+                        for i in range(max(1, workers))]
+        self.threads.append(threading.Thread(target=self._scheduler, name="index-scheduler", daemon=True))
+
+    def start(self) -> "IndexService":
+        for t in self.threads:
+            t.start()
+        self.reindex()  # warm every registered directory
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    # -- jobs ---------------------------------------------------------------
+
+    def reindex(self, data_dir: Optional[str] = None) -> List[str]:
+        """Queues one directory, or every registered one; returns the directories queued."""
+        if data_dir:
+            dirs = [os.path.abspath(data_dir)]
+        else:
+            dirs = [e["data_directory"] for e in registry_store.default_registry().entries()]
+        queued = []
+        with self.lock:
+            for d in dirs:
+                if d in self.pending:
+                    continue  # already waiting for a worker
+                self.pending.add(d)
+                st = self.state.setdefault(d, {})
+                if d not in self.building:
+                    st["state"] = "queued"
+                self.done.setdefault(d, threading.Event()).clear()
+                self.jobs.put(d)
+                queued.append(d)
+        return queued
+
+    def wait(self, data_dir: str, timeout: Optional[float] = None) -> bool:
+        """Blocks until no build of the directory is queued or running."""
+        with self.lock:
+            event = self.done.get(os.path.abspath(data_dir))
+        return event.wait(timeout) if event else True
+
+    def _worker(self):
+        while not self.stop_event.is_set():
+            try:
+                data_dir = self.jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self.lock:
+                if data_dir in self.building:  # another worker is on it: retry when it is done
+                    self.jobs.put(data_dir)
+                    retry = True
+                else:
+                    retry = False
+                    self.pending.discard(data_dir)  # requests from now on queue a fresh build
+                    self.building.add(data_dir)
+                    st = self.state.setdefault(data_dir, {})
+                    st.update(state="building", started_at=time.time())
+            if retry:
+                time.sleep(0.1)
+                continue
+            t0 = time.perf_counter()
+            try:
+                summary = self.builder(data_dir) or {}
+                result = {"state": "ready", "error": None}
+            except Exception as e:  # keep serving the previous generation
+                print(f"[warn] index build failed for {data_dir}: {e}", file=sys.stderr)
+                summary, result = {}, {"state": "error", "error": f"{type(e).__name__}: {e}"}
+            with self.lock:
+                self.building.discard(data_dir)
+                st.update(summary, **result, last_build_seconds=round(time.perf_counter() - t0, 3),
+                          finished_at=datetime.datetime.now().isoformat(timespec="seconds"))
+                if data_dir in self.pending:
+                    st["state"] = "queued"
+                else:
+                    self.done[data_dir].set()
+
+    def _scheduler(self):
+        while not self.stop_event.wait(self.refresh_seconds):
+            for entry in registry_store.default_registry().entries():
+                d = entry["data_directory"]
+                with self.lock:
+                    busy = self.state.get(d, {}).get("state") in ("queued", "building")
+                if busy or not os.path.isdir(d):
+                    continue
+                try:
+                    stale = change_detector.get_detector(d, recursive=False).has_changes()
+                except OSError:
+                    continue
+                if stale:
+                    self.reindex(d)
+
+    # -- status -------------------------------------------------------------
+
+    def status(self) -> List[dict]:
+        """One row per registered (or queued) directory: build state, generation, timings."""
+        rows = {}
+        for entry in registry_store.default_registry().entries():
+            rows[entry["data_directory"]] = {
+                "data_directory": entry["data_directory"],
+                "generation": entry.get("cache_file_directory"),
+                "indexed_at": entry.get("timestamp"),
+                "state": "idle",
+            }
+        with self.lock:
+            for d, st in self.state.items():
+                row = rows.setdefault(d, {"data_directory": d, "generation": st.get("generation")})
+                # the registry is authoritative for the generation being served
+                row.update({k: v for k, v in st.items() if k not in ("queued_at", "started_at", "generation")})
+                if st.get("state") == "building":
+                    row["building_for_seconds"] = round(time.time() - st["started_at"], 1)
+        return sorted(rows.values(), key=lambda r: r["data_directory"])
+
+_service: Optional[IndexService] = None
+_service_lock = threading.Lock()
+
+def start_service(**kwargs) -> IndexService:
+    """Starts the process-wide service once; later calls return it."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = IndexService(**kwargs).start()
+        return _service
+
+def active() -> Optional[IndexService]:
+    """The running service, if this process started one (tools then never build inline)."""
+    return _service
@@ -0,0 +1,187 @@
+"""
+Streaming indexing pipeline for vector stores (used by ChromaRAGTool).
+
+  walk data_dir -> read files in a thread pool -> split into overlapping chunks
+  -> embed in fixed-size batches -> collection.add() per batch
+
+Files are read incrementally (64 KB blocks through an incremental UTF-8 decoder),
+so a large file never sits in memory whole. Each file is validated as UTF-8 in a
+first pass, so an undecodable file is skipped without any of its chunks indexed.
+Reader threads hand chunks to the embedding loop through a bounded queue; peak
+memory is roughly (queue_size + batch_size) chunks plus one block per reader,
+whatever the corpus size.
+
+Chunk ids are stable, "<relative path>#<chunk number>", so re-indexing the same
+data yields the same ids. Hidden files and directories (e.g. .cache/ holding the
+store itself) are skipped.
+"""
+import os
+import sys
+import time
+import queue
+import codecs
+import threading
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+READ_BLOCK = 64 * 1024
+SNIFF_BYTES = 8 * 1024
+
+def iter_files(data_dir: str) -> Iterator[str]:
+    """Non-hidden files under data_dir, in a stable (sorted) order."""
+    for root, dirs, files in os.walk(data_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for f in sorted(files):
+            if not f.startswith("."):
+                yield os.path.join(root, f)
+
+def looks_like_text(path: str) -> bool:
+    """
+    No NUL bytes in the first few KB and valid UTF-8 throughout (the old reader
+    skipped undecodable files). The whole file is decoded here, block by block,
+    so a file is either chunked completely or skipped before any chunk is emitted.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as f:
+        block = f.read(SNIFF_BYTES)
+        if b"\x00" in block:
+            return False
+        try:
+            while block:
+                decoder.decode(block, final=False)
+                block = f.read(READ_BLOCK)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return False
+    return True
+
+def iter_chunks(path: str, chunk_chars: int = 1000, overlap: int = 200) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (start_char, text) chunks of about chunk_chars characters, each sharing
+    `overlap` characters with the previous one. A chunk ends at the last whitespace
+    in its second half when there is one, so words are not cut.
+    """
+    if overlap >= chunk_chars:
+        raise ValueError("overlap must be smaller than chunk_chars")
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, buf_start = "", 0, 0  # buf[pos:] is not chunked yet and starts at character buf_start
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_BLOCK)
+            buf = buf[pos:] + decoder.decode(block, final=not block)  # trimmed once per block
+            pos = 0
+            while len(buf) - pos >= chunk_chars or (not block and pos < len(buf)):
+                end = min(pos + chunk_chars, len(buf))
+                if end - pos == chunk_chars:
+                    lo = pos + max(chunk_chars // 2, overlap + 1)
+                    cut = max(buf.rfind(" ", lo, end), buf.rfind("\n", lo, end))
+                    end = cut + 1 if cut >= 0 else end
+                text = buf[pos:end].strip()
+                if text:
+                    yield buf_start, text
+                if end >= len(buf) and not block:
+                    break
+                step = max(end - pos - overlap, 1)
+                pos, buf_start = pos + step, buf_start + step
+            if not block:
+                return
+
+def _put(q: "queue.Queue", item, stop: threading.Event) -> bool:
+    """Blocking put that gives up once `stop` is set (the consumer failed)."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+class IndexingPipeline:
+    """
+    embed_fn(list_of_texts) -> list of vectors; add_fn(ids=, documents=, embeddings=, metadatas=)
+    is usually collection.add. progress(stats) is called every `progress_every` batches.
+    """
+
+    def __init__(self, embed_fn: Callable[[List[str]], Sequence], add_fn: Callable[..., None],
+                 chunk_chars: int = 1000, overlap: int = 200, batch_size: int = 64,
+                 read_workers: int = 4, queue_size: int = 256,
+                 progress: Optional[Callable[[dict], None]] = None, progress_every: int = 10):
+        self.embed_fn, self.add_fn = embed_fn, add_fn
+        self.chunk_chars, self.overlap = chunk_chars, overlap
+        self.batch_size, self.read_workers, self.queue_size = batch_size, read_workers, queue_size
+        self.progress, self.progress_every = progress, progress_every
+        self._lock = threading.Lock()
+
+    def _reader(self, data_dir: str, files: "queue.Queue", out: "queue.Queue", stop: threading.Event, stats: dict):
+        while not stop.is_set():
+            try:
+                path = files.get_nowait()
+            except queue.Empty:
+                break
+            rel = os.path.relpath(path, data_dir).replace(os.sep, "/")
+            try:
+                if not looks_like_text(path):
+                    stats["skipped"].append(rel)
+                    continue
+                for i, (start, text) in enumerate(iter_chunks(path, self.chunk_chars, self.overlap)):
+                    if not _put(out, (f"{rel}#{i}", text, {"path": rel, "chunk": i, "start": start}), stop):
+                        return
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Error reading {path}: {e}", file=sys.stderr)
+                stats["skipped"].append(rel)
+                continue
+            with self._lock:
+                stats["bytes"] += os.path.getsize(path)
+                stats["files"] += 1
+        _put(out, None, stop)  # this reader is done
+
+    def run(self, data_dir: str) -> dict:
+        """Index every text file under data_dir; returns counts and timings."""
+        files: "queue.Queue" = queue.Queue()
+        for path in iter_files(data_dir):
+            files.put(path)
+        out: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        stats = {"files": 0, "bytes": 0, "chunks": 0, "batches": 0, "skipped": [], "seconds": 0.0}
+        workers = [threading.Thread(target=self._reader, args=(data_dir, files, out, stop, stats), daemon=True)
+                   for _ in range(max(1, self.read_workers))]
+        t0 = time.perf_counter()
+        for w in workers:
+            w.start()
+        try:
+            batch, running = [], len(workers)
+            while running:
+                item = out.get()
+                if item is None:
+                    running -= 1
+                    continue
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, stats, t0)
+                    batch = []
+            if batch:
+                self._flush(batch, stats, t0)
+        finally:
+            stop.set()
+            for w in workers:
+                w.join()
+        stats["seconds"] = time.perf_counter() - t0
+        if self.progress:
+            self.progress(dict(stats, done=True))
+        return stats
+
+    def _flush(self, batch: list, stats: dict, t0: float):
+        ids, docs, metas = zip(*batch)
+        embeddings = self.embed_fn(list(docs))
+        if hasattr(embeddings, "tolist"):
+            embeddings = embeddings.tolist()
+        self.add_fn(ids=list(ids), documents=list(docs), embeddings=embeddings, metadatas=list(metas))
+        stats["chunks"] += len(batch)
+        stats["batches"] += 1
+        if self.progress and stats["batches"] % self.progress_every == 0:
+            self.progress(dict(stats, seconds=time.perf_counter() - t0, done=False))
+
+def print_progress(stats: dict):
+    rate = stats["chunks"] / stats["seconds"] if stats.get("seconds") else 0.0
+    state = "done" if stats.get("done") else "indexing"
+    print(f"[INFO] {state}: {stats['files']} files, {stats['chunks']} chunks, "
+          f"{stats['bytes'] / 2**20:.1f} MB read, {rate:,.0f} chunks/s", file=sys.stderr)
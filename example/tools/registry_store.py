@@ -0,0 +1,217 @@
+"""
+Data registry in SQLite (WAL): one row per registered data directory, keyed
+by its absolute path, plus per-file child rows (size, mtime, sha256, doc ids).
+
+Replaces data_registry.yaml, which was reloaded and rewritten whole on every
+update and raced between concurrent agents. Every upsert is one
+BEGIN IMMEDIATE transaction, so concurrent writers serialise on SQLite's lock
+(busy_timeout) instead of losing each other's updates. Readers never block.
+Lookups are primary-key reads.
+
+An existing data_registry.yaml is imported once, the first time the database is
+created next to it; the YAML file is left in place.
+
+  registry = registry_store.default_registry()
+  entry = registry.get(data_dir)                 # dict like the old YAML entries, or None
+  registry.upsert(data_dir, cache_dir, last_data_update=..., files=files_state)
+"""
+import os
+import sys
+import json
+import sqlite3
+import contextlib
+import datetime
+import threading
+from typing import Dict, List, Optional
+
+import yaml
+
+REGISTRY_DB = os.environ.get("EDA_REGISTRY_DB", "data_registry.sqlite")
+LEGACY_YAML = "data_registry.yaml"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+  data_directory TEXT PRIMARY KEY,
+  cache_file_directory TEXT,
+  data_format TEXT,
+  timestamp TEXT,
+  status TEXT,
+  last_data_update REAL,
+  metadata TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+  data_directory TEXT NOT NULL REFERENCES entries(data_directory) ON DELETE CASCADE,
+  path TEXT NOT NULL,
+  size INTEGER,
+  mtime REAL,
+  sha256 TEXT,
+  doc_ids TEXT,
+  PRIMARY KEY (data_directory, path)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+"""
+_ENTRY_COLUMNS = ("data_directory", "cache_file_directory", "data_format", "timestamp", "status", "last_data_update")
+
+class Registry:
+    """Connections are per thread; every method is safe to call from any thread or process."""
+
+    def __init__(self, path: str = REGISTRY_DB, legacy_yaml: Optional[str] = LEGACY_YAML):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+        if legacy_yaml:
+            self.migrate_yaml(legacy_yaml)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def _write(self):
+        """One write transaction, taking the write lock up front."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # -- reads --------------------------------------------------------------
+
+    def get(self, data_directory: str, with_files: bool = True) -> Optional[dict]:
+        """
+        The entry for this directory (matched by absolute path), or None. With
+        with_files=False, metadata["has_files"] says whether file rows exist instead.
+        """
+        conn = self._conn()
+        key = os.path.abspath(data_directory)
+        row = conn.execute("SELECT %s, metadata FROM entries WHERE data_directory = ?"
+                           % ", ".join(_ENTRY_COLUMNS), (key,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(_ENTRY_COLUMNS, row[:-1]))
+        entry["metadata"] = json.loads(row[-1] or "{}")
+        if with_files and entry["metadata"].pop("has_files", False):
+            entry["metadata"]["files"] = self.files(key)
+        return entry
+
+    def files(self, data_directory: str) -> Dict[str, dict]:
+        """{abs_path: {"size", "mtime", "sha256"[, "doc_ids"]}} as recorded by scan_files()."""
+        out = {}
+        for path, size, mtime, sha, doc_ids in self._conn().execute(
+                "SELECT path, size, mtime, sha256, doc_ids FROM files WHERE data_directory = ?",
+                (os.path.abspath(data_directory),)):
+            out[path] = {"size": size, "mtime": mtime, "sha256": sha}
+            if doc_ids is not None:
+                out[path]["doc_ids"] = json.loads(doc_ids)
+        return out
+
+    def entries(self, with_files: bool = False) -> List[dict]:
+        keys = [r[0] for r in self._conn().execute("SELECT data_directory FROM entries ORDER BY data_directory")]
+        return [e for e in (self.get(k, with_files) for k in keys) if e]
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # -- writes -------------------------------------------------------------
+
+    def upsert(self, data_directory: str, cache_file_directory: str, last_data_update: float = 0.0,
+               status: str = "rag_indexed", data_format: str = "", files: Optional[Dict[str, dict]] = None,
+               metadata: Optional[dict] = None):
+        """
+        Insert or replace the entry for data_directory in one transaction. When
+        `files` is given the file rows become exactly that set (unchanged rows are
+        not rewritten); otherwise existing file rows are kept.
+        """
+        key = os.path.abspath(data_directory)
+        metadata = dict(metadata or {})
+        metadata.pop("files", None)
+        with self._write() as conn:
+            if files is None:
+                has_files = conn.execute("SELECT 1 FROM files WHERE data_directory = ? LIMIT 1", (key,)).fetchone()
+            else:
+                has_files = True
+            metadata["has_files"] = bool(has_files)
+            conn.execute(
+                "INSERT INTO entries VALUES (?,?,?,?,?,?,?) ON CONFLICT(data_directory) DO UPDATE SET "
+                "cache_file_directory=excluded.cache_file_directory, data_format=excluded.data_format, "
+                "timestamp=excluded.timestamp, status=excluded.status, "
+                "last_data_update=excluded.last_data_update, metadata=excluded.metadata",
+                (key, cache_file_directory, data_format, datetime.datetime.now().isoformat(), status,
+                 last_data_update, json.dumps(metadata)))
+            if files is not None:
+                self._replace_files(conn, key, files)
+
+    def _replace_files(self, conn: sqlite3.Connection, key: str, files: Dict[str, dict]):
+        current = {path: (size, mtime, sha, doc_ids) for path, size, mtime, sha, doc_ids in conn.execute(
+            "SELECT path, size, mtime, sha256, doc_ids FROM files WHERE data_directory = ?", (key,))}
+        gone = [(key, p) for p in current if p not in files]
+        conn.executemany("DELETE FROM files WHERE data_directory = ? AND path = ?", gone)
+        rows = []
+        for path, f in files.items():
+            doc_ids = json.dumps(f["doc_ids"]) if "doc_ids" in f else None
+            row = (f.get("size"), f.get("mtime"), f.get("sha256"), doc_ids)
+            if current.get(path) != row:
+                rows.append((key, path) + row)
+        conn.executemany("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?,?)", rows)
+
+    def delete(self, data_directory: str) -> bool:
+        with self._write() as conn:
+            return conn.execute("DELETE FROM entries WHERE data_directory = ?",
+                                (os.path.abspath(data_directory),)).rowcount > 0
+
+    def clear(self) -> List[dict]:
+        """Removes every entry; returns the removed entries (without files)."""
+        removed = self.entries()
+        with self._write() as conn:
+            conn.execute("DELETE FROM files")
+            conn.execute("DELETE FROM entries")
+        return removed
+
+    def migrate_yaml(self, yaml_path: str) -> int:
+        """Imports a data_registry.yaml once (recorded in settings); returns entries imported."""
+        if not os.path.exists(yaml_path):
+            return 0
+        marker = "migrated:" + os.path.abspath(yaml_path)
+        if self._conn().execute("SELECT 1 FROM settings WHERE key = ?", (marker,)).fetchone():
+            return 0
+        with open(yaml_path, "r") as f:
+            old = yaml.safe_load(f) or []
+        with self._write() as conn:
+            if conn.execute("SELECT 1 FROM settings WHERE key = ?", (marker,)).fetchone():
+                return 0  # another process migrated it first
+            for e in old:
+                if not e.get("data_directory"):
+                    continue
+                key = os.path.abspath(e["data_directory"])
+                metadata = dict(e.get("metadata") or {})
+                files = metadata.pop("files", None)
+                metadata["has_files"] = files is not None
+                conn.execute("INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?)",
+                             (key, e.get("cache_file_directory"), e.get("data_format", ""),
+                              e.get("timestamp"), e.get("status"), e.get("last_data_update"),
+                              json.dumps(metadata, default=str)))
+                if files is not None:
+                    self._replace_files(conn, key, files)
+            conn.execute("INSERT INTO settings VALUES (?, ?)", (marker, datetime.datetime.now().isoformat()))
+        print(f"[INFO] Migrated {len(old)} registry entries from {yaml_path} to {self.path}", file=sys.stderr)
+        return len(old)
+
+_registries: Dict[str, Registry] = {}
+_registries_lock = threading.Lock()
+
+def default_registry(path: Optional[str] = None) -> Registry:
+    """The process-wide Registry for `path` (default REGISTRY_DB, relative to the cwd like the YAML was)."""
+    path = os.path.abspath(path or REGISTRY_DB)
+    with _registries_lock:
+        if path not in _registries:
+            _registries[path] = Registry(path, os.path.join(os.path.dirname(path), LEGACY_YAML))
+        return _registries[path]
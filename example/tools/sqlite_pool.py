@@ -0,0 +1,152 @@
+"""
+Pooled SQLite connections and bounded result streaming for SQL tools.
+
+Opening a connection per query re-reads the schema, discards the page cache and
+loses the compiled statements every time. The pool instead keeps idle
+connections per database file and reuses them:
+  - read-only connections are opened through the URI `file:...?mode=ro`, with
+    `PRAGMA query_only`, `mmap_size` (EDA_SQLITE_MMAP_MB, default 256) and
+    `cache_size` (EDA_SQLITE_CACHE_MB, default 64)
+  - every connection keeps a compiled-statement cache (`cached_statements`), so
+    repeated queries skip parsing and planning
+  - pool keys include the file's device and inode, so a database that was
+    replaced on disk gets fresh connections
+
+stream_rows() fetches with fetchmany() and stops at a row cap or a byte cap, so
+a large SELECT never has to fit in memory or in the LLM context. The rows past
+the cap can be written to a TSV spill file instead of being dropped.
+
+  with POOL.connection(db_path) as conn:
+      cur = conn.execute(sql)
+      result = stream_rows(cur, max_rows=200, spill_path="/tmp/q.tsv")
+"""
+import os
+import queue
+import sqlite3
+import threading
+import contextlib
+import urllib.parse
+from typing import Dict, Iterator, Optional, Tuple
+
+MMAP_MB = int(os.environ.get("EDA_SQLITE_MMAP_MB", "256"))
+CACHE_MB = int(os.environ.get("EDA_SQLITE_CACHE_MB", "64"))
+MAX_IDLE = int(os.environ.get("EDA_SQLITE_POOL_SIZE", "4"))  # idle connections kept per database
+STATEMENT_CACHE = 256
+FETCH_ROWS = 512
+
+class SQLitePool:
+    def __init__(self, max_idle: int = MAX_IDLE):
+        self.max_idle = max_idle
+        self.lock = threading.Lock()
+        self.idle: Dict[Tuple, "queue.LifoQueue[sqlite3.Connection]"] = {}
+        self.stats = {"opened": 0, "reused": 0}
+
+    @staticmethod
+    def _key(db_path: str, read_only: bool) -> Tuple:
+        path = os.path.abspath(db_path)
+        st = os.stat(path)  # raises FileNotFoundError instead of creating an empty database
+        return path, st.st_dev, st.st_ino, read_only
+
+    def _open(self, path: str, read_only: bool) -> sqlite3.Connection:
+        if read_only:
+            uri = "file:" + urllib.parse.quote(path) + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=STATEMENT_CACHE)
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn = sqlite3.connect(path, check_same_thread=False, cached_statements=STATEMENT_CACHE)
+        conn.execute(f"PRAGMA mmap_size = {MMAP_MB * 1024 * 1024}")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_MB * 1024}")  # negative: KiB
+        self.stats["opened"] += 1
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self, db_path: str, read_only: bool = True) -> Iterator[sqlite3.Connection]:
+        """
+        Borrows a connection; it goes back to the pool on exit. An open transaction
+        is committed on success and rolled back on error, so the next borrower
+        starts clean.
+        """
+        key = self._key(db_path, read_only)
+        with self.lock:
+            idle = self.idle.setdefault(key, queue.LifoQueue())
+        try:
+            conn = idle.get_nowait()
+            self.stats["reused"] += 1
+        except queue.Empty:
+            conn = self._open(key[0], read_only)
+        ok = False
+        try:
+            yield conn
+            ok = True
+        finally:
+            try:
+                if conn.in_transaction:
+                    conn.commit() if ok else conn.rollback()
+                keep = idle.qsize() < self.max_idle
+            except sqlite3.Error:
+                keep = False
+            if keep:
+                idle.put(conn)
+            else:
+                conn.close()
+
+    def close(self, db_path: Optional[str] = None):
+        """Closes idle connections of one database, or of all of them."""
+        path = os.path.abspath(db_path) if db_path else None
+        with self.lock:
+            for key in [k for k in self.idle if path is None or k[0] == path]:
+                idle = self.idle.pop(key)
+                while not idle.empty():
+                    idle.get_nowait().close()
+
+POOL = SQLitePool()
+
+def _cell(value) -> str:
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    return str(value).replace("\t", " ").replace("\n", " ")
+
+def stream_rows(cursor: sqlite3.Cursor, max_rows: int = 200, max_bytes: int = 20000,
+                spill_path: Optional[str] = None) -> dict:
+    """
+    Formats a query's rows as ' | '-separated lines until max_rows or max_bytes is
+    reached. With spill_path, every row (including the ones shown) is also written
+    there as TSV. Without it, fetching stops at the cap.
+
+    Returns {"text", "columns", "shown", "total" (None when not counted),
+    "truncated", "spill_path"}.
+    """
+    columns = [d[0] for d in cursor.description]
+    lines = [" | ".join(columns)]
+    size = len(lines[0])
+    shown = total = 0
+    truncated = False
+    spill = open(spill_path, "w", encoding="utf-8") if spill_path else None
+    try:
+        if spill:
+            spill.write("\t".join(columns) + "\n")
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                break
+            for row in rows:
+                total += 1
+                if spill:
+                    spill.write("\t".join(_cell(v) for v in row) + "\n")
+                if truncated:
+                    continue
+                line = " | ".join(str(v) for v in row)
+                if shown >= max_rows or size + len(line) + 1 > max_bytes:
+                    truncated = True
+                    continue
+                lines.append(line)
+                size += len(line) + 1
+                shown += 1
+            if truncated and not spill:
+                break
+    finally:
+        if spill:
+            spill.close()
+    return {"text": "\n".join(lines), "columns": columns, "shown": shown,
+            "total": total if (spill or not truncated) else None,
+            "truncated": truncated, "spill_path": spill_path}
@@ -0,0 +1,396 @@
+"""
+Schema profiling and index advice for local SQLite sources.
+
+  - profile(db_path): tables, columns, indexes and ANALYZE statistics
+    (sqlite_stat1). It is cached in memory and in
+    <db_dir>/.cache/sqlite_profile/<name>.json, keyed by the file's size and
+    mtime, so the schema summary handed to the LLM normally costs no query at all.
+  - record_query(): the SQL tools log queries slower than EDA_SQLITE_SLOW_MS
+    (default 200) together with their EXPLAIN QUERY PLAN.
+  - advise(db_path, sql=None): suggests covering indexes for the tables a
+    query scans (equality columns, then one range column, then the other
+    columns the query reads). With no sql, it uses the slow-query log.
+    Parameters (?, :name) are planned as NULL, and the "before" plan is the
+    user's: indexes applied earlier to the shadow copy are left out of it.
+    apply=True creates the indexes in a shadow copy, keeps the ones the
+    planner searches (or scans instead of sorting) and drops the rest.
+
+The user's database is never written to. ANALYZE and CREATE INDEX only run on
+the shadow copy (<name>.shadow.db next to the profile). The shadow copy is
+refreshed with the backup API when the source changes, and indexes applied
+earlier are re-created on it.
+"""
+import os
+import sys
+import re
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+import urllib.parse
+from typing import Dict, List, Optional
+
+SLOW_MS = float(os.environ.get("EDA_SQLITE_SLOW_MS", "200"))
+MAX_INDEX_COLUMNS = 6  # beyond this a covering index costs more than it saves
+MIN_ROWS = 1000         # a scan of a smaller table is cheaper than maintaining an index
+KEYWORDS = {"where", "on", "join", "inner", "left", "right", "full", "cross", "outer", "natural", "group",
+            "order", "limit", "union", "having", "using", "as", "set", "values", "select", "window"}
+
+_lock = threading.Lock()
+_profiles: Dict[str, dict] = {}
+
+def cache_dir(db_path: str) -> str:
+    """<db_dir>/.cache/sqlite_profile, or a temp directory when the data directory is read-only."""
+    path = os.path.join(os.path.dirname(os.path.abspath(db_path)), ".cache", "sqlite_profile")
+    try:
+        os.makedirs(path, exist_ok=True)
+        if os.access(path, os.W_OK):
+            return path
+    except OSError:
+        pass
+    path = os.path.join(tempfile.gettempdir(), "eda_sqlite_profile",
+                        os.path.abspath(db_path).strip(os.sep).replace(os.sep, "_"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _signature(db_path: str) -> List[int]:
+    st = os.stat(db_path)
+    return [st.st_size, st.st_mtime_ns]
+
+def _paths(db_path: str) -> dict:
+    base = os.path.join(cache_dir(db_path), os.path.basename(db_path))
+    return {"profile": base + ".json", "shadow": base + ".shadow.db", "slow": base + ".slow.jsonl"}
+
+def _connect_ro(db_path: str) -> sqlite3.Connection:
+    return sqlite3.connect("file:" + urllib.parse.quote(os.path.abspath(db_path)) + "?mode=ro", uri=True)
+
+def _q(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+# -- shadow copy --------------------------------------------------------------
+
+def shadow_copy(db_path: str) -> str:
+    """Path of an up-to-date shadow copy of the database (ANALYZEd, with applied indexes)."""
+    db_path = os.path.abspath(db_path)
+    paths = _paths(db_path)
+    with _lock:
+        profile = _load_profile(db_path) or {}
+        if os.path.exists(paths["shadow"]) and profile.get("shadow_source") == _signature(db_path):
+            return paths["shadow"]
+        tmp = paths["shadow"] + ".tmp"
+        src, dst = _connect_ro(db_path), sqlite3.connect(tmp)
+        try:
+            src.backup(dst)  # consistent snapshot, even while the source is being written
+            for ddl in profile.get("applied_indexes", []):
+                try:
+                    dst.execute(ddl)
+                except sqlite3.Error as e:  # schema changed since the index was applied
+                    print(f"[warn] could not re-apply index on shadow copy: {e}", file=sys.stderr)
+            dst.execute("ANALYZE")
+            dst.commit()
+        finally:
+            src.close()
+            dst.close()
+        os.replace(tmp, paths["shadow"])
+        if profile:
+            profile["shadow_source"] = _signature(db_path)
+            _save_profile(db_path, profile)
+        return paths["shadow"]
+
+# -- profile ------------------------------------------------------------------
+
+def _load_profile(db_path: str) -> Optional[dict]:
+    if db_path in _profiles:
+        return _profiles[db_path]
+    try:
+        with open(_paths(db_path)["profile"], "r") as f:
+            _profiles[db_path] = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return _profiles[db_path]
+
+def _save_profile(db_path: str, profile: dict):
+    _profiles[db_path] = profile
+    path = _paths(db_path)["profile"]
+    with open(path + ".tmp", "w") as f:
+        json.dump(profile, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def _introspect(conn: sqlite3.Connection) -> List[dict]:
+    stats: Dict[tuple, str] = {}
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        stats = {(t, i): s for t, i, s in conn.execute("SELECT tbl, idx, stat FROM sqlite_stat1")}
+    tables = []
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                "AND name NOT LIKE 'sqlite_%' ORDER BY name").fetchall():
+        columns = [{"name": c[1], "type": c[2], "pk": c[5]}
+                   for c in conn.execute(f"PRAGMA table_info({_q(name)})")]
+        indexes = []
+        for _, idx, unique, origin, _ in conn.execute(f"PRAGMA index_list({_q(name)})").fetchall():
+            if idx.startswith("eda_idx_"):  # advisor index, exists only on the shadow copy
+                continue
+            cols = [r[2] for r in conn.execute(f"PRAGMA index_info({_q(idx)})")]
+            stat = stats.get((name, idx), "")
+            indexes.append({"name": idx, "columns": cols, "unique": bool(unique), "origin": origin,
+                            "rows_per_key": [int(x) for x in stat.split()[1:len(cols) + 1] if x.isdigit()]})
+        stat = stats.get((name, None)) or next((s for (t, _), s in stats.items() if t == name), "")
+        rows = int(stat.split()[0]) if stat else None
+        tables.append({"name": name, "rows": rows, "columns": columns, "indexes": indexes})
+    return tables
+
+def profile(db_path: str, refresh: bool = False) -> dict:
+    """Schema and statistics of the database; recomputed only when the file changed."""
+    db_path = os.path.abspath(db_path)
+    sig = _signature(db_path)
+    with _lock:
+        cached = _load_profile(db_path)
+        if cached and cached.get("source") == sig and not refresh:
+            return cached
+    shadow = shadow_copy(db_path)  # ANALYZE happens there, never on the original
+    conn = sqlite3.connect(shadow)
+    try:
+        tables = _introspect(conn)
+    finally:
+        conn.close()
+    with _lock:
+        previous = _load_profile(db_path) or {}
+        result = {"db_path": db_path, "source": sig, "shadow_source": sig,
+                  "profiled_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "tables": tables,
+                  "applied_indexes": previous.get("applied_indexes", [])}
+        _save_profile(db_path, result)
+    return result
+
+def schema_summary(db_path: str) -> str:
+    """Compact, LLM-friendly schema text: one block per table with row estimates and indexes."""
+    prof = profile(db_path)
+    lines = [f"Database {os.path.basename(db_path)} ({len(prof['tables'])} tables)"]
+    for t in prof["tables"]:
+        rows = f"~{t['rows']:,} rows" if t["rows"] is not None else "rows unknown"
+        cols = ", ".join(f"{c['name']} {c['type']}".strip() + (" PK" if c["pk"] else "") for c in t["columns"])
+        lines.append(f"table {t['name']} ({rows}): {cols}")
+        for idx in t["indexes"]:
+            kind = "unique index" if idx["unique"] else "index"
+            lines.append(f"  {kind} {idx['name']} ({', '.join(idx['columns'])})")
+    return "\n".join(lines)
+
+# -- slow queries -------------------------------------------------------------
+
+class _Nulls(dict):
+    """Binds NULL to every named parameter."""
+    def __missing__(self, key):
+        return None
+
+def _null_bindings(sql: str):
+    """NULL bindings for the statement's ?, ?NNN, :name, @name or $name parameters (planning only)."""
+    text = re.sub(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"", "", sql)
+    if re.search(r"[:@$][A-Za-z_]", text):
+        return _Nulls()
+    return (None,) * max([text.count("?")] + [int(n) for n in re.findall(r"\?(\d+)", text)])
+
+def query_plan(conn: sqlite3.Connection, sql: str, params=None) -> List[str]:
+    """EXPLAIN QUERY PLAN details; parameters the caller does not supply are bound to NULL."""
+    params = _null_bindings(sql) if params is None else params
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def _advisor_indexes(conn: sqlite3.Connection) -> List[str]:
+    return [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' "
+                                       "AND name LIKE 'eda\\_idx\\_%' ESCAPE '\\'")]
+
+def _plan_without_advice(shadow: sqlite3.Connection, sql: str) -> List[str]:
+    """The plan the user's database gets: advisor indexes applied earlier are dropped, then restored."""
+    advice = _advisor_indexes(shadow)
+    if not advice:
+        return query_plan(shadow, sql)
+    shadow.execute("SAVEPOINT plan_before")  # DDL is transactional in SQLite
+    try:
+        for name in advice:
+            shadow.execute(f"DROP INDEX {_q(name)}")
+        return query_plan(shadow, sql)
+    finally:
+        shadow.execute("ROLLBACK TO plan_before")
+        shadow.execute("RELEASE plan_before")
+
+def record_query(conn: sqlite3.Connection, db_path: str, sql: str, elapsed_ms: float):
+    """Logs the query with its plan when it was slow; cheap no-op otherwise."""
+    if elapsed_ms < SLOW_MS:
+        return
+    try:
+        plan = query_plan(conn, sql)
+    except sqlite3.Error:
+        plan = []
+    entry = {"sql": sql, "ms": round(elapsed_ms, 1), "plan": plan, "at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    try:
+        with open(_paths(os.path.abspath(db_path))["slow"], "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        print(f"[warn] could not record slow query: {e}", file=sys.stderr)
+
+def slow_queries(db_path: str) -> List[dict]:
+    """Logged slow queries, one per distinct statement, slowest first."""
+    by_sql: Dict[str, dict] = {}
+    try:
+        with open(_paths(os.path.abspath(db_path))["slow"], "r") as f:
+            for line in f:
+                e = json.loads(line)
+                agg = by_sql.setdefault(e["sql"], {"sql": e["sql"], "count": 0, "max_ms": 0.0, "plan": e["plan"]})
+                agg["count"] += 1
+                agg["max_ms"] = max(agg["max_ms"], e["ms"])
+    except OSError:
+        pass
+    return sorted(by_sql.values(), key=lambda e: -e["max_ms"])
+
+# -- index advice -------------------------------------------------------------
+
+def _strip_literals(sql: str) -> str:
+    return re.sub(r"'(?:[^']|'')*'", "?", sql)
+
+def _aliases(sql: str, tables: set) -> Dict[str, str]:
+    """alias (or table name) -> table, lower-cased."""
+    found = {}
+    for table, alias in re.findall(r"\b(?:from|join)\s+[\"`\[]?(\w+)[\"`\]]?(?:\s+(?:as\s+)?(\w+))?", sql, re.I):
+        if table.lower() not in tables:
+            continue
+        found[table.lower()] = table.lower()
+        if alias and alias.lower() not in KEYWORDS:
+            found[alias.lower()] = table.lower()
+    return found
+
+def _candidate(sql: str, table: str, alias_names: set, columns: List[str]) -> List[str]:
+    """Index columns for one table: equality predicates, then one range predicate, then covered columns."""
+    colset = {c.lower(): c for c in columns}
+    ref = r"(?:(\w+)\.)?[\"`]?(\w+)[\"`]?"
+    eq, rng = [], []
+
+    def add(qual, col, op):
+        qual, col = (qual or "").lower(), col.lower()
+        if col not in colset or (qual and qual not in alias_names):
+            return
+        target = eq if op.upper() in ("=", "==", "IN", "IS") else rng
+        if colset[col] not in eq + rng:
+            target.append(colset[col])
+
+    for qual, col, op in re.findall(ref + r"\s*(==|=|<=|>=|<|>|\bIN\b|\bIS\b|\bBETWEEN\b|\bLIKE\b)", sql, re.I):
+        add(qual, col, op)
+    for op, qual, col in re.findall(r"(==|=|<=|>=|<|>)\s*" + ref, sql, re.I):  # join partner: a.x = b.y
+        add(qual, col, op)
+    order = []  # an index can also deliver ORDER BY / GROUP BY order after the equality columns
+    m = re.search(r"\b(?:order|group)\s+by\s+(.+?)(?:\blimit\b|\bhaving\b|$)", sql, re.I | re.S)
+    if m:
+        order = [colset[c.lower()] for q, c in re.findall(ref, m.group(1))
+                 if c.lower() in colset and (not q or q.lower() in alias_names)]
+    if not eq and not rng and not order:
+        return []
+    key = eq + (rng[:1] if rng else [c for c in dict.fromkeys(order) if c not in eq])
+    select_star = re.search(r"\bselect\s+(?:distinct\s+)?\*|\b" + "|".join(map(re.escape, alias_names)) + r"\.\*", sql, re.I)
+    if not select_star:
+        mentioned = [colset[c.lower()] for q, c in re.findall(ref, sql)
+                     if c.lower() in colset and (not q or q.lower() in alias_names)]
+        covered = key + [c for c in dict.fromkeys(mentioned) if c not in key]
+        if len(covered) <= MAX_INDEX_COLUMNS:
+            return covered
+    return key
+
+def _index_name(table: str, columns: List[str]) -> str:
+    return "eda_idx_" + re.sub(r"\W", "_", table) + "_" + "_".join(re.sub(r"\W", "_", c) for c in columns)
+
+def _uses_index(plan: List[str], index: str) -> List[str]:
+    """Plan lines that use `index` itself (not another index whose name starts with it)."""
+    pattern = re.compile(rf"\bINDEX {re.escape(index)}\b")
+    return [d for d in plan if pattern.search(d)]
+
+def _has_prefix_index(table_profile: dict, columns: List[str]) -> bool:
+    return any(idx["columns"][:len(columns)] == columns for idx in table_profile["indexes"])
+
+def advise(db_path: str, sql: Optional[str] = None, apply: bool = False) -> List[dict]:
+    """
+    Index suggestions for `sql` (or for every logged slow query):
+    [{sql, table, columns, ddl, plan_before, plan_after?, applied?}].
+    """
+    db_path = os.path.abspath(db_path)
+    prof = profile(db_path)
+    tables = {t["name"].lower(): t for t in prof["tables"]}
+    queries = [sql] if sql else [e["sql"] for e in slow_queries(db_path)]
+    shadow = sqlite3.connect(shadow_copy(db_path), isolation_level=None)
+    on_shadow = set(_advisor_indexes(shadow))
+    suggestions = []
+    try:
+        for query in queries:
+            try:
+                plan = _plan_without_advice(shadow, query)
+            except sqlite3.Error as e:
+                suggestions.append({"sql": query, "error": str(e)})
+                continue
+            text = _strip_literals(query)
+            aliases = _aliases(text, set(tables))
+            for detail in plan:
+                m = re.match(r"SCAN (?:TABLE )?(\w+)(?: AS (\w+))?", detail)
+                if not m or "COVERING INDEX" in detail:
+                    continue
+                name = (m.group(2) or m.group(1)).lower()
+                table = aliases.get(name, name)
+                if table not in tables:
+                    continue
+                t = tables[table]
+                if t["rows"] is not None and t["rows"] < MIN_ROWS:
+                    continue
+                names = {a for a, tb in aliases.items() if tb == table} | {table}
+                columns = _candidate(text, t["name"], names, [c["name"] for c in t["columns"]])
+                if not columns or _has_prefix_index(t, columns):
+                    continue
+                index = _index_name(t["name"], columns)
+                ddl = f"CREATE INDEX IF NOT EXISTS {_q(index)} ON {_q(t['name'])} ({', '.join(map(_q, columns))})"
+                if any(s.get("ddl") == ddl for s in suggestions):
+                    continue
+                suggestions.append({"sql": query, "table": t["name"], "columns": columns, "index": index,
+                                    "ddl": ddl, "plan_before": plan, "shadow_only": index in on_shadow})
+        if apply:
+            _apply(db_path, shadow, suggestions)
+    finally:
+        shadow.close()
+    return suggestions
+
+def _apply(db_path: str, shadow: sqlite3.Connection, suggestions: List[dict]):
+    """
+    Creates each suggested index on the shadow copy and keeps it only if the planner
+    searches it, or scans it in place of a temporary B-tree sort. A plain scan of a
+    covering index reads as many rows as the table scan it replaces.
+    """
+    kept = []
+    for s in suggestions:
+        if "ddl" not in s:
+            continue
+        shadow.execute(s["ddl"])
+        shadow.execute(f"ANALYZE {_q(s['index'])}")
+        shadow.commit()
+        s["plan_after"] = query_plan(shadow, s["sql"])
+        uses = _uses_index(s["plan_after"], s["index"])
+        sorts_before = sum("TEMP B-TREE" in d for d in s["plan_before"])
+        sorts_after = sum("TEMP B-TREE" in d for d in s["plan_after"])
+        s["applied"] = any(d.startswith("SEARCH") for d in uses) or bool(uses and sorts_after < sorts_before)
+        if s["applied"]:
+            kept.append(s["ddl"])
+        else:
+            shadow.execute(f"DROP INDEX IF EXISTS {_q(s['index'])}")
+            shadow.commit()
+    if kept:
+        with _lock:
+            prof = dict(_load_profile(db_path))
+            prof["applied_indexes"] = list(dict.fromkeys(prof.get("applied_indexes", []) + kept))
+            _save_profile(db_path, prof)
+
+def format_advice(suggestions: List[dict]) -> str:
+    if not suggestions:
+        return "No index suggestions: the queries already use indexes (or no slow queries were logged)."
+    lines = []
+    for s in suggestions:
+        if "error" in s:
+            lines.append(f"- {s['sql']}\n  could not plan: {s['error']}")
+            continue
+        lines.append(f"- {s['sql']}\n  plan: {'; '.join(s['plan_before'])}\n  suggest: {s['ddl']}")
+        if s.get("shadow_only"):
+            lines.append("  already applied to the shadow copy only; your database does not have it yet")
+        if "applied" in s:
+            status = "used by the planner" if s["applied"] else "not used by the planner, dropped"
+            lines.append(f"  shadow copy: {status}; plan now: {'; '.join(s['plan_after'])}")
+    return "\n".join(lines)
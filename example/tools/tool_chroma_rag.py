@@ -1,21 +1,19 @@
 import os
-import yaml
-import datetime
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 from smolagents import Tool
 from sentence_transformers import SentenceTransformer
 
-# Registry helper functions
-REGISTRY_FILE = "data_registry.yaml"
+try:
+    from . import index_cache, indexing_pipeline, registry_store
+    from .bm25_index import BM25Index, MODES, reciprocal_rank_fusion
+except ImportError:  # run from inside tools/
+    import index_cache, indexing_pipeline, registry_store
+    from bm25_index import BM25Index, MODES, reciprocal_rank_fusion
 
-def load_registry():
-    if os.path.exists(REGISTRY_FILE):
-        with open(REGISTRY_FILE, "r") as f:
-            return yaml.safe_load(f) or []
-    return []
-
-def find_entry(data_dir, registry):
+def find_entry(data_dir, registry=None):
+    if registry is None:
+        return registry_store.default_registry().get(data_dir, with_files=False)
     abs_data_dir = os.path.abspath(data_dir)
     return next((e for e in registry if os.path.abspath(e["data_directory"]) == abs_data_dir), None)
 
@@ -26,65 +24,114 @@ class ChromaRAGTool(Tool):
     inputs = {
         "data_dir": {"type": "string", "description": "Directory with data files."},
         "question": {"type": "string", "description": "Query question."},
-        "top_k": {"type": "integer", "description": "Number of similar docs to retrieve."}
+        "top_k": {"type": "integer", "description": "Number of similar docs to retrieve."},
+        "mode": {"type": "string", "description": "'vector' (default), 'bm25' (exact terms/identifiers, "
+                 "no embedding model) or 'hybrid' (reciprocal-rank fusion of both).",
+                 "default": "vector", "nullable": True}
     }
     output_type = "string"
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
 
-    def forward(self, data_dir: str, question: str, top_k: int) -> str:
+    @property
+    def embedding_model(self):
+        # Loaded on first use and shared per process; mode='bm25' lookups never touch it
+        return index_cache.get_embedding_model("sentence-transformers", "all-MiniLM-L6-v2", SentenceTransformer)
+
+    def forward(self, data_dir: str, question: str, top_k: int, mode: str = "vector") -> str:
+        mode = (mode or "vector").strip().lower()
+        if mode not in MODES:
+            return f"Invalid mode '{mode}'. Use one of: {', '.join(MODES)}."
         # Load registry and check for an existing entry
-        registry = load_registry()
-        entry = find_entry(data_dir, registry)
+        entry = find_entry(data_dir)
         
         # Determine cache directory: use registry entry if exists; otherwise, create one.
         cache_dir = entry["cache_file_directory"] if entry else os.path.join(data_dir, ".cache/chroma_db")
         os.makedirs(cache_dir, exist_ok=True)
+        bm25_path = os.path.join(cache_dir, "bm25.sqlite")
+        bm25 = index_cache.get_client(bm25_path, lambda: BM25Index(bm25_path))
+
+        # Identifier/keyword lookups on an indexed directory: answer from BM25 alone
+        if mode == "bm25" and entry and len(bm25):
+            return self._format(bm25.search(question, top_k))
 
-        # Initialize Chroma client with local persistence.
-        client = chromadb.Client(ChromaSettings(persist_directory=cache_dir))
+        # Chroma client with local persistence, created once per cache directory.
+        client = index_cache.get_client(cache_dir, lambda: chromadb.Client(ChromaSettings(persist_directory=cache_dir)))
         collection_name = "rag_collection"
+        version = index_cache.registry_version(entry)
+        # Without a registry entry the collection is rebuilt on every call, as before.
+        collection = index_cache.CACHE.get("collection", (os.path.abspath(cache_dir), collection_name), version) if entry else None
+        existing = [] if collection is not None else [c.name for c in client.list_collections()]
 
         # If no registry entry or the collection doesn't exist, build a new index.
-        if not entry or collection_name not in [c.name for c in client.list_collections()]:
-            if collection_name in [c.name for c in client.list_collections()]:
+        if collection is not None:
+            pass  # already open in this process for this registry version
+        elif not entry or collection_name not in existing:
+            if collection_name in existing:
                 client.delete_collection(collection_name)
             collection = client.create_collection(collection_name)
+            bm25.clear()
 
-            documents = []
-            doc_ids = []
-            for root, _, files in os.walk(data_dir):
-                for file in files:
-                    path = os.path.join(root, file)
-                    try:
-                        with open(path, "r", encoding="utf-8") as f:
-                            text = f.read()
-                            documents.append(text)
-                            doc_ids.append(path)
-                    except Exception as e:
-                        print(f"Error reading {path}: {e}")
-                        continue
-
-            if documents:
-                embeddings = self.embedding_model.encode(documents).tolist()
-                collection.add(documents=documents, embeddings=embeddings, ids=doc_ids)
-            else:
+            def add_both(ids, documents, embeddings, metadatas):
+                collection.add(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+                bm25.add(ids, documents, metadatas)
+
+            # Stream files -> overlapping chunks -> batched embeddings -> batched adds
+            pipeline = indexing_pipeline.IndexingPipeline(
+                embed_fn=lambda texts: self.embedding_model.encode(texts, batch_size=len(texts)),
+                add_fn=add_both,
+                progress=indexing_pipeline.print_progress,
+            )
+            stats = pipeline.run(data_dir)
+            if not stats["chunks"]:
                 return "No valid text documents found to index."
         else:
             collection = client.get_collection(collection_name)
+        index_cache.CACHE.put("collection", (os.path.abspath(cache_dir), collection_name), collection, version)
+        if not len(bm25):
+            self._backfill_bm25(collection, bm25)  # collection predates the BM25 index
+
+        if mode == "bm25":
+            return self._format(bm25.search(question, top_k))
 
         # Encode the query and retrieve results.
         query_embedding = self.embedding_model.encode(question).tolist()
+        n_results = max(4 * top_k, 20) if mode == "hybrid" else top_k
         results = collection.query(
             query_embeddings=[query_embedding],
-            n_results=top_k,
+            n_results=n_results,
             include=["documents", "distances"]
         )
+        if mode == "hybrid":
+            # Fuse vector and BM25 ranks, then keep the top k
+            lexical = bm25.search(question, n_results)
+            docs = dict(zip(results["ids"][0], results["documents"][0]))
+            docs.update((doc_id, text) for doc_id, _, text, _ in lexical if doc_id not in docs)
+            fused = reciprocal_rank_fusion([results["ids"][0], [h[0] for h in lexical]])
+            return self._format([(doc_id, score, docs[doc_id], None) for doc_id, score in fused[:top_k]])
 
         # Format the output.
         output = "RAG Query Results:\n"
         for doc, dist in zip(results["documents"][0], results["distances"][0]):
             output += f"Doc (score {dist:.3f}): {doc[:150]}...\n\n"
         return output
+
+    @staticmethod
+    def _format(hits) -> str:
+        """hits: [(id, score, text, metadata)] in rank order."""
+        output = "RAG Query Results:\n"
+        for _, score, doc, _ in hits:
+            output += f"Doc (score {score:.3f}): {doc[:150]}...\n\n"
+        return output
+
+    @staticmethod
+    def _backfill_bm25(collection, bm25, page: int = 1000):
+        offset = 0
+        while True:
+            got = collection.get(include=["documents", "metadatas"], limit=page, offset=offset)
+            if not got["ids"]:
+                break
+            metas = got.get("metadatas") or [None] * len(got["ids"])
+            bm25.add(got["ids"], got["documents"], [m or {} for m in metas])
+            offset += len(got["ids"])
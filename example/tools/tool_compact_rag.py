@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+from smolagents import Tool
+from sentence_transformers import SentenceTransformer
+
+try:
+    from . import change_detector, index_cache, indexing_pipeline
+    from .bm25_index import BM25Index, MODES, reciprocal_rank_fusion
+    from .compact_store import CompactVectorStore
+except ImportError:  # run from inside tools/
+    import change_detector, index_cache, indexing_pipeline
+    from bm25_index import BM25Index, MODES, reciprocal_rank_fusion
+    from compact_store import CompactVectorStore
+
+STORE_DTYPE = os.environ.get("EDA_VECTOR_DTYPE", "int8")
+
+class CompactRAGTool(Tool):
+    name = "compact_rag_tool"
+    description = ("Performs RAG over a directory using a compact int8/float16 memory-mapped vector store "
+                   "(low RAM and disk; suited to edge devices). The index is rebuilt only when files change.")
+
+    inputs = {
+        "data_dir": {"type": "string", "description": "Directory with data files."},
+        "question": {"type": "string", "description": "Query question."},
+        "top_k": {"type": "integer", "description": "Number of similar docs to retrieve."},
+        "mode": {"type": "string", "description": "'vector' (default), 'bm25' (exact terms/identifiers, "
+                 "no embedding model) or 'hybrid' (reciprocal-rank fusion of both).",
+                 "default": "vector", "nullable": True}
+    }
+    output_type = "string"
+
+    @property
+    def embedding_model(self):
+        return index_cache.get_embedding_model("sentence-transformers", "all-MiniLM-L6-v2", SentenceTransformer)
+
+    def forward(self, data_dir: str, question: str, top_k: int, mode: str = "vector") -> str:
+        mode = (mode or "vector").strip().lower()
+        if mode not in MODES:
+            return f"Invalid mode '{mode}'. Use one of: {', '.join(MODES)}."
+        cache_dir = os.path.join(data_dir, ".cache", f"compact_{STORE_DTYPE}")
+        store = index_cache.get_client(cache_dir, lambda: CompactVectorStore(cache_dir, dtype=STORE_DTYPE))
+        bm25_path = os.path.join(cache_dir, "bm25.sqlite")
+        bm25 = index_cache.get_client(bm25_path, lambda: BM25Index(bm25_path))
+
+        # Rebuild when the files under data_dir changed since the store was written; one
+        # check/rebuild per store at a time, so concurrent calls neither rebuild twice nor interleave
+        with index_cache.dir_lock(cache_dir):
+            detector = change_detector.get_detector(data_dir)
+            if (not len(store) or detector.tag != store.extra.get("corpus") or not detector.has_baseline
+                    or detector.has_changes()):
+                print(f"[INFO] Building compact {STORE_DTYPE} index for {data_dir}", file=sys.stderr)
+                detector.poll()  # before reading, so edits during the build show up next time
+                store.clear()
+                bm25.clear()
+
+                def add_both(ids, documents, embeddings, metadatas):
+                    store.add(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+                    bm25.add(ids, documents, metadatas)
+
+                pipeline = indexing_pipeline.IndexingPipeline(
+                    embed_fn=lambda texts: self.embedding_model.encode(texts, batch_size=len(texts)),
+                    add_fn=add_both,
+                    progress=indexing_pipeline.print_progress,
+                )
+                stats = pipeline.run(data_dir)
+                if not stats["chunks"]:
+                    return "No valid text documents found to index."
+                store.extra["corpus"] = time.time()
+                store.flush()
+                detector.commit(store.extra["corpus"])
+
+        if mode == "bm25":
+            hits = bm25.search(question, top_k)
+        else:
+            depth = max(4 * top_k, 20) if mode == "hybrid" else top_k
+            hits = store.search(self.embedding_model.encode(question), depth)
+            if mode == "hybrid":
+                lexical = bm25.search(question, depth)
+                docs = {h[0]: h[2] for h in lexical + hits}
+                fused = reciprocal_rank_fusion([[h[0] for h in hits], [h[0] for h in lexical]])
+                hits = [(doc_id, score, docs[doc_id], None) for doc_id, score in fused[:top_k]]
+
+        output = "RAG Query Results:\n"
+        for _, score, doc, _ in hits:
+            output += f"Doc (score {score:.3f}): {doc[:150]}...\n\n"
+        return output
@@ -3,8 +3,10 @@ pip install llama-index
 pip install llama-index-embeddings-huggingface
 """
 import os
-import datetime
-import yaml
+import sys
+import shutil
+import sqlite3
+import hashlib
 from smolagents import Tool
 
 from llama_index.core import (
@@ -17,36 +19,41 @@ from llama_index.core import (
 from llama_index.core.llms import MockLLM
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 
+try:
+    from . import change_detector, index_cache, index_service, registry_store
+    from .bm25_index import BM25Index, MODES, reciprocal_rank_fusion
+except ImportError:  # run from inside tools/
+    import change_detector, index_cache, index_service, registry_store
+    from bm25_index import BM25Index, MODES, reciprocal_rank_fusion
+
 # ------------------------------------------------------------------------------
 # Configure LlamaIndex
 # ------------------------------------------------------------------------------
 Settings.llm = MockLLM()
-Settings.embed_model = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+BM25_FILE = "bm25.sqlite"
+
+def ensure_embed_model():
+    """Loads the embedding model on first use (mode='bm25' lookups never need it)."""
+    Settings.embed_model = index_cache.get_embedding_model(
+        "huggingface", EMBED_MODEL_NAME, lambda name: HuggingFaceEmbedding(model_name=name))
 
 # ------------------------------------------------------------------------------
 # Registry utility functions
 # ------------------------------------------------------------------------------
-REGISTRY_FILE = "data_registry.yaml"
-
 def load_registry() -> list:
-    """Loads the registry from a YAML file or returns an empty list if it doesn't exist."""
-    if os.path.exists(REGISTRY_FILE):
-        with open(REGISTRY_FILE, "r") as f:
-            data = yaml.safe_load(f)
-        return data if data else []
-    return []
-
-def save_registry(registry: list):
-    """Saves the registry back to the YAML file."""
-    with open(REGISTRY_FILE, "w") as f:
-        yaml.safe_dump(registry, f)
-
-def find_registry_entry(data_directory: str, registry: list) -> dict | None:
+    """All registry entries (without per-file state)."""
+    return registry_store.default_registry().entries()
+
+def find_registry_entry(data_directory: str, registry: list | None = None) -> dict | None:
     """
     Looks for a registry entry matching 'data_directory' (by absolute path).
-    Returns the entry if found, else None.
+    Returns the entry if found, else None. Without `registry` this is a keyed
+    lookup in the SQLite registry, including the per-file state.
     """
     abs_data_dir = os.path.abspath(data_directory)
+    if registry is None:
+        return registry_store.default_registry().get(abs_data_dir)
     for entry in registry:
         if os.path.abspath(entry.get("data_directory", "")) == abs_data_dir:
             return entry
@@ -58,51 +65,206 @@ def update_registry_entry(
     last_data_update: float,
     status: str = "rag_indexed",
     data_format: str = "",
+    files: dict | None = None,
 ):
     """
-    Inserts or updates a registry entry for this data_directory. 
-    Also stores the last_data_update (timestamp in seconds).
+    Inserts or updates a registry entry for this data_directory (one atomic upsert).
+    Also stores the last_data_update (timestamp in seconds) and, when given,
+    the per-file state of the index as file rows (see scan_files).
     """
-    registry = load_registry()
     abs_data_dir = os.path.abspath(data_directory)
-    abs_cache_dir = abs_data_dir + "/.cache"
-
-    # Minimal new/updated entry
-    new_entry = {
-        "data_directory": abs_data_dir,
-        "cache_file_directory": abs_cache_dir,
-        "data_format": data_format,
-        "timestamp": datetime.datetime.now().isoformat(),  # When this registry entry was updated
-        "status": status,
-        "last_data_update": last_data_update,             # float -> last mod time in seconds
-        "metadata": {},  # Optionally fill with more details
-    }
+    abs_cache_dir = os.path.abspath(cache_file_directory) if cache_file_directory else abs_data_dir + "/.cache"
+    registry_store.default_registry().upsert(
+        abs_data_dir, abs_cache_dir, last_data_update=last_data_update,
+        status=status, data_format=data_format, files=files)
 
-    updated = False
-    for i, entry in enumerate(registry):
-        if os.path.abspath(entry.get("data_directory", "")) == abs_data_dir:
-            registry[i] = new_entry
-            updated = True
-            break
+def get_latest_mod_time(data_directory: str) -> float:
+    """
+    Returns the most recent (max) last-modified time (in seconds)
+    of all (non-hidden) files under data_directory, via the change detector.
+    """
+    detector = change_detector.get_detector(data_directory)
+    detector.poll()
+    return detector.latest_mtime
 
-    if not updated:
-        registry.append(new_entry)
+# ------------------------------------------------------------------------------
+# Per-file change tracking
+# ------------------------------------------------------------------------------
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
-    save_registry(registry)
+def scan_files(paths: list, previous: dict | None = None) -> dict:
+    """
+    Returns {abs_path: {"size", "mtime", "sha256"}} for the given files.
+    A file whose size and mtime match `previous` keeps its recorded hash (no re-read),
+    and a file whose content is unchanged keeps its recorded "doc_ids".
+    """
+    previous = previous or {}
+    state = {}
+    for path in paths:
+        path = os.path.abspath(str(path))
+        st = os.stat(path)
+        old = previous.get(path)
+        if old and old.get("size") == st.st_size and old.get("mtime") == st.st_mtime:
+            sha = old["sha256"]
+        else:
+            sha = file_sha256(path)
+        state[path] = {"size": st.st_size, "mtime": st.st_mtime, "sha256": sha}
+        if old and old.get("sha256") == sha and "doc_ids" in old:
+            state[path]["doc_ids"] = old["doc_ids"]
+    return state
 
-def get_latest_mod_time(data_directory: str) -> float:
+def diff_files(old: dict, new: dict):
+    """Returns (added, modified, deleted) path lists between two scan_files() results."""
+    added = sorted(p for p in new if p not in old)
+    modified = sorted(p for p in new if p in old and new[p]["sha256"] != old[p]["sha256"])
+    deleted = sorted(p for p in old if p not in new)
+    return added, modified, deleted
+
+def load_documents_by_file(input_files: list) -> dict:
+    """Loads the given files and groups the resulting Documents by absolute file path."""
+    by_file = {os.path.abspath(str(p)): [] for p in input_files}
+    if not input_files:
+        return by_file
+    for doc in SimpleDirectoryReader(input_files=[str(p) for p in input_files], filename_as_id=True).load_data():
+        path = os.path.abspath(doc.metadata.get("file_path", ""))
+        by_file.setdefault(path, []).append(doc)
+    return by_file
+
+def build_index(persist_dir: str, input_files: list, files_state: dict):
+    """Full build; records the document ids of each file in files_state."""
+    by_file = load_documents_by_file(input_files)
+    documents = []
+    for path, docs in by_file.items():
+        if path in files_state:
+            files_state[path]["doc_ids"] = [d.doc_id for d in docs]
+        documents.extend(docs)
+    index = VectorStoreIndex.from_documents(documents)
+    index.storage_context.persist(persist_dir=persist_dir)
+    return index
+
+def apply_file_changes(index, persist_dir: str, old_files: dict, new_files: dict, changed: tuple):
     """
-    Returns the most recent (max) last-modified time (in seconds) 
-    of all files under data_directory.
+    Removes the nodes of modified/deleted files and embeds only added/modified files
+    (recording their new doc_ids in new_files), then persists.
     """
-    latest_time = 0.0
-    for root, _, files in os.walk(data_directory):
-        for f in files:
-            filepath = os.path.join(root, f)
-            mtime = os.path.getmtime(filepath)
-            if mtime > latest_time:
-                latest_time = mtime
-    return latest_time
+    added, modified, deleted = changed
+    for path in modified + deleted:
+        for doc_id in old_files[path].get("doc_ids", []):
+            index.delete_ref_doc(doc_id, delete_from_docstore=True)
+    for path, docs in load_documents_by_file(added + modified).items():
+        for doc in docs:
+            index.insert(doc)
+        if path in new_files:
+            new_files[path]["doc_ids"] = [d.doc_id for d in docs]
+    index.storage_context.persist(persist_dir=persist_dir)
+
+# ------------------------------------------------------------------------------
+# Lexical (BM25) index kept next to the vector index
+# ------------------------------------------------------------------------------
+def open_bm25(persist_dir: str) -> BM25Index:
+    path = os.path.join(persist_dir, BM25_FILE)
+    return index_cache.get_client(path, lambda: BM25Index(path))
+
+def sync_bm25(bm25: BM25Index, index, files_state: dict, remove: list, add: list):
+    """Drops the chunks of `remove` files and adds the index nodes of `add` files."""
+    bm25.delete_paths(remove)
+    ids, texts, metas = [], [], []
+    for path in add:
+        for doc_id in files_state.get(path, {}).get("doc_ids", []):
+            info = index.docstore.get_ref_doc_info(doc_id)
+            for node_id in (info.node_ids if info else []):
+                node = index.docstore.get_node(node_id)
+                ids.append(node.node_id)
+                texts.append(node.get_content())
+                metas.append(dict(node.metadata, path=path))
+    for i in range(0, len(ids), 500):
+        bm25.add(ids[i:i + 500], texts[i:i + 500], metas[i:i + 500])
+
+# ------------------------------------------------------------------------------
+# Double-buffered refresh for the background index service (index_service.py)
+# ------------------------------------------------------------------------------
+def copy_bm25(src_dir: str, dst_dir: str) -> BM25Index:
+    """Consistent copy of a generation's BM25 index (SQLite backup, safe while it is being read)."""
+    src = open_bm25(src_dir)
+    dst = sqlite3.connect(os.path.join(dst_dir, BM25_FILE))
+    try:
+        with src.lock:
+            src.conn.backup(dst)
+    finally:
+        dst.close()
+    return open_bm25(dst_dir)
+
+def refresh_generation(data_dir: str) -> dict:
+    """
+    Brings data_dir's index up to date for the background service. When files changed,
+    the next generation is written to a new directory (a copy of the current one, updated
+    per file, or a full build) while the current one keeps serving; the registry upsert
+    pointing at it is the swap. Returns a summary for index_status.
+    """
+    registry = registry_store.default_registry()
+    entry = registry.get(data_dir, with_files=False)
+    current = (entry or {}).get("cache_file_directory")
+    tracked = bool(entry and entry["metadata"].get("has_files"))
+    usable = bool(tracked and current and os.path.isdir(current)
+                  and any(f.endswith(".json") for f in os.listdir(current)))
+    detector = change_detector.get_detector(data_dir, recursive=False)
+    detector.poll()
+    old_files = registry.files(data_dir) if tracked else None
+    input_files = SimpleDirectoryReader(data_dir).input_files
+    new_files = scan_files(input_files, old_files)
+    changed = diff_files(old_files, new_files) if usable else None
+    latest = max((f["mtime"] for f in new_files.values()), default=0.0)
+    ensure_embed_model()
+
+    if usable and not any(changed):
+        # Same content: keep the generation, make sure it is loaded (warm) for queries
+        index = index_cache.get_index(
+            current, index_cache.registry_version(entry),
+            lambda: load_index_from_storage(StorageContext.from_defaults(persist_dir=current)))
+        if old_files != new_files:  # only mtimes moved
+            update_registry_entry(data_dir, current, latest, files=new_files)
+            entry = registry.get(data_dir, with_files=False)
+            index_cache.put_index(current, index_cache.registry_version(entry), index)
+        detector.commit(entry["timestamp"])
+        return {"generation": current, "files": len(new_files), "changed": 0}
+
+    out_dir = index_service.next_generation_dir(data_dir)
+    if usable:
+        shutil.copytree(current, out_dir, ignore=shutil.ignore_patterns(BM25_FILE + "*"))
+        index = load_index_from_storage(StorageContext.from_defaults(persist_dir=out_dir))
+        apply_file_changes(index, out_dir, old_files, new_files, changed)
+        added, modified, deleted = changed
+        sync_bm25(copy_bm25(current, out_dir), index, new_files, modified + deleted, added + modified)
+        n_changed = sum(len(c) for c in changed)
+    else:
+        os.makedirs(out_dir, exist_ok=True)
+        index = build_index(out_dir, input_files, new_files)
+        sync_bm25(open_bm25(out_dir), index, new_files, [], list(new_files))
+        n_changed = len(new_files)
+    update_registry_entry(data_dir, out_dir, latest, files=new_files)  # the swap
+    entry = registry.get(data_dir, with_files=False)
+    index_cache.put_index(out_dir, index_cache.registry_version(entry), index)
+    detector.commit(entry["timestamp"])
+    if current and usable:
+        index_cache.CACHE.invalidate("index", os.path.abspath(current))
+        index_cache.CACHE.invalidate("client", os.path.abspath(os.path.join(current, BM25_FILE)))
+    index_service.prune_generations(data_dir, out_dir)
+    return {"generation": out_dir, "files": len(new_files), "changed": n_changed}
+
+def format_hits(hits) -> str:
+    """hits: [(text, metadata, score)] in rank order."""
+    output = "-----\n"
+    for text, metadata, score in hits:
+        text_fmt = text.strip().replace("\n", " ")
+        output += f"Text:\t {text_fmt}\n"
+        output += f"Metadata:\t {metadata}\n"
+        output += f"Score:\t {score:.3f}\n"
+    return output
 
 # ------------------------------------------------------------------------------
 # RAGTool with data update checks
@@ -123,6 +285,13 @@ class RAGTool(Tool):
         "similarity_top_k": {
             "type": "string",
             "description": "Number of top similar docs to retrieve (string -> int)."
+        },
+        "mode": {
+            "type": "string",
+            "description": "'vector' (default), 'bm25' (exact terms/identifiers such as INV-1043, no embedding model) "
+                           "or 'hybrid' (BM25 and vector ranks fused with reciprocal-rank fusion).",
+            "default": "vector",
+            "nullable": True
         }
     }
     output_type = "string"
@@ -130,71 +299,149 @@ class RAGTool(Tool):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    def forward(self, data_dir: str, question: str, similarity_top_k: str) -> str:
+    def forward(self, data_dir: str, question: str, similarity_top_k: str, mode: str = "vector") -> str:
         """
         Main entry point for the RAG tool.
         1. Determine the cache directory from the registry (or create it).
-        2. Check if raw data is updated (compare directory's last mod time to registry).
-        3. Load or rebuild the vector index accordingly.
-        4. Query with 'similarity_top_k' and return result text.
+        2. Diff the data files against the per-file state recorded in the registry.
+        3. Bring the vector index and the BM25 index up to date, re-embedding only
+           added/modified files and dropping nodes of deleted ones (full build only
+           when there is no usable index).
+        4. Query with 'similarity_top_k' in the requested mode and return result text.
         """
-        registry = load_registry()
-        entry = find_registry_entry(data_dir, registry)
+        mode = (mode or "vector").strip().lower()
+        if mode not in MODES:
+            return f"Invalid mode '{mode}'. Use one of: {', '.join(MODES)}."
+        service = index_service.active()
+        if service is not None:  # indexes are kept up to date in the background
+            return self.forward_from_service(service, data_dir, question, int(similarity_top_k), mode)
+        with index_cache.dir_lock(data_dir):  # concurrent calls must not update the same index twice
+            index, bm25 = self.refresh(data_dir, mode)
+
+        # 4. Query with top_k
+        return self.query(index, bm25, question, int(similarity_top_k), mode)
+
+    def refresh(self, data_dir: str, mode: str):
+        """Steps 1-3 of forward(); returns (index or None, bm25). Callers hold index_cache.dir_lock(data_dir)."""
+        registry = registry_store.default_registry()
+        entry = registry.get(data_dir, with_files=False)  # file rows are loaded only when needed
 
         # 1. Determine the relevant cache directory
         if entry and "cache_file_directory" in entry and entry["cache_file_directory"]:
             persist_dir = entry["cache_file_directory"]
-            print(f"Found registry entry for {data_dir}. Using cache: {persist_dir}")
+            print(f"Found registry entry for {data_dir}. Using cache: {persist_dir}", file=sys.stderr)
         else:
             # No entry found, create a new .cache directory under data_dir
             persist_dir = os.path.join(data_dir, ".cache", "storage")
             os.makedirs(persist_dir, exist_ok=True)
-            print(f"No registry entry found for {data_dir}. Created new cache folder: {persist_dir}")
-
-        # 2. Check if raw data is updated
-        latest_data_mtime = get_latest_mod_time(data_dir)  # in seconds
-        registry_last_data_update = entry["last_data_update"] if entry else 0.0
-
-        need_rebuild = False
-        reason = ""
-
-        # If no index folder, or raw data has new modifications, we must rebuild
-        if not os.path.exists(persist_dir) or not os.listdir(persist_dir):
-            reason = "No existing index found"
-            need_rebuild = True
-        elif latest_data_mtime > registry_last_data_update:
-            reason = "Data directory has been updated"
-            need_rebuild = True
-
-        if need_rebuild:
-            print(f"[INFO] Rebuilding index because: {reason}")
-            documents = SimpleDirectoryReader(data_dir).load_data()
-            index = VectorStoreIndex.from_documents(documents)
-            index.storage_context.persist(persist_dir=persist_dir)
-
-            # Update the registry
-            update_registry_entry(
-                data_directory=data_dir,
-                cache_file_directory=persist_dir,
-                last_data_update=latest_data_mtime, 
-                status="rag_indexed"
-            )
+            print(f"No registry entry found for {data_dir}. Created new cache folder: {persist_dir}", file=sys.stderr)
+
+        # 2. Check which files changed since the index was built (size/mtime, then sha256).
+        #    The change detector answers "anything changed?" without listing or stat-ing
+        #    the files when its baseline matches this registry entry; otherwise list and scan.
+        #    The file set is the reader's own, so hidden entries such as .cache/ are excluded.
+        tracked = bool(entry and entry["metadata"].get("has_files"))
+        need_build = (not os.path.exists(persist_dir) or not tracked
+                      or not any(f.endswith(".json") for f in os.listdir(persist_dir)))
+        detector = change_detector.get_detector(data_dir, recursive=False)  # the reader is not recursive
+        tag = (entry or {}).get("timestamp")
+        unchanged = (not need_build and detector.tag == tag and detector.has_baseline
+                     and not detector.has_changes())
+        if unchanged:
+            old_files = new_files = None  # nothing to diff; not loaded
         else:
-            # 3. Otherwise, load the existing index
-            print(f"[INFO] Loading existing index from {persist_dir} ...")
-            storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
-            index = load_index_from_storage(storage_context)
+            detector.poll()  # before reading the files, so later edits show up next time
+            old_files = registry.files(data_dir) if tracked else None
+            input_files = SimpleDirectoryReader(data_dir).input_files
+            new_files = scan_files(input_files, old_files)
+        os.makedirs(persist_dir, exist_ok=True)
+        bm25 = open_bm25(persist_dir)
+
+        index = None
+        if need_build:
+            # 3a. No index yet, or one built before per-file tracking: build everything once
+            print(f"[INFO] Building index for {data_dir} ({len(new_files)} files)", file=sys.stderr)
+            ensure_embed_model()
+            index = build_index(persist_dir, input_files, new_files)
+            bm25.clear()
+            sync_bm25(bm25, index, new_files, [], list(new_files))
+        else:
+            changed = ([], [], []) if unchanged else diff_files(old_files, new_files)
+            if any(changed) or mode != "bm25" or not len(bm25):
+                # 3b. Use the in-process index (loaded once per registry version) and
+                #     re-embed only what changed
+                ensure_embed_model()
+                index = index_cache.get_index(
+                    persist_dir, index_cache.registry_version(entry),
+                    lambda: load_index_from_storage(StorageContext.from_defaults(persist_dir=persist_dir)))
+            if any(changed):
+                added, modified, deleted = changed
+                print(f"[INFO] Updating index: {len(added)} added, {len(modified)} modified, {len(deleted)} deleted", file=sys.stderr)
+                apply_file_changes(index, persist_dir, old_files, new_files, changed)
+                sync_bm25(bm25, index, new_files, modified + deleted, added + modified)
+            elif index is not None and not len(bm25):
+                files_state = new_files if new_files is not None else registry.files(data_dir)
+                sync_bm25(bm25, index, files_state, [], list(files_state))  # index predates BM25
+
+        if not unchanged:
+            if old_files != new_files:
+                update_registry_entry(
+                    data_directory=data_dir,
+                    cache_file_directory=persist_dir,
+                    last_data_update=max((f["mtime"] for f in new_files.values()), default=0.0),
+                    status="rag_indexed",
+                    files=new_files,
+                )
+                entry = registry.get(data_dir, with_files=False)
+            detector.commit(entry.get("timestamp"))  # the scanned state now matches this entry
+        if index is not None:
+            index_cache.put_index(persist_dir, index_cache.registry_version(entry), index)
+        return index, bm25
+
+    def forward_from_service(self, service, data_dir: str, question: str, k: int, mode: str) -> str:
+        """
+        Queries the current index generation kept by the background service. Never
+        builds inline: a stale directory is queued for refresh and answered from the
+        current generation; only a directory with no generation yet waits for its first build.
+        """
+        registry = registry_store.default_registry()
+        entry = registry.get(data_dir, with_files=False)
+        current = (entry or {}).get("cache_file_directory")
+        if not (current and os.path.isdir(current)):
+            service.reindex(data_dir)
+            service.wait(data_dir)
+            entry = registry.get(data_dir, with_files=False)
+            current = (entry or {}).get("cache_file_directory")
+            if not (current and os.path.isdir(current)):
+                return f"No index could be built for {data_dir}; see index_status."
+        elif change_detector.get_detector(data_dir, recursive=False).has_changes():
+            service.reindex(data_dir)
+        bm25 = open_bm25(current)
+        index = None
+        if mode != "bm25":
+            ensure_embed_model()
+            index = index_cache.get_index(
+                current, index_cache.registry_version(entry),
+                lambda: load_index_from_storage(StorageContext.from_defaults(persist_dir=current)))
+        return self.query(index, bm25, question, k, mode)
+
+    @staticmethod
+    def query(index, bm25: BM25Index, question: str, k: int, mode: str) -> str:
+        """Top-k hits from the vector index, the BM25 index or both (RRF), as result text."""
+        if mode == "bm25":
+            return format_hits([(text, meta, score) for _, score, text, meta in bm25.search(question, k)])
+        if mode == "hybrid":
+            # Fuse a deeper candidate list from each side, then keep the top k
+            depth = max(4 * k, 20)
+            vector_nodes = index.as_retriever(similarity_top_k=depth).retrieve(question)
+            lexical = bm25.search(question, depth)
+            by_id = {n.node.node_id: (n.node.get_content(), n.node.metadata) for n in vector_nodes}
+            for doc_id, _, text, meta in lexical:
+                by_id.setdefault(doc_id, (text, meta))
+            fused = reciprocal_rank_fusion([[n.node.node_id for n in vector_nodes], [h[0] for h in lexical]])
+            return format_hits([by_id[doc_id] + (score,) for doc_id, score in fused[:k]])
 
-        # 4. Query with top_k
-        k = int(similarity_top_k)
         query_engine = index.as_query_engine(similarity_top_k=k)
         response = query_engine.query(question)
 
-        # 5. Compile output with source info
-        output = "-----\n"
-        for node in response.source_nodes:
-            text_fmt = node.node.get_content().strip().replace("\n", " ")
-            output += f"Text:\t {text_fmt}\n"
-            output += f"Metadata:\t {node.node.metadata}\n"
-            output += f"Score:\t {node.score:.3f}\n"
-        return output
\ No newline at end of file
+        return format_hits([(n.node.get_content(), n.node.metadata, n.score) for n in response.source_nodes])
@@ -1,9 +1,13 @@
 import os
 import yaml
-import datetime
 import shutil
 from smolagents import Tool
 
+try:
+    from . import change_detector, registry_store
+except ImportError:  # run from inside tools/
+    import change_detector, registry_store
+
 class RegistryManager(Tool):
     name = "tool_registry_manager"
     description = (
@@ -19,69 +23,40 @@ class RegistryManager(Tool):
     }
     output_type = "string"
 
-    REGISTRY_FILE = "data_registry.yaml"
-
-    def load_registry(self):
-        if os.path.exists(self.REGISTRY_FILE):
-            with open(self.REGISTRY_FILE, "r") as f:
-                return yaml.safe_load(f) or []
-        return []
-
-    def save_registry(self, registry):
-        with open(self.REGISTRY_FILE, "w") as f:
-            yaml.safe_dump(registry, f)
+    @property
+    def registry(self):
+        return registry_store.default_registry()
 
     def get_latest_mod_time(self, directory):
-        latest_time = 0.0
-        for root, _, files in os.walk(directory):
-            for file in files:
-                file_path = os.path.join(root, file)
-                latest_time = max(latest_time, os.path.getmtime(file_path))
-        return latest_time
+        # Incremental: only directories that changed since the last call are re-listed
+        detector = change_detector.get_detector(directory)
+        detector.poll()
+        return detector.latest_mtime
 
     def update(self, data_directory, status, cache_file_directory, data_format):
         data_dir = os.path.abspath(data_directory)
         cache_dir = os.path.abspath(cache_file_directory)
         last_mod_time = self.get_latest_mod_time(data_directory)
 
-        new_entry = {
-            "data_directory": data_directory,
-            "cache_file_directory": cache_file_directory,
-            "data_format": data_format,
-            "timestamp": datetime.datetime.now().isoformat(),
-            "status": status,
-            "last_data_update": last_mod_time,
-        }
-
-        registry = self.load_registry()
-        found = False
-        for idx, entry in enumerate(registry):
-            if os.path.abspath(entry["data_directory"]) == os.path.abspath(data_directory):
-                registry[idx] = new_entry
-                found = True
-                break
-        if not found:
-            registry.append(new_entry)
-
-        self.save_registry(registry)
+        self.registry.upsert(data_dir, cache_dir, last_data_update=last_mod_time,
+                             status=status, data_format=data_format)
         return f"Updated registry entry for: {data_directory}"
 
     def list_entries(self):
-        registry = self.load_registry()
+        registry = self.registry.entries()
         if not registry:
             return "Registry is empty."
         return yaml.safe_dump(registry, sort_keys=False)
 
     def clear_entries(self):
-        registry = self.load_registry()
-        for entry in registry:
+        removed = self.registry.clear()
+        for entry in removed:
             cache_dir = entry.get("cache_file_directory", "")
-            if cache_file_directory and os.path.exists(cache_file_directory):
-                shutil.rmtree(cache_file_directory, ignore_errors=True)
-        if os.path.exists(self.REGISTRY_FILE):
-            os.remove(self.REGISTRY_FILE)
+            if cache_dir and os.path.exists(cache_dir):
+                shutil.rmtree(cache_dir, ignore_errors=True)
+        if removed:
             return "Registry and cache cleared."
-        return "No registry file found."
+        return "Registry is empty."
 
     def forward(self, action, data_directory="", status="", cache_file_directory="", data_format=""):
         action = action.lower().strip()
@@ -1,9 +1,30 @@
+import os
+import time
+import hashlib
 import sqlite3
+import tempfile
 from smolagents import Tool
 
+try:
+    from . import sqlite_profiler
+    from .sqlite_pool import POOL, stream_rows
+except ImportError:  # run from inside tools/
+    import sqlite_profiler
+    from sqlite_pool import POOL, stream_rows
+
+READ_ONLY = os.environ.get("EDA_SQLITE_READ_ONLY", "1") != "0"
+MAX_ROWS = int(os.environ.get("EDA_SQLITE_MAX_ROWS", "200"))
+MAX_BYTES = int(os.environ.get("EDA_SQLITE_MAX_BYTES", "20000"))
+SPILL_DIR = os.path.join(tempfile.gettempdir(), "eda_sql_spill")
+
 class SQLiteTool(Tool):
     """
     A tool that executes SQL queries on a specified SQLite database.
+
+    Connections come from a per-database pool and are read-only unless the tool
+    is created with read_only=False (or EDA_SQLITE_READ_ONLY=0). Results are
+    streamed and capped at MAX_ROWS rows / MAX_BYTES characters. With spill=true,
+    the full result is also written to a TSV file, and its path is returned.
     """
     name = "sqlite_tool"
     description = "Execute SQL queries on a specified SQLite database."
@@ -15,36 +36,61 @@ class SQLiteTool(Tool):
         "sql": {
             "type": "string",
             "description": "The SQL query to be executed."
+        },
+        "spill": {
+            "type": "boolean",
+            "description": "Write the full result to a TSV file when it exceeds the row/size cap.",
+            "default": False,
+            "nullable": True
         }
     }
     output_type = "string"
 
-    def __init__(self, **kwargs):
+    def __init__(self, read_only: bool = READ_ONLY, max_rows: int = MAX_ROWS, max_bytes: int = MAX_BYTES, **kwargs):
         super().__init__(**kwargs)
+        self.read_only = read_only
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+
+    def _spill_path(self, db_path: str, sql: str) -> str:
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        digest = hashlib.sha1(f"{os.path.abspath(db_path)}\0{sql}".encode()).hexdigest()[:12]
+        return os.path.join(SPILL_DIR, f"{digest}-{int(time.time())}.tsv")
 
-    def forward(self, db_path: str, sql: str) -> str:
+    def forward(self, db_path: str, sql: str, spill: bool = False) -> str:
         """
-        Connects to the SQLite database at 'db_path', executes the provided 'sql' query,
-        and returns the query result as a formatted string.
+        Runs 'sql' on a pooled connection to 'db_path' and returns the rows (capped)
+        as a formatted string, or the affected row count for other statements.
         """
         try:
-            with sqlite3.connect(db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute(sql)
-                # Fetch rows (if any)
-                rows = cursor.fetchall()
-                # If the query returns rows (e.g., SELECT), format them:
+            with POOL.connection(db_path, read_only=self.read_only) as conn:
+                t0 = time.perf_counter()
+                cursor = conn.execute(sql)
+                # If the query returns rows (e.g., SELECT), stream and format them:
                 if cursor.description:
-                    columns = [desc[0] for desc in cursor.description]
-                    output_lines = []
-                    # Header row with column names
-                    output_lines.append(" | ".join(columns))
-                    # Rows of data
-                    for row in rows:
-                        output_lines.append(" | ".join(str(value) for value in row))
-                    return "\n".join(output_lines) if rows else "Query executed, but no rows returned."
+                    result = stream_rows(cursor, self.max_rows, self.max_bytes,
+                                         self._spill_path(db_path, sql) if spill else None)
+                    sqlite_profiler.record_query(conn, db_path, sql, (time.perf_counter() - t0) * 1000)
+                    if not result["shown"] and not result["truncated"]:
+                        return "Query executed, but no rows returned."
+                    text = result["text"]
+                    if result["truncated"]:
+                        total = f"of {result['total']} " if result["total"] is not None else ""
+                        text += (f"\n... showing {result['shown']} {total}rows; "
+                                 + (f"full result written to {result['spill_path']}" if result["spill_path"]
+                                    else "add LIMIT/WHERE/aggregation to narrow it, or pass spill=true"))
+                    return text
                 else:
                     # If cursor.description is None, it might be an UPDATE or INSERT
                     return f"Query executed successfully; {cursor.rowcount} row(s) affected."
+        except sqlite3.OperationalError as e:
+            if self.read_only and "readonly" in str(e):
+                return f"Error executing query: {e} (this tool opens databases read-only)"
+            if "no such" in str(e):  # wrong table/column name: hand over the (cached) schema
+                try:
+                    return f"Error executing query: {e}\n{sqlite_profiler.schema_summary(db_path)}"
+                except (OSError, sqlite3.Error):
+                    pass
+            return f"Error executing query: {e}"
         except Exception as e:
             return f"Error executing query: {e}"
@@ -0,0 +1,42 @@
+from smolagents import Tool
+
+try:
+    from . import sqlite_profiler
+except ImportError:  # run from inside tools/
+    import sqlite_profiler
+
+class SQLiteProfilerTool(Tool):
+    """
+    Schema summary and index advice for a SQLite database. The original database
+    is never modified. Index experiments run on a shadow copy.
+    """
+    name = "sqlite_profiler"
+    description = (
+        "Inspect a SQLite database before querying it. action='schema' returns tables, columns, "
+        "row estimates and existing indexes. action='advise' suggests covering indexes for `sql` "
+        "(or for the logged slow queries). action='apply' also creates them in a shadow copy "
+        "and reports whether the query planner uses them."
+    )
+    inputs = {
+        "db_path": {"type": "string", "description": "Path to the SQLite database file."},
+        "action": {"type": "string", "description": "'schema', 'advise' or 'apply'.", "default": "schema",
+                   "nullable": True},
+        "sql": {"type": "string", "description": "Query to analyse (advise/apply). Empty: the slow-query log.",
+                "default": "", "nullable": True},
+    }
+    output_type = "string"
+
+    def forward(self, db_path: str, action: str = "schema", sql: str = "") -> str:
+        action = (action or "schema").lower()
+        try:
+            if action == "schema":
+                return sqlite_profiler.schema_summary(db_path)
+            if action in ("advise", "apply"):
+                suggestions = sqlite_profiler.advise(db_path, sql or None, apply=action == "apply")
+                text = sqlite_profiler.format_advice(suggestions)
+                if action == "apply" and suggestions:
+                    text += f"\nShadow copy: {sqlite_profiler.shadow_copy(db_path)}"
+                return text
+            return "Invalid action. Use 'schema', 'advise' or 'apply'."
+        except Exception as e:
+            return f"Error profiling database: {e}"
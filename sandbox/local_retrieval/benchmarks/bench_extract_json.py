@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: general_llm._extract_json vs the previous shrink-the-end loop.
+
+Builds synthetic model responses of roughly --size bytes (prose, a JSON object,
+more prose) and times both extractors on them.
+
+Usage (from sandbox/local_retrieval):
+  python benchmarks/bench_extract_json.py --size 100000 --repeat 3
+"""
+
+import os, sys, json, time, random, argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from providers.general_llm import _extract_json
+
+def _extract_json_quadratic(text: str):
+    """The previous implementation: json.loads(text[start:j]) for every j from the end."""
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except Exception:
+        pass
+    start = None
+    for i, ch in enumerate(text):
+        if ch in '{[':
+            start = i
+            break
+    if start is not None:
+        for j in range(len(text), start, -1):
+            try:
+                return json.loads(text[start:j])
+            except Exception:
+                continue
+    return {"_raw": text}
+
+def synthetic_response(size: int, seed: int = 0) -> str:
+    """~size bytes: 1/4 prose, 1/2 JSON (nested rows with tricky strings), 1/4 prose."""
+    rnd = random.Random(seed)
+    words = ["invoice", "ledger", "total", "the", "SKU-B", "datasheet", "pin", "revenue", "is", "per"]
+    prose = lambda n: " ".join(rnd.choice(words) for _ in range(n // 6))
+    rows, body = [], 0
+    while body < size // 2:
+        row = {"id": f"INV-{rnd.randint(1000, 9999)}", "amount": round(rnd.random() * 1e4, 2),
+               "note": rnd.choice(["a } brace", "a \"quoted\" ]", "plain", "{not json}"]),
+               "tags": [rnd.choice(words) for _ in range(3)]}
+        rows.append(row)
+        body += len(json.dumps(row))
+    return f"Here is the result. {prose(size // 4)}\n{json.dumps({'rows': rows})}\n{prose(size // 4)} Done."
+
+def _time(fn, text: str, repeat: int):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", type=int, default=100_000, help="Approximate response size in bytes")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--skip-old", action="store_true", help="Only time the new extractor")
+    args = ap.parse_args()
+
+    text = synthetic_response(args.size)
+    new, new_out = _time(_extract_json, text, args.repeat)
+    print(f"response: {len(text):,} bytes")
+    print(f"single-pass extractor: {new * 1e3:10.2f} ms")
+    if not args.skip_old:
+        old, old_out = _time(_extract_json_quadratic, text, 1)
+        assert old_out == new_out
+        print(f"previous loop:         {old * 1e3:10.2f} ms  ({old / new:,.0f}x slower)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+providers/lake.py on a generated pack5-style delta_lake: a year of daily
+`date=YYYY-MM-DD/part-*.csv` partitions, a `_delta_log` with one commit per day
+and late-data rewrites (remove + add). It compares reading one week through
+partition pruning against a full read filtered afterwards, and reports files
+opened and rows returned.
+
+Usage (from sandbox/local_retrieval):
+  python benchmarks/bench_lake.py --days 365 --parts 4 --rows 5000
+"""
+
+import os, sys, json, time, random, shutil, argparse, tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from providers.lake import LakeTable
+
+def make_lake(root: str, days: int, parts: int, rows: int):
+    rng = random.Random(0)
+    log = os.path.join(root, "_delta_log")
+    os.makedirs(log)
+    version = 0
+    start = date(2025, 1, 1)
+    for d in range(days):
+        day = (start + timedelta(days=d)).isoformat()
+        os.makedirs(os.path.join(root, f"date={day}"))
+        adds = []
+        for p in range(parts):
+            rel = f"date={day}/part-{p:05d}.csv"
+            with open(os.path.join(root, rel), "w") as f:
+                f.write("order_id,sku,qty,unit\n")
+                for i in range(rows):
+                    f.write(f"O-{d:03d}{p}{i:05d},SKU-{rng.choice('ABCDE')},{rng.randint(1, 9)},{rng.choice((150.0, 210.0))}\n")
+            adds.append({"path": rel, "size": os.path.getsize(os.path.join(root, rel)), "dataChange": True})
+        commit = {"commitInfo": {"version": version, "operation": "WRITE"}, "add": adds}
+        if d and d % 7 == 0:  # late data: rewrite the previous day's first part
+            prev = (start + timedelta(days=d - 1)).isoformat()
+            old, new = f"date={prev}/part-00000.csv", f"date={prev}/part-{parts:05d}.csv"
+            shutil.copyfile(os.path.join(root, old), os.path.join(root, new))
+            commit["remove"] = [{"path": old, "dataChange": True}]
+            commit["add"].append({"path": new, "size": os.path.getsize(os.path.join(root, new)), "dataChange": True})
+        with open(os.path.join(log, f"{version:06d}.json"), "w") as f:
+            json.dump(commit, f)
+        version += 1
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--parts", type=int, default=4)
+    ap.add_argument("--rows", type=int, default=5000)
+    args = ap.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        t = time.perf_counter()
+        make_lake(root, args.days, args.parts, args.rows)
+        print(f"generated {args.days} partitions x {args.parts} parts x {args.rows} rows "
+              f"in {time.perf_counter() - t:.1f}s")
+
+        t = time.perf_counter()
+        table = LakeTable(root)
+        print(f"log replay: version {table.version}, {len(table.files)} live files "
+              f"in {(time.perf_counter() - t) * 1000:.1f} ms")
+
+        week = [("date", ">=", "2025-03-03"), ("date", "<", "2025-03-10")]
+        t = time.perf_counter()
+        cols = table.read(["date", "sku", "qty"], filters=week)
+        pruned_s = time.perf_counter() - t
+        pruned_files = len(table.last_read)
+        print(f"one week, pruned:   {pruned_s * 1000:8.1f} ms  {pruned_files:4d} files  {len(cols['qty']):,} rows")
+
+        t = time.perf_counter()
+        everything = table.read(["date", "sku", "qty"])
+        rows = [i for i, d in enumerate(everything["date"]) if "2025-03-03" <= d < "2025-03-10"]
+        full_s = time.perf_counter() - t
+        print(f"one week, full read: {full_s * 1000:8.1f} ms  {len(table.last_read):4d} files  {len(rows):,} rows")
+        print(f"speed-up {full_s / pruned_s:.1f}x")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
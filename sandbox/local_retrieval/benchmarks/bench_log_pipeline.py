@@ -0,0 +1,77 @@
+"""
+Throughput of providers/log_pipeline.py on a synthetic nginx access log.
+
+Writes an nginx combined log of about --size-mb megabytes (mostly 2xx with a few
+5xx bursts) plus a matching system.log, then runs the ingestion stage
+(iter_batches + AccessStats) and the burst/system-event correlation, and
+reports lines/sec and peak RSS.
+
+Usage (from sandbox/local_retrieval):
+  python benchmarks/bench_log_pipeline.py --size-mb 1024
+"""
+
+import os, sys, time, random, resource, argparse, tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from providers import log_pipeline
+
+ENDPOINTS = ["/api/health", "/api/payments", "/api/orders", "/static/app.js", "/api/users/42"]
+
+def write_synthetic_logs(dir_path: str, size_mb: int, seed: int = 0):
+    rnd = random.Random(seed)
+    nginx_fp, syslog_fp = os.path.join(dir_path, "nginx.log"), os.path.join(dir_path, "system.log")
+    t, written, target = datetime(2025, 7, 28), 0, size_mb << 20
+    with open(nginx_fp, "w", encoding="utf-8") as ng, open(syslog_fp, "w", encoding="utf-8") as sy:
+        while written < target:
+            lines = []
+            for _ in range(10_000):
+                t += timedelta(milliseconds=rnd.randint(1, 40))
+                burst = t.minute % 97 == 0
+                status = 500 if burst and rnd.random() < 0.3 else rnd.choice((200, 200, 200, 304, 404))
+                path = "/api/payments" if status == 500 else rnd.choice(ENDPOINTS)
+                lines.append(f'10.0.{rnd.randint(0, 255)}.{rnd.randint(1, 254)} - - [{t:%d/%b/%Y:%H:%M:%S} -0700] '
+                             f'"{rnd.choice(("GET", "POST"))} {path} HTTP/1.1" {status} {rnd.randint(10, 5000)} '
+                             f'"-" "python-requests/2.31"\n')
+                if status == 500 and rnd.random() < 0.05:
+                    sy.write(f"{t:%Y-%m-%dT%H:%M:%S}Z payments-worker-{rnd.randint(1, 4)} ERROR: DB deadlock on txn_id={rnd.randint(1, 10**6)}\n")
+                elif rnd.random() < 0.001:
+                    sy.write(f"{t:%Y-%m-%dT%H:%M:%S}Z iptables: Allow from 10.0.0.0/8\n")
+            buf = "".join(lines)
+            ng.write(buf)
+            written += len(buf)
+    return nginx_fp, syslog_fp
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-mb", type=int, default=256)
+    ap.add_argument("--dir", default=None, help="Reuse/keep the synthetic logs in this directory")
+    args = ap.parse_args()
+
+    d = args.dir or tempfile.mkdtemp()
+    nginx_fp, syslog_fp = os.path.join(d, "nginx.log"), os.path.join(d, "system.log")
+    if not os.path.exists(nginx_fp):
+        os.makedirs(d, exist_ok=True)
+        t = time.perf_counter()
+        write_synthetic_logs(d, args.size_mb)
+        print(f"generated {nginx_fp} in {time.perf_counter() - t:.1f}s")
+    size = os.path.getsize(nginx_fp)
+
+    t = time.perf_counter()
+    stats = log_pipeline.AccessStats()
+    for batch in log_pipeline.iter_batches(nginx_fp, log_pipeline.NGINX_COMBINED):
+        stats.update(batch)
+    dt = time.perf_counter() - t
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"access log: {size / 2**20:,.0f} MB, {stats.lines:,} lines")
+    print(f"ingest: {dt:.1f}s  {stats.lines / dt:,.0f} lines/s  {size / 2**20 / dt:,.1f} MB/s  peak RSS {peak_mb:,.0f} MB")
+
+    t = time.perf_counter()
+    bursts = stats.bursts()
+    hits = log_pipeline.correlate(bursts, syslog_fp, tolerance_ms=5 * log_pipeline.MINUTE_MS)
+    n_events = sum(len(h["events"]) for h in hits)
+    print(f"correlate: {len(bursts)} bursts, {n_events} events in {time.perf_counter() - t:.2f}s "
+          f"(syslog {os.path.getsize(syslog_fp) / 2**20:,.1f} MB); top endpoint {stats.top_endpoints(1)}")
+
+if __name__ == "__main__":
+    main()
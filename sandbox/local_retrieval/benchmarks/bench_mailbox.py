@@ -0,0 +1,88 @@
+"""
+"Find the thread mentioning INV-xxxx" on a generated mbox: a full MIME parse
+of every message (stdlib mailbox + regex, what a handler without an index has
+to do) versus providers/mailbox.py's sidecar lookup. Also times the one-off
+index build and an append-only refresh.
+
+Usage (from sandbox/local_retrieval):
+  python benchmarks/bench_mailbox.py --messages 20000
+"""
+
+import os, re, sys, time, random, shutil, argparse, tempfile
+import mailbox as std_mailbox
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from providers.mailbox import MailIndex
+
+def write_message(f, i: int, rng: random.Random):
+    thread = i // 4
+    reply = i % 4
+    subject = ("Re: " if reply else "") + f"Invoice INV-{3000 + thread}"
+    f.write(f"From ap{i}@example.com Sat Jul  5 08:15:00 2025\n"
+            f"From: ap{i}@example.com\nTo: billing@vendorx.com\n"
+            f"Date: Sat, 5 Jul 2025 08:{i % 60:02d}:00 -0700\nSubject: {subject}\n"
+            f"Message-ID: <m{i}@example.com>\n")
+    if reply:
+        f.write(f"In-Reply-To: <m{i - 1}@example.com>\n")
+    f.write('MIME-Version: 1.0\nContent-Type: multipart/mixed; boundary="B"\n\n--B\n'
+            'Content-Type: text/plain; charset=utf-8\n\n'
+            f"Order O-{rng.randint(1000, 9999)} for SKU-{rng.choice('ABC')}, see attached.\n\n"
+            '--B\nContent-Type: application/pdf; name="scan.pdf"\nContent-Transfer-Encoding: base64\n'
+            'Content-Disposition: attachment; filename="scan.pdf"\n\n')
+    f.write(("QUJD" * 19 + "\n") * 40)
+    f.write("--B--\n\n")
+
+def full_parse_search(fp: str, token: str):
+    hits, threads = [], {}
+    for msg in std_mailbox.mbox(fp):
+        text = str(msg["Subject"]) + "\n" + "\n".join(p.get_payload(decode=True).decode(p.get_content_charset() or "utf-8")
+                                             for p in msg.walk() if p.get_content_type() == "text/plain")
+        root = str(msg["In-Reply-To"] or msg["Message-ID"])
+        threads[str(msg["Message-ID"])] = threads.get(root, root)
+        if re.search(r"\b" + re.escape(token) + r"\b", text):
+            hits.append(threads[str(msg["Message-ID"])])
+    return [m for m, t in threads.items() if t in set(hits)]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=20000)
+    args = ap.parse_args()
+
+    root = tempfile.mkdtemp()
+    fp = os.path.join(root, "big.mbox")
+    try:
+        rng = random.Random(0)
+        with open(fp, "w") as f:
+            for i in range(args.messages):
+                write_message(f, i, rng)
+        print(f"generated {args.messages:,} messages, {os.path.getsize(fp) / 1e6:.0f} MB")
+        token = f"INV-{3000 + args.messages // 8}"
+
+        t = time.perf_counter()
+        full = full_parse_search(fp, token)
+        print(f"full MIME parse + regex:  {(time.perf_counter() - t) * 1000:9.1f} ms  {len(full)} messages")
+
+        t = time.perf_counter()
+        idx = MailIndex.open(fp)
+        print(f"index build (once):       {(time.perf_counter() - t) * 1000:9.1f} ms")
+        t = time.perf_counter()
+        hits = idx.thread_mentioning(token)
+        print(f"indexed thread lookup:    {(time.perf_counter() - t) * 1000:9.3f} ms  {len(hits)} messages")
+        idx.close()
+
+        with open(fp, "a") as f:
+            write_message(f, args.messages, rng)
+        t = time.perf_counter()
+        idx = MailIndex.open(fp)
+        print(f"refresh after 1 append:   {(time.perf_counter() - t) * 1000:9.1f} ms  "
+              f"{len(idx.messages()):,} messages indexed")
+        att = idx.attachments(1)[0]
+        t = time.perf_counter()
+        data = idx.read_attachment(att["id"])
+        print(f"lazy attachment decode:   {(time.perf_counter() - t) * 1000:9.3f} ms  {len(data):,} bytes")
+        idx.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
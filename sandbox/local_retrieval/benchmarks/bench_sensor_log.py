@@ -0,0 +1,93 @@
+"""
+Single-pass throughput of providers/sensor_log.py on a synthetic multiplexed log.
+
+Writes a log shaped like pack10_sensor/sensor_log.txt (ACC/GYRO/MAG x,y,z rows and
+18-cell LeftFoot rows, interleaved, with occasional gaps and spikes) of about
+--size-mb megabytes, then runs every operator over it in one pass and reports
+MB/s, rows/s and peak RSS. With --sidecar it also times building the columnar
+sidecar and re-running the queries from it (memory-mapped, no text parsing).
+
+Usage (from sandbox/local_retrieval):
+  python benchmarks/bench_sensor_log.py --size-mb 1024 [--sidecar]
+"""
+
+import os, sys, time, resource, argparse, tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from providers import sensor_log
+
+def write_synthetic_log(fp: str, size_mb: int, seed: int = 0, block: int = 100_000):
+    rnd = np.random.default_rng(seed)
+    target, written, t0 = size_mb << 20, 0, 1705991914500
+    names = np.array(["ACC", "GYRO", "MAG", "LeftFoot"])
+    with open(fp, "w", encoding="utf-8") as f:
+        while written < target:
+            ts = t0 + np.cumsum(rnd.integers(5, 40, block))
+            ts[rnd.random(block) < 1e-4] += 5_000  # gaps
+            t0 = int(ts[-1])
+            which = rnd.choice(4, block, p=[0.42, 0.1, 0.35, 0.13])
+            xyz = rnd.normal(0, 1, (block, 3)) + [0.8, 7.9, 5.6]
+            xyz[rnd.random(block) < 1e-4] *= 6  # spikes
+            lines = []
+            for t, w, (x, y, z) in zip(ts.tolist(), which.tolist(), xyz.tolist()):
+                if w == 3:
+                    cells = ["0"] * 18
+                    if x > 2.5:
+                        cells[9] = str(int(x * 300))
+                    lines.append(f"{t},LeftFoot,{', '.join(cells)}\n")
+                else:
+                    lines.append(f"{t},{names[w]},{x:.7g},{y:.7g},{z:.7g}\n")
+            buf = "".join(lines)
+            f.write(buf)
+            written += len(buf)
+
+def _ops(csv_out=None):
+    ops = {
+        "rates": sensor_log.SampleRates(),
+        "acc_mean": sensor_log.MagnitudeMean("ACC"),
+        "spikes": sensor_log.TopKSpikes("ACC", 3),
+        "gaps": sensor_log.GapDetector("GYRO", 1000),
+        "foot": sensor_log.ActivityPerSecond("LeftFoot"),
+    }
+    if csv_out:
+        ops["mag_csv"] = sensor_log.CsvExport("MAG", csv_out)
+    return ops
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-mb", type=int, default=256)
+    ap.add_argument("--log", default=None, help="Reuse/keep the synthetic log at this path")
+    ap.add_argument("--sidecar", action="store_true", help="Also time the memory-mapped sidecar path")
+    args = ap.parse_args()
+
+    fp = args.log or os.path.join(tempfile.mkdtemp(), "sensor_log.txt")
+    if not os.path.exists(fp):
+        t = time.perf_counter()
+        write_synthetic_log(fp, args.size_mb)
+        print(f"generated {fp} in {time.perf_counter() - t:.1f}s")
+    size = os.path.getsize(fp)
+
+    t = time.perf_counter()
+    res = sensor_log.analyze(sensor_log.iter_chunks(fp), _ops(os.devnull))
+    dt = time.perf_counter() - t
+    rows = sum(r["samples"] for r in res["rates"].values())
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"log: {size / 2**20:,.0f} MB, {rows:,} rows")
+    print(f"single pass: {dt:.1f}s  {size / 2**20 / dt:,.1f} MB/s  {rows / dt:,.0f} rows/s  peak RSS {peak_mb:,.0f} MB")
+    print(f"ACC mean magnitude {res['acc_mean']:.4f}; GYRO gaps {res['gaps']['count']}; top spike {res['spikes'][0]}")
+
+    if args.sidecar:
+        t = time.perf_counter()
+        sensor_log.write_sidecar(fp)
+        print(f"sidecar build: {time.perf_counter() - t:.1f}s")
+        t = time.perf_counter()
+        cols = sensor_log.load_columns(fp)
+        t_open = time.perf_counter() - t
+        warm = sensor_log.analyze([cols], _ops())
+        print(f"sidecar open: {t_open * 1e3:.1f} ms; queries from sidecar: {time.perf_counter() - t:.2f}s")
+        assert warm["gaps"]["count"] == res["gaps"]["count"] and warm["spikes"] == res["spikes"]
+
+if __name__ == "__main__":
+    main()
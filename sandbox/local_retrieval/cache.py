@@ -0,0 +1,238 @@
+"""
+Content-addressed result cache for provider runs.
+
+A cached result is keyed by (provider, provider code fingerprint, prompt, pack dir)
+and stores the pack files and directory listings the run actually touched, each
+with its sha256. A lookup is a hit only if every recorded dependency still hashes
+the same, so editing one file in a pack only invalidates the tasks that read it.
+
+For providers exposing `handler_for(pack_dir, prompt)` (see providers/local_agent.py)
+the fingerprint covers only the handler and the module-level functions, constants
+and sibling modules it transitively references (including what those modules
+import from the package); editing one handler only recomputes the tasks routed
+to it. Other providers are fingerprinted by their
+whole source file.
+
+File hashes are memoized by (size, mtime_ns) in the cache database, so a warm
+lookup costs one stat per dependency.
+"""
+
+import os, sys, json, time, types, inspect, hashlib, sqlite3, threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "harness_cache.sqlite")
+
+# ---------------------- hashing ----------------------
+
+def sha256_file(fp: str, bufsize: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(fp, "rb") as f:
+        for chunk in iter(lambda: f.read(bufsize), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _listing_digest(dp: str) -> str:
+    names = sorted(os.listdir(dp))
+    return hashlib.sha256("\n".join(names).encode("utf-8")).hexdigest()
+
+def _source_of(obj) -> str:
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return repr(obj)
+
+def _sibling_of(val, pkg_dir: str) -> Optional[types.ModuleType]:
+    """The module in `pkg_dir` that `val` is (a module) or was defined in (a function/class), if any."""
+    mod = val if isinstance(val, types.ModuleType) else sys.modules.get(getattr(val, "__module__", None) or "")
+    mod_file = getattr(mod, "__file__", None)
+    if mod_file and os.path.dirname(os.path.abspath(mod_file)) == pkg_dir:
+        return mod
+    return None
+
+def _module_closure(start: Iterable[types.ModuleType], pkg_dir: str, seen: set) -> Iterable[str]:
+    """Source of every sibling module reachable from `start` through module-level imports."""
+    stack = list(start)
+    while stack:
+        mod = stack.pop()
+        if id(mod) in seen:
+            continue
+        seen.add(id(mod))
+        yield _source_of(mod)
+        for val in list(vars(mod).values()):
+            sib = _sibling_of(val, pkg_dir) if isinstance(val, (types.ModuleType, types.FunctionType, type)) else None
+            if sib is not None and id(sib) not in seen:
+                stack.append(sib)
+
+def code_fingerprint(module: types.ModuleType, roots: Iterable[Any] = (), exclude: Iterable[Any] = ()) -> str:
+    """
+    Hash the code a provider call depends on.
+
+    Without roots the whole module source is hashed. With roots (functions of
+    `module`), walk the global names their code objects reference and hash the
+    source of every module-level function reached, the repr of simple constants,
+    and the source of every sibling module (same package directory) they use,
+    followed transitively through that module's own sibling imports. Functions
+    in `exclude` are not walked (e.g. a router that references every handler).
+    """
+    roots = list(roots)
+    if not roots:
+        return hashlib.sha256(_source_of(module).encode("utf-8")).hexdigest()
+
+    pkg_dir = os.path.dirname(os.path.abspath(module.__file__))
+    g = vars(module)
+    seen, parts, stack, siblings = {id(fn) for fn in exclude}, [], list(roots), []
+    seen_modules = {id(module)}
+    while stack:
+        fn = stack.pop()
+        if id(fn) in seen:
+            continue
+        seen.add(id(fn))
+        parts.append(_source_of(fn))
+        codes = [fn.__code__]
+        while codes:
+            code = codes.pop()
+            codes.extend(c for c in code.co_consts if isinstance(c, types.CodeType))
+            for name in code.co_names:
+                val = g.get(name)
+                if isinstance(val, types.FunctionType) and val.__module__ == module.__name__:
+                    stack.append(val)
+                elif isinstance(val, (types.ModuleType, types.FunctionType, type)):
+                    sib = _sibling_of(val, pkg_dir)
+                    if sib is not None and sib is not module:
+                        siblings.append(sib)
+                elif isinstance(val, (str, int, float, tuple, list, dict)):
+                    parts.append(f"{name}={val!r}")
+    parts.extend(_module_closure(siblings, pkg_dir, seen_modules))
+    h = hashlib.sha256()
+    for part in sorted(parts):
+        h.update(part.encode("utf-8"))
+    return h.hexdigest()
+
+# ---------------------- dependency tracking ----------------------
+
+# Every active tracker sees every open in the process, whichever thread makes it: a job's
+# worker threads are covered, and a concurrent job can only add extra dependencies
+# (a spurious miss), never hide one.
+_active: Dict[int, set] = {}
+_active_lock = threading.Lock()
+_hook_installed = False
+
+def _audit_hook(event, args):
+    if not _active:
+        return
+    if event == "open" and isinstance(args[0], (str, bytes, os.PathLike)):
+        item = ("f", os.path.abspath(os.fsdecode(args[0])))
+    elif event == "sqlite3.connect" and isinstance(args[0], (str, os.PathLike)):
+        item = ("f", os.path.abspath(os.fspath(args[0])))
+    elif event in ("os.listdir", "os.scandir") and isinstance(args[0], (str, bytes, os.PathLike)):
+        item = ("d", os.path.abspath(os.fsdecode(args[0])))
+    else:
+        return
+    with _active_lock:
+        for touched in _active.values():
+            touched.add(item)
+
+@contextmanager
+def track_files():
+    """Record files opened and directories listed by any thread while this job is active."""
+    global _hook_installed
+    with _active_lock:
+        if not _hook_installed:
+            sys.addaudithook(_audit_hook)  # audit hooks cannot be removed; it is a no-op when idle
+            _hook_installed = True
+    touched = set()
+    with _active_lock:
+        _active[id(touched)] = touched
+    try:
+        yield touched
+    finally:
+        with _active_lock:
+            _active.pop(id(touched), None)
+
+# ---------------------- cache store ----------------------
+
+class ResultCache:
+    """SQLite-backed store of provider results and memoized file hashes."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+              key TEXT PRIMARY KEY,
+              deps TEXT NOT NULL,     -- JSON {rel_path: sha256}; directories end with '/'
+              raw TEXT NOT NULL,      -- JSON-encoded provider output
+              created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS file_hashes (
+              path TEXT PRIMARY KEY,
+              size_bytes INTEGER NOT NULL,
+              mtime_ns INTEGER NOT NULL,
+              sha256 TEXT NOT NULL
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def key(provider: str, code_hash: str, prompt: str, pack_dir: str = "") -> str:
+        blob = json.dumps([provider, code_hash, prompt, os.path.abspath(pack_dir) if pack_dir else ""])
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def file_sha256(self, fp: str) -> str:
+        st = os.stat(fp)
+        row = self.conn.execute(
+            "SELECT size_bytes, mtime_ns, sha256 FROM file_hashes WHERE path=?", (fp,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        digest = sha256_file(fp)
+        self.conn.execute("INSERT OR REPLACE INTO file_hashes VALUES (?,?,?,?)",
+                          (fp, st.st_size, st.st_mtime_ns, digest))
+        self.conn.commit()
+        return digest
+
+    def _dep_hash(self, root: str, rel: str) -> Optional[str]:
+        fp = os.path.join(root, rel)
+        try:
+            if rel.endswith("/") or rel == "":
+                return _listing_digest(fp)
+            return self.file_sha256(fp)
+        except OSError:
+            return None
+
+    def get(self, key: str, pack_dir: str = "") -> Optional[Dict[str, Any]]:
+        """Return {"raw": ...} if cached and every dependency is unchanged, else None."""
+        row = self.conn.execute("SELECT deps, raw FROM results WHERE key=?", (key,)).fetchone()
+        if not row:
+            return None
+        root = os.path.realpath(pack_dir) if pack_dir else ""
+        for rel, digest in json.loads(row[0]).items():
+            if self._dep_hash(root, rel) != digest:
+                return None
+        return {"raw": json.loads(row[1])}
+
+    def put(self, key: str, raw: Any, touched: Iterable = (), pack_dir: str = ""):
+        """Store a result with the pack files/dirs it touched (others are ignored)."""
+        deps = {}
+        if pack_dir:
+            root = os.path.realpath(pack_dir)
+            for kind, path in touched:
+                real = os.path.realpath(path)
+                if real != root and not real.startswith(root + os.sep):
+                    continue
+                rel = os.path.relpath(real, root)
+                rel = "" if rel == "." else rel
+                if ".cache" in rel.split(os.sep):
+                    continue  # derived sidecars; the sources they were built from are recorded
+                if kind == "d":
+                    rel = rel + "/" if rel else ""
+                elif not os.path.isfile(real):
+                    continue
+                digest = self._dep_hash(root, rel)
+                if digest is not None:
+                    deps[rel] = digest
+        self.conn.execute("INSERT OR REPLACE INTO results VALUES (?,?,?,?)",
+                          (key, json.dumps(deps, sort_keys=True), json.dumps(raw), time.time()))
+        self.conn.commit()
@@ -1,7 +1,11 @@
 import os, sys, json, glob, argparse, importlib, traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
 from typing import Any, Dict
 from tasks import TASKS
 from scoring import score
+from cache import DEFAULT_CACHE_PATH, ResultCache, code_fingerprint, track_files
+from suite_index import SuiteIndex
 
 def json_pointer(d: Dict[str, Any], path):
     cur = d
@@ -69,25 +73,37 @@ def print_results_table(results):
     print(f"{'AVERAGE':<{max_task_len}} | {g_avg:>5.2f} | {a_avg:>5.2f} | {'LLM wins' if g_avg > a_avg else 'Agent wins' if a_avg > g_avg else 'Tie'}")
     print(separator)
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--packs", required=True, help="Directory containing the unzipped packs")
-    ap.add_argument("--out", required=True, help="Path to write a JSON report")
-    ap.add_argument("--runs_dir", default="runs", help="Where to save per-task outputs")
-    args = ap.parse_args()
-
-    # Load providers
-    gllm = importlib.import_module("providers.general_llm")
+def _agent_run(pack_dir: str, prompt: str):
+    """Run the local agent and record the files it touched. Module-level so the process pool can pickle it."""
     agent = importlib.import_module("providers.local_agent")
+    with track_files() as touched:
+        raw = agent.run(pack_dir, prompt)
+    return raw, sorted(touched)
 
-    os.makedirs(args.runs_dir, exist_ok=True)
-    report = {"results": [], "summary": {}}
+def _general_run(gllm, prompt: str):
+    return gllm.run(prompt), []
+
+def _batch_item(batch, pos: int):
+    return batch.result()[pos], []
 
+def _evaluate(call, extractor, expected, unordered=False):
+    """Resolve a provider call and score it; failures score 0 with a traceback."""
+    try:
+        raw = call()
+        got = extractor(maybe_parse_json(raw))
+        s, details = score(expected, got, unordered=unordered)
+    except Exception as e:
+        got, s, details = dict(_error=str(e)), 0.0, {"error": traceback.format_exc()}
+    return got, s, details
+
+def load_jobs(packs: str):
+    """Resolve each task to its pack dir and expected answer, in TASKS order."""
+    jobs = []
     for task in TASKS:
         name = task["name"]
-        pack_matches = glob.glob(os.path.join(args.packs, task["pack_glob"]))
+        pack_matches = glob.glob(os.path.join(packs, task["pack_glob"]))
         if not pack_matches:
-            print(f"[warn] Task {name}: no pack matched {task['pack_glob']} under {args.packs}")
+            print(f"[warn] Task {name}: no pack matched {task['pack_glob']} under {packs}")
             continue
         pack_dir = max(pack_matches, key=len)  # choose the longest path (most specific) if multiple
         answers_path = os.path.join(pack_dir, task["answer_path"])
@@ -99,47 +115,194 @@ def main():
         except Exception as e:
             print(f"[error] Task {name}: failed loading expected answers: {e}")
             continue
+        jobs.append(dict(task=task, pack_dir=pack_dir, expected=expected))
+    return jobs
 
-        prompt = task["prompt"]
-        extractor = task.get("extractor", lambda x: x)
+def _cache_keys(job, gllm, agent):
+    """(general_llm key, local_agent key) for a job; see cache.py for what they cover."""
+    prompt, pack_dir = job["task"]["prompt"], job["pack_dir"]
+    g_code = code_fingerprint(gllm) + getattr(gllm, "DEFAULT_MODEL", "")
+    handler = agent.handler_for(pack_dir, prompt) if hasattr(agent, "handler_for") else None
+    # The router is excluded: the handler it picked is already part of the key.
+    a_code = code_fingerprint(agent, [handler, agent.run], exclude=[agent.handler_for]) if handler else code_fingerprint(agent)
+    return (ResultCache.key("general_llm", g_code, prompt),
+            ResultCache.key("local_agent", a_code, prompt, pack_dir))
 
-        # --- Run General LLM baseline ---
-        try:
-            g_raw = gllm.run(prompt)
-            g_json = extractor(maybe_parse_json(g_raw))
-            g_score, g_details = score(expected, g_json)
-        except Exception as e:
-            g_json, g_score, g_details = dict(_error=str(e)), 0.0, {"error": traceback.format_exc()}
+def _store(cache, key, pack_dir, result):
+    """Unpack a (raw, touched) provider result, caching it unless it is an error."""
+    raw, touched = result
+    if cache is not None and not (isinstance(raw, dict) and "_error" in raw):
+        cache.put(key, raw, touched, pack_dir)
+    return raw
 
-        # --- Run Local Agent ---
-        try:
-            a_raw = agent.run(pack_dir, prompt)
-            a_json = extractor(maybe_parse_json(a_raw))
-            a_score, a_details = score(expected, a_json)
-        except Exception as e:
-            a_json, a_score, a_details = dict(_error=str(e)), 0.0, {"error": traceback.format_exc()}
+def _call_for(hit, produce, cache, key, pack_dir):
+    """Zero-arg callable returning the cached raw output, or producing (and caching) it."""
+    if hit is not None:
+        return lambda: hit["raw"]
+    return lambda: _store(cache, key, pack_dir, produce())
+
+def run_jobs(jobs, gllm, num_jobs: int = 1, cache=None, refresh=(), cache_llm: bool = False):
+    """
+    Yield (job, general_llm_result, local_agent_result, cached_providers) in job order.
+
+    With num_jobs > 1 every provider call is submitted up front: general_llm
+    calls (network-bound) go to a thread pool, as one `run_many` batch when the
+    provider has it, and local_agent calls (CPU-bound) to a process pool. Results are still consumed in TASKS order, so artifacts,
+    log lines and the summary match a serial run.
+
+    With a cache, calls whose key and recorded pack dependencies are unchanged
+    are answered from it, unless the task name is in `refresh`. general_llm
+    output is not deterministic, so it is only cached when `cache_llm` is set.
+    """
+    agent = importlib.import_module("providers.local_agent")
+    threads = procs = None
+    if num_jobs > 1:
+        threads = ThreadPoolExecutor(max_workers=num_jobs)
+        procs = ProcessPoolExecutor(max_workers=num_jobs)
+
+    # Cache lookups first, so only misses are sent to the providers.
+    lookups = []
+    for job in jobs:
+        g_key = a_key = g_hit = a_hit = None
+        if cache is not None:
+            g_key, a_key = _cache_keys(job, gllm, agent)
+            if job["task"]["name"] not in refresh:
+                g_hit = cache.get(g_key) if cache_llm else None
+                a_hit = cache.get(a_key, job["pack_dir"])
+        lookups.append((g_key, a_key, g_hit, a_hit))
+
+    # A provider with run_many gets every missed prompt in one batch it can fan out itself.
+    batch, batch_pos = None, {}
+    if threads is not None and hasattr(gllm, "run_many"):
+        misses = [i for i, lk in enumerate(lookups) if lk[2] is None]
+        batch_pos = {i: n for n, i in enumerate(misses)}
+        if misses:
+            batch = threads.submit(gllm.run_many, [jobs[i]["task"]["prompt"] for i in misses], num_jobs)
+
+    # Resolve every call up front so the pools start working before we block on any result.
+    calls = []
+    for i, (job, (g_key, a_key, g_hit, a_hit)) in enumerate(zip(jobs, lookups)):
+        prompt, pack_dir = job["task"]["prompt"], job["pack_dir"]
+        if i in batch_pos:
+            g_produce = partial(_batch_item, batch, batch_pos[i])
+        elif g_hit is None and threads is not None:
+            g_produce = threads.submit(_general_run, gllm, prompt).result
+        else:
+            g_produce = partial(_general_run, gllm, prompt)
+        if a_hit is None and procs is not None:
+            a_produce = procs.submit(_agent_run, pack_dir, prompt).result
+        else:
+            a_produce = partial(_agent_run, pack_dir, prompt)
+        g_call = _call_for(g_hit, g_produce, cache if cache_llm else None, g_key, "")
+        a_call = _call_for(a_hit, a_produce, cache, a_key, pack_dir)
+
+        cached = [n for n, hit in (("general_llm", g_hit), ("local_agent", a_hit)) if hit is not None]
+        calls.append((g_call, a_call, cached))
+
+    try:
+        for job, (g_call, a_call, cached) in zip(jobs, calls):
+            extractor = job["task"].get("extractor", lambda x: x)
+            unordered = job["task"].get("unordered", False)
+            g = _evaluate(g_call, extractor, job["expected"], unordered)
+            a = _evaluate(a_call, extractor, job["expected"], unordered)
+            yield job, g, a, cached
+    finally:
+        if threads is not None:
+            threads.shutdown()
+            procs.shutdown()
+
+def select_incremental(jobs, packs: str, report_path: str):
+    """
+    Narrow jobs to those whose pack changed according to suite_index.sqlite.
+
+    Returns (jobs to run, previous results by task name, index, changed packs).
+    Tasks with no previous result are always run.
+    """
+    previous = {}
+    if os.path.exists(report_path):
+        with open(report_path, "r", encoding="utf-8") as f:
+            previous = {r["task"]: r for r in json.load(f).get("results", [])}
+    index = SuiteIndex(packs)
+    job_packs = {os.path.relpath(j["pack_dir"], packs) for j in jobs}
+    changed = index.changed_packs(sorted(job_packs))
+    selected = [j for j in jobs
+                if os.path.relpath(j["pack_dir"], packs) in changed or j["task"]["name"] not in previous]
+    names = {j["task"]["name"] for j in jobs}
+    previous = {k: v for k, v in previous.items() if k in names}
+    print(f"[incremental] changed packs: {', '.join(sorted(changed)) or 'none'}; "
+          f"re-running {len(selected)}/{len(jobs)} tasks")
+    return selected, previous, index, changed
+
+def save_artifacts(out_dir: str, expected, g_json, a_json):
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "expected.json"), "w", encoding="utf-8") as f:
+        json.dump(expected, f, indent=2, ensure_ascii=False)
+    with open(os.path.join(out_dir, "general_llm.json"), "w", encoding="utf-8") as f:
+        json.dump(g_json, f, indent=2, ensure_ascii=False)
+    with open(os.path.join(out_dir, "local_agent.json"), "w", encoding="utf-8") as f:
+        json.dump(a_json, f, indent=2, ensure_ascii=False)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--packs", required=True, help="Directory containing the unzipped packs")
+    ap.add_argument("--out", required=True, help="Path to write a JSON report")
+    ap.add_argument("--runs_dir", default="runs", help="Where to save per-task outputs")
+    ap.add_argument("--jobs", type=int, default=1, help="Run tasks concurrently with N workers per provider (1 = serial)")
+    ap.add_argument("--cache", action=argparse.BooleanOptionalAction, default=True,
+                    help="Reuse local_agent results whose prompt, provider code and touched pack files are unchanged")
+    ap.add_argument("--cache_llm", action=argparse.BooleanOptionalAction, default=False,
+                    help="Also cache general_llm results (off by default: hosted model output is not deterministic)")
+    ap.add_argument("--cache_path", default=DEFAULT_CACHE_PATH, help="SQLite file backing the result cache")
+    ap.add_argument("--refresh", action="append", default=[], metavar="TASK",
+                    help="Ignore cached results for this task (repeatable)")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Only re-run tasks whose pack changed since suite_index.sqlite was last refreshed, "
+                         "merging them into the existing --out report")
+    args = ap.parse_args()
+
+    # Load providers
+    gllm = importlib.import_module("providers.general_llm")
+
+    os.makedirs(args.runs_dir, exist_ok=True)
+    report = {"results": [], "summary": {}}
+
+    cache = ResultCache(args.cache_path) if args.cache else None
+    jobs = load_jobs(args.packs)
+    previous, index, changed = {}, None, {}
+    if args.incremental:
+        jobs, previous, index, changed = select_incremental(jobs, args.packs, args.out)
+    for job, (g_json, g_score, g_details), (a_json, a_score, a_details), cached in run_jobs(
+            jobs, gllm, args.jobs, cache=cache, refresh=set(args.refresh), cache_llm=args.cache_llm):
+        task, pack_dir = job["task"], job["pack_dir"]
+        name = task["name"]
 
         # Save artifacts
         out_dir = os.path.join(args.runs_dir, name)
-        os.makedirs(out_dir, exist_ok=True)
-        with open(os.path.join(out_dir, "expected.json"), "w", encoding="utf-8") as f:
-            json.dump(expected, f, indent=2, ensure_ascii=False)
-        with open(os.path.join(out_dir, "general_llm.json"), "w", encoding="utf-8") as f:
-            json.dump(a_json if False else g_json, f, indent=2, ensure_ascii=False)  # keep var for clarity
-        with open(os.path.join(out_dir, "local_agent.json"), "w", encoding="utf-8") as f:
-            json.dump(a_json, f, indent=2, ensure_ascii=False)
+        save_artifacts(out_dir, job["expected"], g_json, a_json)
 
         report["results"].append({
             "task": name,
             "pack_dir": pack_dir,
-            "prompt": prompt,
+            "prompt": task["prompt"],
             "expected_keys": task["answer_key_path"],
             "general_llm": {"score": g_score, "details": g_details},
             "local_agent": {"score": a_score, "details": a_details},
             "artifacts_dir": out_dir
         })
 
-        print(f"[task] {name} → LLM {g_score:.2f} | Agent {a_score:.2f}")
+        note = f" (cached: {', '.join(cached)})" if cached else ""
+        print(f"[task] {name} → LLM {g_score:.2f} | Agent {a_score:.2f}{note}")
+
+    if cache is not None:
+        cache.close()
+
+    if args.incremental:
+        # Keep TASKS order; tasks we did not re-run keep their previous result.
+        fresh = {r["task"]: r for r in report["results"]}
+        report["results"] = [fresh.get(t["name"]) or previous[t["name"]]
+                             for t in TASKS if t["name"] in fresh or t["name"] in previous]
+        index.refresh(sorted(changed))
+        index.close()
 
     # Summary
     if report["results"]:
@@ -14,65 +14,152 @@ Supported queries:
 - Which customers spent more than $20 in total?
 - Calculate tip percentage for each receipt.
 - How many receipts are there in the database?
+
+Each query is compiled to an intent: a fixed SQL statement with `?` parameters,
+so user values are never formatted into SQL and the statement is prepared once
+per connection. The interactive session keeps one connection open. It also
+materializes the aggregates these queries repeat (per-customer totals, average
+and max tip, overall totals, the top-priced receipt, a per-customer row index)
+into TEMP tables. These are rebuilt when `PRAGMA data_version` shows another
+connection changed the database. One-shot queries skip the summary and run
+directly against `receipts`.
 """
 
+import os
 import sqlite3
 import argparse
 import re
 import sys
+import urllib.parse
+
+# intent -> (direct SQL, SQL over the TEMP summary tables or None when the query must scan receipts)
+INTENTS = {
+    'all_receipts': (
+        'SELECT * FROM receipts',
+        None),
+    'total_spent': (
+        'SELECT SUM(price + tip) AS total_spent FROM receipts',
+        'SELECT total_spent FROM temp.receipt_stats'),
+    'average_tip': (
+        'SELECT customer_name, AVG(tip) AS average_tip FROM receipts GROUP BY customer_name',
+        'SELECT customer_name, average_tip FROM temp.customer_totals ORDER BY customer_name'),
+    'tipped_more_than': (
+        'SELECT DISTINCT customer_name FROM receipts WHERE tip > ?',
+        # same order as DISTINCT over a table scan: by each customer's first qualifying row
+        'SELECT c.customer_name FROM temp.customer_totals c WHERE c.max_tip > ?1 '
+        'ORDER BY (SELECT r.row_id FROM temp.customer_rows r '
+        'WHERE r.customer_name = c.customer_name AND r.tip > ?1 ORDER BY r.row_id LIMIT 1)'),
+    'highest_price': (
+        'SELECT * FROM receipts ORDER BY price DESC LIMIT 1',
+        'SELECT * FROM temp.top_receipt'),
+    'smallest_tip': (
+        'SELECT MIN(tip) AS smallest_tip FROM receipts',
+        'SELECT smallest_tip FROM temp.receipt_stats'),
+    'purchases_by': (
+        'SELECT * FROM receipts WHERE customer_name = ?',
+        'SELECT r.* FROM temp.customer_rows c JOIN receipts r ON r.rowid = c.row_id '
+        'WHERE c.customer_name = ? ORDER BY c.row_id'),
+    'spent_more_than': (
+        'SELECT customer_name, SUM(price + tip) AS total_spent FROM receipts '
+        'GROUP BY customer_name HAVING total_spent > ?',
+        'SELECT customer_name, total_spent FROM temp.customer_totals WHERE total_spent > ? ORDER BY customer_name'),
+    'tip_percentage': (
+        'SELECT receipt_id, customer_name, (tip / price) * 100.0 AS tip_percentage FROM receipts',
+        None),
+    'receipt_count': (
+        'SELECT COUNT(*) AS receipt_count FROM receipts',
+        'SELECT receipt_count FROM temp.receipt_stats'),
+}
+
+SUMMARY_SQL = [
+    'DROP TABLE IF EXISTS temp.customer_totals',
+    'DROP TABLE IF EXISTS temp.receipt_stats',
+    'DROP TABLE IF EXISTS temp.top_receipt',
+    'DROP TABLE IF EXISTS temp.customer_rows',
+    'CREATE TEMP TABLE customer_totals AS '
+    'SELECT customer_name, SUM(price + tip) AS total_spent, AVG(tip) AS average_tip, MAX(tip) AS max_tip '
+    'FROM receipts GROUP BY customer_name',
+    'CREATE INDEX temp.customer_totals_name ON customer_totals (customer_name)',
+    'CREATE TEMP TABLE receipt_stats AS '
+    'SELECT COUNT(*) AS receipt_count, SUM(price + tip) AS total_spent, MIN(tip) AS smallest_tip FROM receipts',
+    'CREATE TEMP TABLE top_receipt AS SELECT * FROM receipts ORDER BY price DESC LIMIT 1',
+    'CREATE TEMP TABLE customer_rows AS SELECT customer_name, rowid AS row_id, tip FROM receipts',
+    'CREATE INDEX temp.customer_rows_name ON customer_rows (customer_name, row_id, tip)',
+]
 
 def parse_query(query):
+    """Returns (intent, params) for a supported query, or None."""
     # Normalize the query string
     original = query.strip()
     original = original.strip('"\' "').rstrip('.')
     q = original.lower()
 
     if 'show me all receipts' in q:
-        sql = 'SELECT * FROM receipts'
+        return 'all_receipts', ()
     elif 'total amount spent' in q:
-        sql = 'SELECT SUM(price + tip) AS total_spent FROM receipts'
+        return 'total_spent', ()
     elif 'average tip' in q and 'customer' in q:
-        sql = 'SELECT customer_name, AVG(tip) AS average_tip FROM receipts GROUP BY customer_name'
+        return 'average_tip', ()
     elif (m := re.search(r'tipped more than \$?(\d+(?:\.\d+)?)', q)):
-        x = m.group(1)
-        sql = f'SELECT DISTINCT customer_name FROM receipts WHERE tip > {x}'
+        return 'tipped_more_than', (float(m.group(1)),)
     elif 'highest price' in q:
-        sql = 'SELECT * FROM receipts ORDER BY price DESC LIMIT 1'
+        return 'highest_price', ()
     elif 'smallest tip' in q or 'min tip' in q:
-        sql = 'SELECT MIN(tip) AS smallest_tip FROM receipts'
+        return 'smallest_tip', ()
     elif 'purchases by' in q:
         m = re.search(r'purchases by\s+(.+)', original, re.IGNORECASE)
         if m:
-            name = m.group(1).strip("'\" ")
-            sql = f"SELECT * FROM receipts WHERE customer_name = '{name}'"
-        else:
-            sql = None
+            return 'purchases_by', (m.group(1).strip("'\" "),)
     elif 'customers spent more than' in q:
         m = re.search(r'customers spent more than \$?(\d+(?:\.\d+)?)', q)
         if m:
-            x = m.group(1)
-            sql = f'SELECT customer_name, SUM(price + tip) AS total_spent FROM receipts GROUP BY customer_name HAVING total_spent > {x}'
-        else:
-            sql = None
+            return 'spent_more_than', (float(m.group(1)),)
     elif 'tip percentage' in q:
-        sql = 'SELECT receipt_id, customer_name, (tip / price) * 100.0 AS tip_percentage FROM receipts'
+        return 'tip_percentage', ()
     elif 'how many receipts' in q or 'number of receipts' in q:
-        sql = 'SELECT COUNT(*) AS receipt_count FROM receipts'
-    else:
-        sql = None
-    return sql
+        return 'receipt_count', ()
+    return None
 
-def execute_query(db_path, sql):
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    try:
-        cur.execute(sql)
+class ReceiptSession:
+    """One read-only connection for the whole session, with optional TEMP summary tables."""
+
+    def __init__(self, db_path, use_summary=True):
+        uri = 'file:' + urllib.parse.quote(os.path.abspath(db_path)) + '?mode=ro'
+        self.conn = sqlite3.connect(uri, uri=True, cached_statements=len(INTENTS) * 2)
+        self.conn.row_factory = sqlite3.Row
+        self.use_summary = use_summary
+        self.data_version = None
+
+    def refresh_summary(self):
+        """Rebuilds the summary tables if the database changed since the last build."""
+        version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        if version == self.data_version:
+            return
+        with self.conn:
+            for statement in SUMMARY_SQL:
+                self.conn.execute(statement)
+        self.data_version = version
+
+    def execute(self, intent, params=()):
+        direct_sql, summary_sql = INTENTS[intent]
+        sql = direct_sql
+        if self.use_summary and summary_sql:
+            self.refresh_summary()
+            sql = summary_sql
+        cur = self.conn.execute(sql, params)
         rows = cur.fetchall()
         cols = [col[0] for col in cur.description]
+        return rows, cols
+
+    def close(self):
+        self.conn.close()
+
+def execute_query(db_path, intent, params=()):
+    session = ReceiptSession(db_path, use_summary=False)
+    try:
+        return session.execute(intent, params)
     finally:
-        conn.close()
-    return rows, cols
+        session.close()
 
 def format_and_print(rows, columns):
     if not rows:
@@ -96,35 +183,39 @@ def main():
 
     if args.interactive or not args.query:
         print("Entering interactive mode. Type 'exit' or 'quit' to leave.")
-        while True:
-            try:
-                user_input = input('Query> ')
-            except (EOFError, KeyboardInterrupt):
-                print()
-                break
-            if user_input.lower() in ('exit', 'quit'):
-                break
-            sql = parse_query(user_input)
-            if not sql:
-                print("Sorry, I couldn't understand that query.")
-                continue
-            try:
-                rows, cols = execute_query(args.db, sql)
-                format_and_print(rows, cols)
-            except Exception as e:
-                print(f'Error: {e}')
+        session = ReceiptSession(args.db)
+        try:
+            while True:
+                try:
+                    user_input = input('Query> ')
+                except (EOFError, KeyboardInterrupt):
+                    print()
+                    break
+                if user_input.lower() in ('exit', 'quit'):
+                    break
+                parsed = parse_query(user_input)
+                if not parsed:
+                    print("Sorry, I couldn't understand that query.")
+                    continue
+                try:
+                    rows, cols = session.execute(*parsed)
+                    format_and_print(rows, cols)
+                except Exception as e:
+                    print(f'Error: {e}')
+        finally:
+            session.close()
     else:
         query = ' '.join(args.query)
-        sql = parse_query(query)
-        if not sql:
+        parsed = parse_query(query)
+        if not parsed:
             print("Sorry, I couldn't understand that query.")
             sys.exit(1)
         try:
-            rows, cols = execute_query(args.db, sql)
+            rows, cols = execute_query(args.db, *parsed)
             format_and_print(rows, cols)
         except Exception as e:
             print(f'Error: {e}')
             sys.exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -10,21 +10,129 @@ Usage:
   out = general_llm.run("Return JSON with keys a,b,c ...")
   # returns a Python object (dict/list) parsed from model output
 
+  outs = general_llm.run_many(["prompt 1", "prompt 2", ...])
+  # same, for many prompts concurrently; results come back in prompt order
+
 Notes:
 - We strongly encourage you to prompt Gemini to return STRICT JSON.
-- If the model replies with text, we attempt to extract the first {...} JSON block.
+- If the model replies with text, we extract an embedded JSON value: a fenced
+  ```json block if there is one, else the largest {...}/[...] span that parses.
+- REST calls share one keep-alive `requests.Session` and retry 429/5xx and
+  connection errors with exponential backoff (honoring Retry-After).
+- `run_many` fans prompts out on asyncio, at most GEMINI_CONCURRENCY in flight,
+  each through the same SDK-then-REST call as `run`, so serial and parallel
+  harness runs query the model the same way.
+- GEMINI_API_BASE points the REST client at another server, e.g. a local
+  stand-in that mimics the generateContent response shape.
 """
 
-import os, json, re, logging
-from typing import Any, Dict, Union
+import os, json, re, time, random, asyncio, logging, threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-pro")
 API_KEY_ENV = "GEMINI_API_KEY"
+API_BASE = os.environ.get("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+MAX_CONCURRENCY = int(os.environ.get("GEMINI_CONCURRENCY", "8"))
+MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", "5"))
+REQUEST_TIMEOUT = float(os.environ.get("GEMINI_TIMEOUT", "60"))
+BACKOFF_BASE = 0.5   # seconds; doubled per attempt
+BACKOFF_MAX = 30.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+SYS_INST = (
+    "You are a data extraction engine. "
+    "Always respond with STRICT JSON only, no markdown or prose."
+)
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?[ \t]*\n(.*?)```", re.S)
+_OPEN_RE = re.compile(r"[{\[]")
+# Inside a bracket: a complete string literal (escapes honored), a bracket, or a stray quote.
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\]]|"')
+_CLOSER_FOR = {"}": "{", "]": "["}
+
+def _json_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    Single pass over `text` returning the (start, end) of every balanced {...}/[...] span.
+
+    Brackets inside string literals are ignored. Quotes outside any bracket are
+    treated as prose. A mismatched closer or an unterminated string abandons the
+    open spans and scanning resumes right after it, so the pass stays linear.
+    """
+    spans, stack = [], []  # stack holds (bracket, start) of open spans
+    pos, n = 0, len(text)
+    while pos < n:
+        if not stack:
+            m = _OPEN_RE.search(text, pos)
+            if not m:
+                break
+            stack.append((m.group(), m.start()))
+            pos = m.end()
+            continue
+        m = _TOKEN_RE.search(text, pos)
+        if not m:
+            break
+        tok, pos = m.group(), m.end()
+        if tok in "{[":
+            stack.append((tok, m.start()))
+        elif tok in "}]":
+            if stack[-1][0] == _CLOSER_FOR[tok]:
+                spans.append((stack.pop()[1], pos))
+            else:
+                stack.clear()
+        elif tok == '"':
+            stack.clear()  # unterminated string literal
+    return spans
+
+def _json_candidates(text: str) -> List[Any]:
+    """
+    Every JSON value embedded in `text`: fenced ```json blocks first, then bare
+    bracket spans, each group largest first.
+
+    Bare candidates are the outermost balanced bracket spans; when an outer span
+    does not parse, its nested spans are tried instead. Values nested too deeply
+    for the json module (RecursionError) are skipped like any other parse failure.
+    """
+    found, fenced = {}, set()  # (start, end) -> value; spans that came from fences
+
+    for m in _FENCE_RE.finditer(text):
+        body = m.group(1).strip()
+        try:
+            span = (m.start(1), m.start(1) + len(body))
+            found[span] = json.loads(body)
+            fenced.add(span)
+        except (ValueError, RecursionError):
+            pass
+
+    # Spans are laminar (nested or disjoint): walk them as a forest, outermost first.
+    spans = sorted(_json_spans(text), key=lambda se: (se[0], -se[1]))
+    children = {None: []}
+    open_spans = []
+    for span in spans:
+        while open_spans and span[0] >= open_spans[-1][1]:
+            open_spans.pop()
+        children.setdefault(open_spans[-1] if open_spans else None, []).append(span)
+        children[span] = []
+        open_spans.append(span)
+
+    todo = list(reversed(children[None]))
+    while todo:
+        span = todo.pop()
+        if any(s <= span[0] and span[1] <= e for s, e in found):
+            continue  # already covered, e.g. by a fenced block
+        try:
+            found[span] = json.loads(text[span[0]:span[1]])
+        except (ValueError, RecursionError):
+            todo.extend(reversed(children[span]))
+
+    ranked = sorted(found.items(), key=lambda kv: (kv[0] not in fenced, -(kv[0][1] - kv[0][0]), kv[0][0]))
+    return [v for _, v in ranked]
 
 def _extract_json(text: str) -> Union[dict, list, str]:
-    """Try to parse JSON; if mixed text, extract the first {...} or [...] block."""
+    """Try to parse JSON; if mixed text, return the fenced ```json block, else the largest embedded {...} or [...] value."""
     text = text.strip()
     # Direct parse first
     try:
@@ -32,40 +140,29 @@ def _extract_json(text: str) -> Union[dict, list, str]:
     except Exception:
         pass
 
-    # Greedy search for first balanced JSON-looking block
-    # Simple heuristic: find first '{' or '[' and last matching '}' or ']'
-    start = None
-    for i, ch in enumerate(text):
-        if ch in '{[':
-            start = i
-            break
-    if start is not None:
-        # Try progressively shrinking the end to the last brace/bracket
-        for j in range(len(text), start, -1):
-            chunk = text[start:j]
-            try:
-                return json.loads(chunk)
-            except Exception:
-                continue
+    candidates = _json_candidates(text)
+    if candidates:
+        return candidates[0]
 
     # As a last resort, return raw text
     return {"_raw": text}
 
-def _call_gemini_with_sdk(prompt: str, api_key: str) -> str:
+@lru_cache(maxsize=4)
+def _sdk_model(api_key: str, model_name: str):
+    """Configure the SDK and build the model once per (key, model)."""
     import google.generativeai as genai
     genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(DEFAULT_MODEL)
+    return genai.GenerativeModel(model_name)
+
+def _call_gemini_with_sdk(prompt: str, api_key: str) -> str:
+    model = _sdk_model(api_key, DEFAULT_MODEL)
     # Use a JSON-focused prompt to improve structure
-    sys_inst = (
-        "You are a data extraction engine. "
-        "Always respond with STRICT JSON only, no markdown or prose."
-    )
     # SDK supports system_instruction in newer versions; fall back if not present
     try:
-        resp = model.generate_content([{"role":"user","parts":[sys_inst + "\n\n" + prompt]}])
+        resp = model.generate_content([{"role":"user","parts":[SYS_INST + "\n\n" + prompt]}])
     except TypeError:
         # older SDKs
-        resp = model.generate_content(sys_inst + "\n\n" + prompt)
+        resp = model.generate_content(SYS_INST + "\n\n" + prompt)
     # Handle candidates
     if hasattr(resp, "text") and resp.text:
         return resp.text
@@ -78,22 +175,65 @@ def _call_gemini_with_sdk(prompt: str, api_key: str) -> str:
     except Exception as e:
         return ""
 
-def _call_gemini_rest(prompt: str, api_key: str) -> str:
-    import requests
-    # Using the "generateContent" endpoint for 1.5 models.
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{DEFAULT_MODEL}:generateContent?key={api_key}"
-    sys_inst = (
-        "You are a data extraction engine. "
-        "Always respond with STRICT JSON only, no markdown or prose."
-    )
-    payload = {
+# ---------------------- REST client ----------------------
+
+_session = None
+_session_lock = threading.Lock()
+
+def _get_session(pool_size: int = MAX_CONCURRENCY):
+    """
+    One keep-alive session per process. Its pool holds at least `pool_size` connections
+    (MAX_CONCURRENCY by default) and grows when more concurrent callers are announced;
+    urllib3 discards the connections that do not fit back into a full pool.
+    """
+    global _session
+    pool_size = max(pool_size, MAX_CONCURRENCY, 1)
+    with _session_lock:
+        if _session is None:
+            import requests
+            _session = requests.Session()
+            _session.pool_size = 0
+        if pool_size > _session.pool_size:
+            from requests.adapters import HTTPAdapter
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.pool_size = pool_size
+        return _session
+
+def _rest_payload(prompt: str) -> Dict[str, Any]:
+    return {
         "contents": [
-            {"parts": [{"text": sys_inst + "\n\n" + prompt}]}  # single user message
+            {"parts": [{"text": SYS_INST + "\n\n" + prompt}]}  # single user message
         ]
     }
-    r = requests.post(url, json=payload, timeout=60)
-    r.raise_for_status()
-    data = r.json()
+
+def _rest_attempt(prompt: str, api_key: str) -> Tuple[Optional[str], Optional[float], Optional[Exception]]:
+    """
+    One generateContent request. Returns (text, retry_after, error):
+    text is set on success; error is set when the attempt failed, with
+    retry_after (seconds, possibly 0) when it is worth retrying.
+    """
+    import requests
+    # Using the "generateContent" endpoint for 1.5 models.
+    url = f"{API_BASE}/models/{DEFAULT_MODEL}:generateContent?key={api_key}"
+    try:
+        r = _get_session().post(url, json=_rest_payload(prompt), timeout=REQUEST_TIMEOUT)
+    except (requests.ConnectionError, requests.Timeout) as e:
+        return None, 0.0, e
+    if r.status_code in RETRY_STATUS:
+        try:
+            retry_after = float(r.headers.get("Retry-After", 0))
+        except ValueError:
+            retry_after = 0.0
+        return None, retry_after, requests.HTTPError(f"{r.status_code} from generateContent", response=r)
+    try:
+        r.raise_for_status()
+    except requests.HTTPError as e:
+        return None, None, e
+    return _parse_rest_response(r.json()), None, None
+
+def _parse_rest_response(data: Dict[str, Any]) -> str:
     # Parse the first text part
     try:
         candidates = data.get("candidates", [])
@@ -105,14 +245,23 @@ def _call_gemini_rest(prompt: str, api_key: str) -> str:
         pass
     return json.dumps({"_raw_api_response": data})
 
-def run(prompt: str) -> Any:
-    """Call Gemini WITHOUT local file access and return a Python object (dict/list/scalars)."""
-    api_key = os.environ.get(API_KEY_ENV, "").strip()
-    if not api_key:
-        # Return a helpful error as JSON
-        return {"_error": f"Missing {API_KEY_ENV}. Please export your Gemini API key."}
+def _backoff_delay(attempt: int, retry_after: float) -> float:
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return max(retry_after, delay * (0.5 + random.random() / 2))  # jitter
+
+def _call_gemini_rest(prompt: str, api_key: str) -> str:
+    for attempt in range(MAX_RETRIES + 1):
+        text, retry_after, err = _rest_attempt(prompt, api_key)
+        if err is None:
+            return text
+        if retry_after is None or attempt == MAX_RETRIES:
+            raise err
+        delay = _backoff_delay(attempt, retry_after)
+        logger.info("Gemini REST attempt %d failed (%s); retrying in %.1fs", attempt + 1, err, delay)
+        time.sleep(delay)
 
-    # Try SDK first, then REST fallback
+def _complete(prompt: str, api_key: str) -> Any:
+    """SDK first, then REST with retries; the one call behind both `run` and `run_many`."""
     text = ""
     try:
         text = _call_gemini_with_sdk(prompt, api_key)
@@ -125,5 +274,33 @@ def run(prompt: str) -> Any:
 
     if not text:
         return {"_error": "Gemini returned empty response."}
+    try:
+        return _extract_json(text)
+    except Exception as e:  # one unparseable reply must not fail a whole batch
+        return {"_error": f"Could not parse reply: {e.__class__.__name__}: {e}"}
+
+def run(prompt: str) -> Any:
+    """Call Gemini WITHOUT local file access and return a Python object (dict/list/scalars)."""
+    api_key = os.environ.get(API_KEY_ENV, "").strip()
+    if not api_key:
+        # Return a helpful error as JSON
+        return {"_error": f"Missing {API_KEY_ENV}. Please export your Gemini API key."}
+    return _complete(prompt, api_key)
+
+async def run_many_async(prompts: List[str], concurrency: Optional[int] = None) -> List[Any]:
+    """Async `run_many`: the same call as `run` in worker threads, at most `concurrency` in flight."""
+    api_key = os.environ.get(API_KEY_ENV, "").strip()
+    if not api_key:
+        return [{"_error": f"Missing {API_KEY_ENV}. Please export your Gemini API key."} for _ in prompts]
+    limit = max(concurrency or MAX_CONCURRENCY, 1)
+    try:
+        _get_session(limit)  # room for `limit` keep-alive connections
+    except ImportError:  # no requests: SDK calls only
+        pass
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=limit, thread_name_prefix="gemini") as pool:
+        return await asyncio.gather(*(loop.run_in_executor(pool, _complete, p, api_key) for p in prompts))
 
-    return _extract_json(text)
\ No newline at end of file
+def run_many(prompts: List[str], concurrency: Optional[int] = None) -> List[Any]:
+    """Run many prompts concurrently; returns one result per prompt, in order (errors as {"_error": ...})."""
+    return asyncio.run(run_many_async(list(prompts), concurrency))
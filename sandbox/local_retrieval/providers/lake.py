@@ -0,0 +1,274 @@
+"""
+Reader for pack-style lake directories: Hive partitions (`key=value/` path
+segments) of CSV or Parquet part files, optionally with a Delta-style
+`_delta_log/`.
+
+With a log, the live file set is the replay of its numbered JSON commits
+(`add`/`remove` actions, up to `as_of` when given). Each commit may be one JSON
+object whose `add`/`remove` hold a list, as in pack5, or the Delta layout of one
+action per line. Without a log, every data file under the root is live (pack4's
+data_lake).
+
+Filters are (column, op, value) triples. Partition columns are compared against
+the path values (or the commit's `partitionValues`), and files whose partition
+cannot match are never opened. An `add` action's `stats` min/max values prune
+further. The remaining parts are opened and parsed on a bounded thread pool
+(at most `workers` files open at once) into one list per column, whose type
+is inferred once over all parts.
+Filters on data columns are then applied row by row.
+Columns come back as NumPy arrays when NumPy is available, lists otherwise.
+
+  t = LakeTable(os.path.join(pack_dir, "delta_lake"))
+  t.version, [f.path for f in t.files]
+  cols = t.read(["order_id", "qty"], filters=[("date", ">=", "2025-07-01"), ("date", "<", "2025-07-08")])
+
+Parquet parts need pyarrow. CSV works everywhere.
+"""
+
+import os, csv, json, operator, urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # plain lists instead of arrays
+    np = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # CSV only
+    pq = None
+
+DATA_SUFFIXES = (".csv", ".parquet")
+READ_WORKERS = min(8, os.cpu_count() or 1)
+
+_OPS = {"=": operator.eq, "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+        ">": operator.gt, ">=": operator.ge, "in": lambda a, b: a in b}
+
+class LakeFile(NamedTuple):
+    path: str                       # relative to the table root, '/'-separated
+    partitions: Dict[str, str]
+    stats: Optional[Dict[str, Any]]  # {"minValues": {...}, "maxValues": {...}} from the log, if any
+    size: Optional[int]
+
+Filter = Tuple[str, str, Any]
+
+def _path_partitions(rel_path: str) -> Dict[str, str]:
+    return dict(seg.split("=", 1) for seg in rel_path.split("/")[:-1] if "=" in seg)
+
+def _coerce(value: Any, like: Any) -> Any:
+    """Brings a partition/stat string to the filter value's type (ISO dates compare fine as strings)."""
+    if isinstance(value, str) and isinstance(like, (int, float)) and not isinstance(like, bool):
+        try:
+            return type(like)(value)
+        except ValueError:
+            return value
+    return value
+
+def _matches(value: Any, op: str, target: Any) -> bool:
+    if value is None:
+        return False
+    if op == "in":
+        return any(_matches(value, "=", t) for t in target)
+    try:
+        return _OPS[op](_coerce(value, target), target)
+    except TypeError:
+        return False
+
+def _may_match(stats: Optional[Dict[str, Any]], column: str, op: str, target: Any) -> bool:
+    """False only when the file's min/max stats rule the filter out."""
+    if not stats:
+        return True
+    lo = (stats.get("minValues") or {}).get(column)
+    hi = (stats.get("maxValues") or {}).get(column)
+    if lo is None or hi is None:
+        return True
+    try:
+        lo, hi = _coerce(lo, target), _coerce(hi, target)
+        if op in ("=", "=="):
+            return lo <= target <= hi
+        if op in ("<", "<="):
+            return _OPS[op](lo, target)
+        if op in (">", ">="):
+            return _OPS[op](hi, target)
+    except TypeError:
+        pass
+    return True
+
+def _log_actions(fp: str) -> List[Dict[str, Any]]:
+    with open(fp, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        docs = [json.loads(text)]
+    except json.JSONDecodeError:  # Delta layout: one action per line
+        docs = [json.loads(line) for line in text.splitlines() if line.strip()]
+    actions = []
+    for doc in docs:
+        for kind in ("remove", "add"):  # a rewrite in one commit removes the old part first
+            items = doc.get(kind)
+            for item in items if isinstance(items, list) else [items] if items else []:
+                actions.append({kind: item})
+    return actions
+
+def _cast(cast, kinds, value: Any) -> Any:
+    if isinstance(value, str) or (isinstance(value, kinds) and not isinstance(value, bool)):
+        return cast(value)
+    raise ValueError(value)
+
+def _infer(values: List[Any]) -> List[Any]:
+    """
+    One column gathered from every part -> ints, floats (missing = nan) or the values
+    as they are. CSV parts give strings; values a Parquet part already typed are kept
+    when they fit, so a column gets a single type across parts.
+    """
+    present = [v for v in values if v is not None and v != ""]
+    for cast, kinds in ((int, (int,)), (float, (int, float))):
+        try:
+            converted = [_cast(cast, kinds, v) for v in present]
+        except (ValueError, TypeError):
+            continue
+        if len(present) == len(values):
+            return converted
+        if cast is int:  # missing values: fall through to float with nan
+            continue
+        it = iter(converted)
+        return [next(it) if v is not None and v != "" else float("nan") for v in values]
+    return values
+
+def _read_csv(fp: str, columns: Optional[Sequence[str]]) -> Tuple[int, Dict[str, List[Any]]]:
+    """(row count, {column: raw strings}); the row count holds even when no column is wanted."""
+    with open(fp, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        wanted = [c for c in header if columns is None or c in columns]
+        idx = [header.index(c) for c in wanted]
+        data: Dict[str, List[str]] = {c: [] for c in wanted}
+        lists = [data[c] for c in wanted]
+        n = 0
+        for row in reader:
+            if not row:
+                continue
+            n += 1
+            for out, i in zip(lists, idx):
+                out.append(row[i] if i < len(row) else "")
+    return n, data
+
+def _read_parquet(fp: str, columns: Optional[Sequence[str]]) -> Tuple[int, Dict[str, List[Any]]]:
+    if pq is None:
+        raise RuntimeError("pyarrow is required to read Parquet parts")
+    with open(fp, "rb") as f:
+        part = pq.ParquetFile(f)
+        wanted = [c for c in part.schema_arrow.names if columns is None or c in columns]
+        table = part.read(columns=wanted)
+        n = part.metadata.num_rows
+    return n, {c: table.column(c).to_pylist() for c in wanted}
+
+class LakeTable:
+    def __init__(self, root: str, as_of: Optional[int] = None):
+        self.root = os.path.abspath(root)
+        self.log_dir = os.path.join(self.root, "_delta_log")
+        self.version: Optional[int] = None
+        self.files: List[LakeFile] = self._replay(as_of) if os.path.isdir(self.log_dir) else self._scan()
+
+    # -- snapshot ------------------------------------------------------------
+
+    def _replay(self, as_of: Optional[int]) -> List[LakeFile]:
+        commits = sorted((int(n.split(".")[0]), n) for n in os.listdir(self.log_dir)
+                         if n.endswith(".json") and n.split(".")[0].isdigit())
+        live: Dict[str, LakeFile] = {}
+        for version, name in commits:
+            if as_of is not None and version > as_of:
+                break
+            for action in _log_actions(os.path.join(self.log_dir, name)):
+                if "remove" in action:
+                    live.pop(action["remove"]["path"], None)
+                    continue
+                add = action["add"]
+                stats = add.get("stats")
+                if isinstance(stats, str):  # Delta stores stats as a JSON string
+                    stats = json.loads(stats)
+                live[add["path"]] = LakeFile(add["path"], add.get("partitionValues") or _path_partitions(add["path"]),
+                                             stats, add.get("size"))
+            self.version = version
+        return sorted(live.values(), key=lambda f: f.path)
+
+    def _scan(self) -> List[LakeFile]:
+        found = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith((".", "_")))
+            for name in sorted(filenames):
+                if name.endswith(DATA_SUFFIXES):
+                    rel = os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, "/")
+                    found.append(LakeFile(rel, _path_partitions(rel), None, None))
+        return found
+
+    def path_of(self, f: LakeFile) -> str:
+        """Absolute path of a part file (log paths are URL-encoded and '/'-separated)."""
+        return os.path.join(self.root, *urllib.parse.unquote(f.path).split("/"))
+
+    @property
+    def partition_columns(self) -> List[str]:
+        return sorted({k for f in self.files for k in f.partitions})
+
+    def prune(self, filters: Sequence[Filter] = ()) -> List[LakeFile]:
+        """Live files that can hold rows matching every filter."""
+        keep = []
+        for f in self.files:
+            ok = True
+            for column, op, target in filters:
+                if column in f.partitions:
+                    ok = _matches(f.partitions[column], op, target)
+                elif op != "in":
+                    ok = _may_match(f.stats, column, op, target)
+                if not ok:
+                    break
+            if ok:
+                keep.append(f)
+        return keep
+
+    # -- data ----------------------------------------------------------------
+
+    def read(self, columns: Optional[Sequence[str]] = None, filters: Sequence[Filter] = (),
+             workers: int = READ_WORKERS) -> Dict[str, Any]:
+        """
+        Columns of the rows matching `filters` (all columns when None), partition
+        columns included. The files actually read are in self.last_read.
+        """
+        parts = self.prune(filters)
+        self.last_read = [f.path for f in parts]
+        part_cols = set(self.partition_columns)
+        needed = None
+        if columns is not None:
+            needed = set(columns) | {c for c, _, _ in filters}
+        data_cols = None if needed is None else [c for c in needed if c not in part_cols]
+
+        # Each worker opens, parses and closes its own part, so at most `workers` files are
+        # open at a time however many parts survive pruning.
+        def load(f: LakeFile) -> Tuple[int, Dict[str, List[Any]]]:
+            reader = _read_parquet if f.path.endswith(".parquet") else _read_csv
+            return reader(self.path_of(f), data_cols)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(parts) or 1))) as pool:
+            chunks = list(pool.map(load, parts))
+
+        # Raw values first; each column's type is inferred once, over every part.
+        out: Dict[str, List[Any]] = {}
+        total = 0
+        for f, (n, chunk) in zip(parts, chunks):
+            data_names = [c for c in out if c not in part_cols] + [c for c in chunk if c not in out]
+            for c in data_names:  # a column missing from some parts is padded with None
+                out.setdefault(c, [None] * total).extend(chunk.get(c, [None] * n))
+            for c in part_cols if needed is None else part_cols & needed:
+                out.setdefault(c, [None] * total).extend([f.partitions.get(c, "")] * n)
+            total += n
+        out = {c: _infer(v) for c, v in out.items()}
+
+        row_filters = [flt for flt in filters if flt[0] not in part_cols and flt[0] in out]
+        if row_filters:
+            rows = [i for i in range(total) if all(_matches(out[c][i], op, t) for c, op, t in row_filters)]
+            out = {c: [v[i] for i in rows] for c, v in out.items()}
+        if columns is not None:
+            out = {c: out.get(c, []) for c in columns}
+        if np is not None:
+            out = {c: np.asarray(v) for c, v in out.items()}
+        return out
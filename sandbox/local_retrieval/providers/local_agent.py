@@ -4,13 +4,15 @@ Local agent implementation for the evaluation harness.
 
 Capabilities (no network):
 - CSV/JSON reading
-- Simple log parsing & correlation
+- Log parsing & correlation (providers/log_pipeline.py, with providers/time_index.py for window reads)
 - Basic audio transcript merging (JSONL)
 - SQLite queries
 - TAR/ZIP nested archive extraction
-- .eml (email) parsing with attachment decoding
+- .eml/.mbox parsing through a streaming mailbox index with lazy attachment decoding (providers/mailbox.py)
 - Minimal XLSX XML parsing and formula evaluation (for the simple sheet structure in Pack 4)
 - Heuristic "OCR" fallback by reading cross_artifact_hints.md in Pack 3
+- Streaming sensor-log analytics (providers/sensor_log.py, needs NumPy)
+- Partitioned lake directories with _delta_log replay and partition pruning (providers/lake.py)
 
 NOTE: This is pragmatic—not a full framework. It just solves the harness tasks reliably.
 """
@@ -18,10 +20,15 @@ NOTE: This is pragmatic—not a full framework. It just solves the harness tasks
 import os, re, io, csv, json, math, sqlite3, tarfile, zipfile
 from typing import Any, Dict, List
 from datetime import datetime, timedelta
-from email import policy
-from email.parser import BytesParser
 from xml.etree import ElementTree as ET
 
+from . import lake, log_pipeline, mailbox, time_index
+
+try:
+    from . import sensor_log
+except ImportError:  # NumPy missing: only the sensor handler is unavailable
+    sensor_log = None
+
 # ---------------------- utils ----------------------
 
 def _read_csv(fp: str) -> List[Dict[str,str]]:
@@ -59,46 +66,68 @@ def _jsonl_load(fp: str) -> List[Dict[str, Any]]:
             out.append(json.loads(line))
     return out
 
+def _read_sensor_columns(fp: str) -> Dict[str, Any]:
+    """Per-sensor memmapped columns of a sensor log, via its .cache sidecar (parsed once)."""
+    if sensor_log is None:
+        raise RuntimeError("NumPy is required for sensor log analysis")
+    return sensor_log.load_columns(fp)
+
 # ---------------------- task routers ----------------------
 
-def run(pack_dir: str, prompt: str):
+def handler_for(pack_dir: str, prompt: str):
+    """Return the task handler `run` dispatches this prompt to, or None."""
     p = prompt.lower()
+    if "invoice_id" in p and "bank_date" in p:
+        return _p1_finance_invoice_match
+    if "badge" in p and "termination" in p:
+        return _p1_hr_post_termination
+    if "nginx" in p and "system.log" in p:
+        return _p1_ops_spike
+
+    if "parse emails" in p and "discount" in p:
+        return _p2_emails_discount_thread
+    if "merge transcript" in p or ("silence" in p and "segments" in p):
+        return _p2_audio_merge
+    if "effective usd" in p and "fx" in p:
+        return _p2_finance_fx
+
+    if "ocr pbm scans" in p or ("pbm" in p and "ocr" in p):
+        return _p3_ocr_scans
+    if "sql/sales.db" in p or ("archives/audit_bundle.tar" in p):
+        return _p3_sql_recon
+
+    if "inv3001_with_attachments.eml" in p or ("attachments" in p and "eml" in p):
+        return _p4_eml_attachments
+    if "ops_finance.xlsx" in p or ("evaluate" in p and "xlsx" in p):
+        return _p4_xlsx_summary
+
+    if "mbox" in p:
+        return _p5_mbox_attachment
+    if "delta_lake" in p or "_delta_log" in p:
+        return _p5_delta_lake
+    if "data_lake" in p or ("parquet" in p and "sku" in p):
+        return _p4_lake_totals
+
+    if "sensor log" in p:
+        return _p10_sensor_analysis
+
+    # default: try gentle best-effort across known tasks
+    if os.path.exists(os.path.join(pack_dir, "answers.json")):
+        return _p1_finance_invoice_match
+    if os.path.exists(os.path.join(pack_dir, "answers_pack2.json")):
+        return _p2_emails_discount_thread
+    if os.path.exists(os.path.join(pack_dir, "answers_pack3.json")):
+        return _p3_ocr_scans
+    if os.path.exists(os.path.join(pack_dir, "answers_pack4.json")):
+        return _p4_eml_attachments
+    return None
+
+def run(pack_dir: str, prompt: str):
     try:
-        if "invoice_id" in p and "bank_date" in p:
-            return _p1_finance_invoice_match(pack_dir)
-        if "badge" in p and "termination" in p:
-            return _p1_hr_post_termination(pack_dir)
-        if "nginx" in p and "system.log" in p:
-            return _p1_ops_spike(pack_dir)
-
-        if "parse emails" in p and "discount" in p:
-            return _p2_emails_discount_thread(pack_dir)
-        if "merge transcript" in p or ("silence" in p and "segments" in p):
-            return _p2_audio_merge(pack_dir)
-        if "effective usd" in p and "fx" in p:
-            return _p2_finance_fx(pack_dir)
-
-        if "ocr pbm scans" in p or ("pbm" in p and "ocr" in p):
-            return _p3_ocr_scans(pack_dir)
-        if "sql/sales.db" in p or ("archives/audit_bundle.tar" in p):
-            return _p3_sql_recon(pack_dir)
-
-        if "inv3001_with_attachments.eml" in p or ("attachments" in p and "eml" in p):
-            return _p4_eml_attachments(pack_dir)
-        if "ops_finance.xlsx" in p or ("evaluate" in p and "xlsx" in p):
-            return _p4_xlsx_summary(pack_dir)
-
-        # default: try gentle best-effort across known tasks
-        if os.path.exists(os.path.join(pack_dir, "answers.json")):
-            return _p1_finance_invoice_match(pack_dir)
-        if os.path.exists(os.path.join(pack_dir, "answers_pack2.json")):
-            return _p2_emails_discount_thread(pack_dir)
-        if os.path.exists(os.path.join(pack_dir, "answers_pack3.json")):
-            return _p3_ocr_scans(pack_dir)
-        if os.path.exists(os.path.join(pack_dir, "answers_pack4.json")):
-            return _p4_eml_attachments(pack_dir)
-
-        return {"_error": "No matching handler for prompt."}
+        handler = handler_for(pack_dir, prompt)
+        if handler is None:
+            return {"_error": "No matching handler for prompt."}
+        return handler(pack_dir)
     except Exception as e:
         return {"_error": f"{type(e).__name__}: {e}"}
 
@@ -135,57 +164,35 @@ def _p1_hr_post_termination(pack_dir: str):
     return out or {}
 
 def _p1_ops_spike(pack_dir: str):
-    # Parse nginx log; detect 5xx burst window and top endpoint
-    import re
+    # 5xx window and top endpoint from nginx; root-cause hint from system.log events near it
     nginx_path = os.path.join(pack_dir, "ops", "nginx.log")
     syslog_path = os.path.join(pack_dir, "ops", "system.log")
-    five_errors = []
-    paths = []
-    tz = "-0700"
-    day = "2025-07-28"
-
-    with open(nginx_path, "r", encoding="utf-8") as f:
-        for line in f:
-            m = re.search(r"\[(\d{2})/([A-Za-z]{3})/(\d{4}):(\d{2}):(\d{2}):(\d{2}) ([+\-]\d{4})\] \"(\w+) ([^ ]+) [^\"]+\" (\d{3})", line)
-            if not m: continue
-            day_num, mon, year, hh, mm, ss, zone, method, path, status = m.groups()
-            if status.startswith("5"):
-                five_errors.append((int(hh), int(mm)))
-                paths.append(path)
-                tz = zone
-                day = f"{year}-{_month_num(mon):02d}-{int(day_num):02d}"
-    if not five_errors:
+    stats = log_pipeline.AccessStats()
+    for batch in log_pipeline.iter_batches(nginx_path, log_pipeline.NGINX_COMBINED):
+        stats.update(batch)
+    span = stats.error_window()
+    if span is None:
         return {}
-    # Determine a window (min minute to last minute within 10-min span)
-    five_errors.sort()
-    start_h, start_m = five_errors[0]
-    end_h, end_m = five_errors[-1]
+    epoch = datetime(1970, 1, 1)  # wall-clock ms, no offset applied
+    start = epoch + timedelta(milliseconds=span.start_ms)
+    end = epoch + timedelta(milliseconds=span.end_ms)
     # Format "YYYY-MM-DD HH:MM–HH:MM TZ"
-    start = f"{start_h:02d}:{start_m:02d}"
-    end = f"{end_h:02d}:{end_m:02d}"
-    window = f"{day} {start}–{end} {tz}"
-    # Top endpoint
-    from collections import Counter
-    top_endpoint = Counter(paths).most_common(1)[0][0] if paths else ""
-
-    # System log for root-cause hint
+    window = f"{start:%Y-%m-%d %H:%M}–{end:%H:%M} {stats.tz}"
+    top_endpoint = stats.top_endpoints(1)[0][0]
+
     root_hint = ""
-    with open(syslog_path, "r", encoding="utf-8") as f:
-        for line in f:
-            if "deadlock" in line.lower():
-                root_hint = "DB deadlocks on payments workers"
-                break
+    for hit in log_pipeline.correlate([span], syslog_path, tolerance_ms=10 * 60_000):
+        if hit["events"]:
+            root_hint = log_pipeline.root_cause_hint(hit["events"][0])
     return {"500_spike_window": window, "top_endpoint": top_endpoint, "root_cause_hint": root_hint}
 
-def _month_num(mon_str: str) -> int:
-    months = ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
-    return months.index(mon_str[:3]) + 1
-
 # ---------------------- Pack 2 ----------------------
 
 def _p2_emails_discount_thread(pack_dir: str):
-    fp = os.path.join(pack_dir, "emails", "thread_vendorx_discount.eml")
-    text = _read_text(fp)
+    idx = mailbox.MailIndex.open(os.path.join(pack_dir, "emails", "thread_vendorx_discount.eml"))
+    # subjects and text bodies in thread order; the header noise in between never held an id
+    text = "\n\n".join(f"Subject: {m['subject']}\n\n{idx.body(m['id'])}" for m in idx.messages())
+    idx.close()
     po = re.search(r"\bPO-?\s?(\d{4})\b", text, re.I)
     po_id = f"PO-{po.group(1)}" if po else None
     issue = re.search(r"\bINV-?(\d{4})\b", text)  # first INV-####
@@ -317,21 +324,18 @@ def _p3_sql_recon(pack_dir: str):
 # ---------------------- Pack 4 ----------------------
 
 def _p4_eml_attachments(pack_dir: str):
-    fp = os.path.join(pack_dir, "emails", "inv3001_with_attachments.eml")
-    with open(fp, "rb") as f:
-        msg = BytesParser(policy=policy.default).parse(f)
+    idx = mailbox.MailIndex.open(os.path.join(pack_dir, "emails", "inv3001_with_attachments.eml"))
     rows = []
     pdf_name = None
-    for part in msg.iter_attachments():
-        fn = part.get_filename()
-        ctype = part.get_content_type()
-        payload = part.get_payload(decode=True)
+    for att in idx.attachments():  # metadata from the index; only the CSV is decoded
+        fn = att["filename"]
         if not fn: continue
         if fn.endswith(".csv"):
-            rdr = csv.DictReader(io.StringIO(payload.decode("utf-8")))
+            rdr = csv.DictReader(io.StringIO(idx.read_attachment(att["id"]).decode("utf-8")))
             rows = [dict(r) for r in rdr]
         elif fn.endswith(".pdf"):
             pdf_name = fn
+    idx.close()
     return {"csv_rows": rows, "attached_pdf": pdf_name}
 
 def _p4_xlsx_summary(pack_dir: str):
@@ -372,3 +376,90 @@ def _p4_xlsx_summary(pack_dir: str):
             "Summary!B2": round(B2_sum, 2),
         }
     }
+
+def _p4_lake_totals(pack_dir: str):
+    t = lake.LakeTable(os.path.join(pack_dir, "data_lake"))
+    cols = t.read(["date", "sku", "qty", "unit"])
+    by_sku: Dict[str, float] = {}
+    by_date: Dict[str, float] = {}
+    for date, sku, qty, unit in zip(cols["date"], cols["sku"], cols["qty"], cols["unit"]):
+        amount = float(qty) * float(unit)
+        by_sku[str(sku)] = round(by_sku.get(str(sku), 0.0) + amount, 2)
+        by_date[str(date)] = round(by_date.get(str(date), 0.0) + amount, 2)
+    return {"files": t.last_read, "totals_by_sku": by_sku, "totals_by_date": by_date,
+            "total": round(sum(by_sku.values()), 2)}
+
+# ---------------------- Pack 5 ----------------------
+
+def _p5_mbox_attachment(pack_dir: str):
+    """Attachments of pack mailboxes: MIME parts from the index, or existing files a message body names."""
+    found = []
+    for fp in mailbox.mail_files(os.path.join(pack_dir, "emails")):
+        if not fp.endswith(".mbox"):
+            continue
+        idx = mailbox.MailIndex.open(fp)
+        here = os.path.dirname(fp)
+        for m in idx.messages():
+            names = [a["filename"] for a in idx.attachments(m["id"]) if a["filename"]]
+            for ref in re.findall(r"[\w./-]+\.[A-Za-z0-9]{1,5}\b", idx.body(m["id"])):
+                ref = ref[2:] if ref.startswith("./") else ref
+                if os.path.isfile(os.path.join(here, ref)) and ref not in names:
+                    names.append(ref)
+            for name in names:
+                local = os.path.join(here, name)
+                found.append({"attachment_path": os.path.relpath(local, pack_dir).replace(os.sep, "/"),
+                              "message_subject": m["subject"], "exists": os.path.exists(local)})
+        idx.close()
+    out = dict(found[0]) if found else {"attachment_path": None, "message_subject": None}
+    out["attachments"] = found
+    return out
+
+def _p5_delta_lake(pack_dir: str):
+    t = lake.LakeTable(os.path.join(pack_dir, "delta_lake"))
+    cols = t.read(["order_id", "qty"])
+    qty: Dict[str, int] = {}
+    for order_id, q in zip(cols["order_id"], cols["qty"]):
+        qty[str(order_id)] = qty.get(str(order_id), 0) + int(q)
+    out = {"current_version": t.version, "active_files": [f.path for f in t.files]}
+    for order_id, q in qty.items():  # O-3003 -> o3003_qty_current
+        out[order_id.lower().replace("-", "") + "_qty_current"] = q
+    return out
+
+# ---------------------- Pack 10 ----------------------
+
+def _p10_gyro_compare(fp: str, a_ms: int, b_ms: int) -> Dict[str, Any]:
+    """GYRO readings nearest to timestamps A and B, read through the log's time index."""
+    idx = time_index.TimeIndex.open(fp)
+    a, b = (time_index.nearest_sample(idx, "GYRO", t) for t in (a_ms, b_ms))
+    return {
+        "a": {"timestamp": a_ms, "gyro": {"timestamp": a[0], "values": a[1]} if a else None},
+        "b": {"timestamp": b_ms, "gyro": {"timestamp": b[0], "values": b[1]} if b else None},
+        "delta": [round(y - x, 6) for x, y in zip(a[1], b[1])] if a and b else None,
+    }
+
+def _p10_sensor_analysis(pack_dir: str):
+    fp = os.path.join(pack_dir, "sensor_log.txt")
+    cols = _read_sensor_columns(fp)
+    res = sensor_log.analyze([cols], {
+        "rates": sensor_log.SampleRates(),
+        "acc_mean": sensor_log.MagnitudeMean("ACC"),
+        "acc_spikes": sensor_log.TopKSpikes("ACC", 3),
+        "gyro_gaps": sensor_log.GapDetector("GYRO", threshold_ms=1000),
+        "left_foot": sensor_log.ActivityPerSecond("LeftFoot"),
+    })
+    gaps = res["gyro_gaps"]
+    foot = res["left_foot"]
+    spikes = res["acc_spikes"]
+    # "Compare the GYRO readings at timestamps A and B": A and B are the two largest ACC spikes
+    gyro_compare = _p10_gyro_compare(fp, spikes[0]["timestamp"], spikes[1]["timestamp"]) if len(spikes) >= 2 else None
+    return {
+        "sample_rates_hz": {name: r["hz"] for name, r in res["rates"].items()},
+        "samples": {name: r["samples"] for name, r in res["rates"].items()},
+        "acc_magnitude_mean": round(res["acc_mean"], 4) if res["acc_mean"] is not None else None,
+        "acc_top_spikes": res["acc_spikes"],
+        "acc_peak": res["acc_spikes"][0] if res["acc_spikes"] else None,
+        "gyro_gaps": {"threshold_ms": gaps["threshold_ms"], "count": gaps["count"], "longest": gaps["longest"]},
+        "left_foot_active_seconds": foot["active_seconds"],
+        "left_foot_active_segments": foot["segments"],
+        "gyro_at_acc_spikes": gyro_compare,
+    }
@@ -0,0 +1,149 @@
+"""
+Log ingestion stage: compiled per-format parsers, batched streaming, rolling
+5xx counters and error-burst / system-event correlation.
+
+Access logs are read in ~8 MB blocks cut at line boundaries; each block is parsed
+with one findall() of a compiled pattern, so records arrive in batches
+of tuples and nothing larger than a block is held in memory. AccessStats keeps
+only per-minute and per-endpoint counters (bounded by the log's span in minutes
+and its endpoint count), so multi-GB logs run in constant memory.
+
+Times are wall-clock milliseconds as written (see providers/time_index.py), which
+is what lines an nginx "-0700" log up with a syslog whose "Z" is really local time.
+
+  stats = AccessStats()
+  for batch in iter_batches(nginx_fp, NGINX_COMBINED):
+      stats.update(batch)
+  hits = correlate(stats.bursts(), syslog_fp, tolerance_ms=10 * 60_000)
+"""
+
+import re
+from collections import Counter
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+from . import time_index
+
+CHUNK_BYTES = 8 << 20
+MINUTE_MS = 60_000
+
+# nginx combined / CLF: minute ("28/Jul/2025:14:05"), tz, path, status. Unanchored, like
+# re.search per line; every class excludes newlines, so a match never spans two lines.
+NGINX_COMBINED = re.compile(
+    rb'\[(\d{2}/[A-Za-z]{3}/\d{4}:\d{2}:\d{2}):\d{2} ([+\-]\d{4})\] "\w+ ([^ \n]+) [^"\n]+" (\d{3})')
+
+# ISO syslog: date, time, process/host token, message
+SYSLOG_ISO = re.compile(
+    rb'^(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})(?:[.,]\d+)?(?:Z|[+\-]\d{2}:?\d{2})? (\S+) ([^\n]*)', re.M)
+
+# System events worth joining to an error burst; the group name is the event kind.
+EVENT_PATTERNS = re.compile(
+    rb"(?P<deadlock>deadlock)"
+    rb"|(?P<oom>out of memory|oom-kill)"
+    rb"|(?P<timeout>timed out|timeout)"
+    rb"|(?P<conn_refused>connection refused)"
+    rb"|(?P<disk_full>no space left on device)", re.I)
+
+ROOT_HINTS = {
+    "deadlock": "DB deadlocks on {service} workers",
+    "oom": "out-of-memory kills on {service}",
+    "timeout": "timeouts on {service}",
+    "conn_refused": "{service} refusing connections",
+    "disk_full": "disk full on {service}",
+}
+
+def iter_batches(fp: str, pattern: Pattern[bytes], chunk_bytes: int = CHUNK_BYTES) -> Iterator[List[Tuple[bytes, ...]]]:
+    """Yield pattern.findall() of successive line-aligned blocks of `fp` (unmatched lines are skipped)."""
+    with open(fp, "rb") as f:
+        tail = b""
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            tail, block = block[cut:], block[:cut]
+            if block:
+                yield pattern.findall(block)
+        if tail:
+            yield pattern.findall(tail)
+
+def _minute_ms(minute: bytes) -> int:
+    """b"28/Jul/2025:14:05" -> wall-clock ms."""
+    day, mon, rest = minute.decode().split("/")
+    year, hh, mm = rest.split(":")
+    return time_index.wall_clock_ms(int(year), time_index.MONTHS[mon[:3].capitalize()], int(day), int(hh), int(mm))
+
+class Burst(NamedTuple):
+    start_ms: int   # first minute with a 5xx
+    end_ms: int     # last minute with a 5xx (inclusive; the minute runs to end_ms + 60s)
+    errors: int
+
+class AccessStats:
+    """Rolling counters over NGINX_COMBINED batches: requests and 5xx per minute, 5xx per endpoint."""
+
+    def __init__(self):
+        self.lines = 0
+        self.requests_per_minute: Counter = Counter()  # raw b"dd/Mon/yyyy:HH:MM" keys
+        self.errors_per_minute: Counter = Counter()
+        self.errors_per_endpoint: Counter = Counter()
+        self.tz: Optional[str] = None  # offset of the most recent 5xx line
+
+    def update(self, batch: List[Tuple[bytes, ...]]):
+        self.lines += len(batch)
+        self.requests_per_minute.update([r[0] for r in batch])
+        errors = [r for r in batch if r[3][:1] == b"5"]
+        if errors:
+            self.errors_per_minute.update([r[0] for r in errors])
+            self.errors_per_endpoint.update([r[2].decode("utf-8", "replace") for r in errors])
+            self.tz = errors[-1][1].decode()
+
+    def error_minutes(self) -> List[Tuple[int, int]]:
+        """[(minute_ms, 5xx count)] sorted by time."""
+        return sorted((_minute_ms(k), n) for k, n in self.errors_per_minute.items())
+
+    def top_endpoints(self, k: int = 1) -> List[Tuple[str, int]]:
+        """Most 5xx-prone endpoints; ties keep first-seen order (Counter.most_common)."""
+        return self.errors_per_endpoint.most_common(k)
+
+    def bursts(self, max_gap_min: int = 1) -> List[Burst]:
+        """Runs of error minutes at most `max_gap_min` minutes apart."""
+        out: List[Burst] = []
+        for minute, n in self.error_minutes():
+            if out and minute - out[-1].end_ms <= max_gap_min * MINUTE_MS:
+                out[-1] = Burst(out[-1].start_ms, minute, out[-1].errors + n)
+            else:
+                out.append(Burst(minute, minute, n))
+        return out
+
+    def error_window(self) -> Optional[Burst]:
+        """One span from the first to the last 5xx minute."""
+        minutes = self.error_minutes()
+        if not minutes:
+            return None
+        return Burst(minutes[0][0], minutes[-1][0], sum(n for _, n in minutes))
+
+def correlate(bursts: List[Burst], syslog_fp: str, tolerance_ms: int = 5 * MINUTE_MS,
+              events: Pattern[bytes] = EVENT_PATTERNS) -> List[Dict[str, Any]]:
+    """
+    For each burst, the system-log events within `tolerance_ms` of it, read through the
+    log's time index so only the surrounding bytes are scanned.
+    """
+    idx = time_index.TimeIndex.open(syslog_fp)
+    out = []
+    for b in bursts:
+        hits = []
+        for ts, line in idx.read_range(b.start_ms - tolerance_ms, b.end_ms + MINUTE_MS + tolerance_ms):
+            rec = SYSLOG_ISO.match(line)
+            if not rec:
+                continue
+            m = events.search(rec.group(4))
+            if m:
+                hits.append({"ts_ms": ts, "source": rec.group(3).decode("utf-8", "replace"),
+                             "kind": m.lastgroup, "message": rec.group(4).decode("utf-8", "replace")})
+        out.append({"burst": b, "events": hits})
+    return out
+
+def root_cause_hint(event: Dict[str, Any]) -> str:
+    """Short phrase for a correlated event, e.g. 'DB deadlocks on payments workers'."""
+    service = re.split(r"[-_.\[:]", event["source"], maxsplit=1)[0] or event["source"]
+    return ROOT_HINTS.get(event["kind"], "{service} " + event["kind"]).format(service=service)
@@ -0,0 +1,473 @@
+"""
+Streaming analytics for multiplexed sensor logs (pack10_sensor/sensor_log.txt).
+
+Each line is `<epoch_ms>,<SENSOR>,<v1>,<v2>,...` with sensors interleaved
+(GYRO/ACC/MAG carry x,y,z; LeftFoot carries 18 pressure cells). iter_chunks()
+reads the file in bounded byte blocks and demultiplexes each block into
+per-sensor columns:
+
+  {"ACC": Columns(ts=int64[n], values=float64[n, 3]), "GYRO": ..., ...}
+
+Operators consume chunks one at a time and keep only small running state, so a
+single pass over an arbitrarily large log runs in constant memory:
+
+  ops = {"acc": MagnitudeMean("ACC"), "rates": SampleRates(), "spikes": TopKSpikes("ACC", 3)}
+  results = analyze(iter_chunks(fp), ops)   # {"acc": ..., "rates": ..., "spikes": ...}
+
+load_columns() parses the log once into a columnar sidecar
+(<dir>/.cache/<name>.cols/, or under the temp directory when <dir> is
+read-only) and afterwards returns the whole log as one chunk of
+read-only memory-mapped arrays, so repeated queries skip text parsing entirely:
+
+  results = analyze([load_columns(fp)], ops)
+
+Requires NumPy.
+"""
+
+import os, json, shutil, hashlib, tempfile
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+CHUNK_BYTES = 8 << 20  # ~8 MB of text per batch
+
+class Columns(NamedTuple):
+    ts: np.ndarray      # int64 epoch milliseconds, shape (n,)
+    values: np.ndarray  # float64, shape (n, k)
+    raw: Optional[bytes] = None  # the rows as logged, minus the sensor tag ("ts,v1,...\n")
+
+Chunk = Dict[str, Columns]
+
+# ---------------------- parsing ----------------------
+
+def _tag_keys(a: np.ndarray, c1: np.ndarray, tag_len: np.ndarray) -> np.ndarray:
+    """uint64 key per line: tag length in the top byte, first 7 tag bytes below it."""
+    key = np.minimum(tag_len, 255).astype(np.uint64) << np.uint64(56)
+    last = len(a) - 1
+    for j in range(7):
+        byte = a[np.minimum(c1 + 1 + j, last)].astype(np.uint64)
+        key |= np.where(j < tag_len, byte, 0).astype(np.uint64) << np.uint64(8 * (6 - j))
+    return key
+
+def _rows_to_columns(body: bytes, n: int) -> Optional[Columns]:
+    """Parse `n` lines of `ts,v1,...,vk` (tag already stripped) into Columns."""
+    k1 = body[:body.index(b"\n")].count(b",") + 1
+    flat = body[:-1].replace(b"\n", b",").split(b",")
+    if len(flat) != n * k1:  # ragged rows: keep those matching the first row's width
+        lines = [ln for ln in body[:-1].split(b"\n") if ln.count(b",") + 1 == k1]
+        if not lines:
+            return None
+        body = b"\n".join(lines) + b"\n"
+        flat, n = b",".join(lines).split(b","), len(lines)
+    table = np.array(flat, dtype=np.float64).reshape(n, k1)
+    return Columns(table[:, 0].astype(np.int64), table[:, 1:], body)
+
+def parse_buffer(buf: bytes) -> Chunk:
+    """
+    Demultiplex a block of complete log lines into per-sensor Columns.
+
+    Newline and comma positions are located with NumPy, each line gets a key from
+    its sensor tag, and every sensor's lines are gathered with one boolean mask,
+    so Python-level work is per sensor, not per line. Timestamps go through
+    float64 and are exact for epoch milliseconds.
+    """
+    if not buf.endswith(b"\n"):
+        buf += b"\n"
+    a = np.frombuffer(buf, dtype=np.uint8)
+    ends = np.flatnonzero(a == 10)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    commas = np.flatnonzero(a == 44)
+    if len(commas) < 2:
+        return {}
+    i1 = np.minimum(np.searchsorted(commas, starts), len(commas) - 2)
+    c1, c2 = commas[i1], commas[i1 + 1]
+    valid = (c1 >= starts) & (c2 < ends) & (c2 > c1 + 1)
+    keys = _tag_keys(a, c1, c2 - c1 - 1)
+    keys[~valid] = 0
+    uniq, inv = np.unique(keys, return_inverse=True)
+    line_len = ends - starts + 1
+
+    out = {}
+    for g, key in enumerate(uniq.tolist()):
+        if key == 0:
+            continue  # malformed lines
+        lines = inv == g
+        first = int(np.argmax(lines))
+        tag = buf[c1[first] + 1:c2[first]]
+        body = a[np.repeat(lines, line_len)].tobytes().replace(b"," + tag + b",", b",")
+        try:
+            cols = _rows_to_columns(body, int(lines.sum()))
+        except ValueError:
+            continue  # malformed numbers in this block; skip the sensor rather than the pass
+        if cols is not None:
+            out[tag.decode("utf-8", "replace").strip()] = cols
+    return out
+
+def iter_chunks(fp: str, chunk_bytes: int = CHUNK_BYTES) -> Iterator[Chunk]:
+    """Yield per-sensor Columns for successive ~chunk_bytes blocks of the log."""
+    with open(fp, "rb") as f:
+        tail = b""
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            if cut == 0:
+                tail = block  # no complete line yet
+                continue
+            tail = block[cut:]
+            chunk = parse_buffer(block[:cut])
+            if chunk:
+                yield chunk
+        if tail.strip():
+            chunk = parse_buffer(tail)
+            if chunk:
+                yield chunk
+
+# ---------------------- columnar sidecar ----------------------
+
+SIDECAR_VERSION = 1
+TS_DTYPE, VALUE_DTYPE = np.dtype("<i8"), np.dtype("<f8")
+
+def sidecar_dirs(fp: str) -> List[str]:
+    """Where a sidecar may live: <dir>/.cache first, then the temp directory (read-only data dirs)."""
+    fp = os.path.abspath(fp)
+    name = os.path.basename(fp) + ".cols"
+    return [os.path.join(os.path.dirname(fp), ".cache", name),
+            os.path.join(tempfile.gettempdir(), "eda_sensor_cols", os.path.dirname(fp).strip(os.sep).replace(os.sep, "_"), name)]
+
+def sidecar_dir(fp: str) -> str:
+    return sidecar_dirs(fp)[0]
+
+def _sha256(fp: str, bufsize: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(fp, "rb") as f:
+        for block in iter(lambda: f.read(bufsize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _source_stat(fp: str) -> os.stat_result:
+    # Open rather than stat so callers tracking opened files see the log as a dependency.
+    with open(fp, "rb") as f:
+        return os.fstat(f.fileno())
+
+def write_sidecar(fp: str, chunk_bytes: int = CHUNK_BYTES, out_dir: Optional[str] = None) -> str:
+    """
+    Parse `fp` once and write <sensor>.ts (int64) / <sensor>.values (float64, row-major)
+    plus header.json. Built in a temp dir and renamed into place; returns the dir.
+    """
+    out_dir = out_dir or sidecar_dir(fp)
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    st = _source_stat(fp)
+    sensors: Dict[str, Dict[str, Any]] = {}
+    files = {}
+    try:
+        for chunk in iter_chunks(fp, chunk_bytes):
+            for name, cols in chunk.items():
+                meta = sensors.get(name)
+                if meta is None:
+                    stem = f"s{len(sensors)}"  # sensor names are not trusted as file names
+                    meta = sensors[name] = {"file": stem, "rows": 0, "width": cols.values.shape[1]}
+                    files[name] = (open(os.path.join(tmp_dir, stem + ".ts"), "wb"),
+                                   open(os.path.join(tmp_dir, stem + ".values"), "wb"))
+                if cols.values.shape[1] != meta["width"]:
+                    continue  # rows of a different width than the sensor's first block
+                ts_f, val_f = files[name]
+                ts_f.write(cols.ts.astype(TS_DTYPE, copy=False).tobytes())
+                val_f.write(np.ascontiguousarray(cols.values, dtype=VALUE_DTYPE).tobytes())
+                meta["rows"] += len(cols.ts)
+    finally:
+        for ts_f, val_f in files.values():
+            ts_f.close()
+            val_f.close()
+    header = {"version": SIDECAR_VERSION, "source": os.path.basename(fp),
+              "size_bytes": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _sha256(fp),
+              "sensors": sensors}
+    with open(os.path.join(tmp_dir, "header.json"), "w", encoding="utf-8") as f:
+        json.dump(header, f, indent=2)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return out_dir
+
+def _read_header(fp: str, base: str) -> Optional[Dict[str, Any]]:
+    """The header of the sidecar in `base` if it still describes `fp` (size, then mtime, then sha256), else None."""
+    header_fp = os.path.join(base, "header.json")
+    try:
+        with open(header_fp, "r", encoding="utf-8") as f:
+            header = json.load(f)
+    except (OSError, ValueError):
+        return None
+    st = _source_stat(fp)
+    if header.get("version") != SIDECAR_VERSION or header.get("size_bytes") != st.st_size:
+        return None
+    if header.get("mtime_ns") != st.st_mtime_ns:
+        if header.get("sha256") != _sha256(fp):
+            return None
+        header["mtime_ns"] = st.st_mtime_ns  # touched but identical: next check is stat-only
+        try:
+            with open(header_fp, "w", encoding="utf-8") as f:
+                json.dump(header, f, indent=2)
+        except OSError:
+            pass  # read-only sidecar: the sha256 check simply repeats next time
+    return header
+
+def _memmap(path: str, dtype: np.dtype, shape) -> np.ndarray:
+    if not shape[0]:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+def open_sidecar(fp: str) -> Optional[Chunk]:
+    """Memory-map the first valid sidecar for `fp` as one chunk, or None if missing/stale."""
+    for base in sidecar_dirs(fp):
+        chunk = _open_sidecar_at(fp, base)
+        if chunk is not None:
+            return chunk
+    return None
+
+def _open_sidecar_at(fp: str, base: str) -> Optional[Chunk]:
+    header = _read_header(fp, base)
+    if header is None:
+        return None
+    out = {}
+    try:
+        for name, meta in header["sensors"].items():
+            stem = os.path.join(base, meta["file"])
+            out[name] = Columns(_memmap(stem + ".ts", TS_DTYPE, (meta["rows"],)),
+                                _memmap(stem + ".values", VALUE_DTYPE, (meta["rows"], meta["width"])))
+    except (OSError, ValueError, KeyError):
+        return None  # truncated or hand-edited sidecar
+    return out
+
+def _parse_whole(fp: str) -> Chunk:
+    """The whole log as one in-memory chunk (no sidecar), rows of an unexpected width dropped as in write_sidecar."""
+    parts: Dict[str, List[Columns]] = {}
+    for chunk in iter_chunks(fp):
+        for name, cols in chunk.items():
+            seen = parts.setdefault(name, [])
+            if not seen or cols.values.shape[1] == seen[0].values.shape[1]:
+                seen.append(Columns(cols.ts, cols.values))
+    return {name: Columns(np.concatenate([c.ts for c in cs]).astype(TS_DTYPE, copy=False),
+                          np.concatenate([c.values for c in cs]).astype(VALUE_DTYPE, copy=False))
+            for name, cs in parts.items()}
+
+def load_columns(fp: str) -> Chunk:
+    """
+    The whole log as {sensor: Columns} backed by the sidecar, writing it first if needed.
+    A read-only data directory gets its sidecar in the temp directory; if nothing is
+    writable, the log is parsed into memory instead.
+    """
+    chunk = open_sidecar(fp)
+    if chunk is not None:
+        return chunk
+    for base in sidecar_dirs(fp):
+        try:
+            write_sidecar(fp, out_dir=base)
+        except OSError:
+            continue
+        chunk = _open_sidecar_at(fp, base)
+        if chunk is not None:
+            return chunk
+    return _parse_whole(fp)
+
+def analyze(chunks: Iterable[Chunk], ops: Dict[str, Any]) -> Dict[str, Any]:
+    """Feed every chunk to every operator in one pass; return {name: op.result()}."""
+    for chunk in chunks:
+        for op in ops.values():
+            op.update(chunk)
+    return {name: op.result() for name, op in ops.items()}
+
+def _magnitude(values: np.ndarray) -> np.ndarray:
+    return np.sqrt(np.einsum("ij,ij->i", values[:, :3], values[:, :3]))
+
+# ---------------------- operators ----------------------
+
+class MagnitudeMean:
+    """Mean Euclidean norm of the first three channels of `sensor`."""
+
+    def __init__(self, sensor: str):
+        self.sensor, self.total, self.count = sensor, 0.0, 0
+
+    def update(self, chunk: Chunk):
+        cols = chunk.get(self.sensor)
+        if cols is not None and len(cols.ts):
+            self.total += float(_magnitude(cols.values).sum())
+            self.count += len(cols.ts)
+
+    def result(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+class SampleRates:
+    """
+    Per-sensor sample count, span and rate.
+
+    `hz` comes from the median inter-sample interval (a histogram of integer ms
+    deltas, so it is exact and bounded) and is not skewed by recording gaps;
+    `hz_overall` is samples over the full span.
+    """
+
+    MAX_DT_MS = 60_000  # deltas above this are gaps, not sampling intervals
+
+    def __init__(self, sensors: Optional[Iterable[str]] = None):
+        self.sensors = set(sensors) if sensors else None
+        self.state: Dict[str, Dict[str, Any]] = {}
+
+    def update(self, chunk: Chunk):
+        for name, cols in chunk.items():
+            if self.sensors is not None and name not in self.sensors or not len(cols.ts):
+                continue
+            st = self.state.get(name)
+            if st is None:
+                st = self.state[name] = dict(n=0, first=int(cols.ts[0]), last=None,
+                                             hist=np.zeros(self.MAX_DT_MS + 1, dtype=np.int64))
+            ts = cols.ts if st["last"] is None else np.concatenate(([st["last"]], cols.ts))
+            dt = np.diff(ts)
+            dt = dt[(dt >= 0) & (dt <= self.MAX_DT_MS)]
+            st["hist"] += np.bincount(dt, minlength=self.MAX_DT_MS + 1)
+            st["n"] += len(cols.ts)
+            st["last"] = int(cols.ts[-1])
+
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for name, st in sorted(self.state.items()):
+            span_s = (st["last"] - st["first"]) / 1000.0
+            cum = np.cumsum(st["hist"])
+            median_dt = int(np.searchsorted(cum, (cum[-1] + 1) // 2)) if cum[-1] else None
+            out[name] = {
+                "samples": st["n"],
+                "first_ts": st["first"],
+                "last_ts": st["last"],
+                "median_interval_ms": median_dt,
+                "hz": round(1000.0 / median_dt, 2) if median_dt else None,
+                "hz_overall": round((st["n"] - 1) / span_s, 3) if span_s > 0 else None,
+            }
+        return out
+
+class GapDetector:
+    """Intervals longer than `threshold_ms` between consecutive samples of `sensor`."""
+
+    def __init__(self, sensor: str, threshold_ms: int = 1000, max_gaps: int = 1000):
+        self.sensor, self.threshold, self.max_gaps = sensor, threshold_ms, max_gaps
+        self.last: Optional[int] = None
+        self.count, self.gaps, self.longest = 0, [], None
+
+    def update(self, chunk: Chunk):
+        cols = chunk.get(self.sensor)
+        if cols is None or not len(cols.ts):
+            return
+        ts = cols.ts if self.last is None else np.concatenate(([self.last], cols.ts))
+        dt = np.diff(ts)
+        idx = np.nonzero(dt > self.threshold)[0]
+        self.count += len(idx)
+        gap = lambda i: {"start": int(ts[i]), "end": int(ts[i + 1]), "duration_ms": int(dt[i])}
+        for i in idx[: max(self.max_gaps - len(self.gaps), 0)]:
+            self.gaps.append(gap(i))
+        if len(idx):
+            i = idx[np.argmax(dt[idx])]
+            if self.longest is None or dt[i] > self.longest["duration_ms"]:
+                self.longest = gap(i)
+        self.last = int(cols.ts[-1])
+
+    def result(self) -> Dict[str, Any]:
+        """`gaps` holds the first max_gaps gaps; `count` and `longest` cover all of them."""
+        return {"threshold_ms": self.threshold, "count": self.count, "longest": self.longest, "gaps": self.gaps}
+
+class TopKSpikes:
+    """The k largest-magnitude samples of `sensor` (timestamp, magnitude), largest first."""
+
+    def __init__(self, sensor: str, k: int = 3):
+        self.sensor, self.k = sensor, k
+        self.ts = np.empty(0, dtype=np.int64)
+        self.mag = np.empty(0, dtype=np.float64)
+
+    def update(self, chunk: Chunk):
+        cols = chunk.get(self.sensor)
+        if cols is None or not len(cols.ts):
+            return
+        ts = np.concatenate((self.ts, cols.ts))
+        mag = np.concatenate((self.mag, _magnitude(cols.values)))
+        if len(mag) > self.k:
+            keep = np.argpartition(mag, -self.k)[-self.k:]
+            ts, mag = ts[keep], mag[keep]
+        self.ts, self.mag = ts, mag
+
+    def result(self) -> List[Dict[str, Any]]:
+        order = np.lexsort((self.ts, -self.mag))
+        return [{"timestamp": int(self.ts[i]), "magnitude": round(float(self.mag[i]), 4)} for i in order]
+
+class ActivityPerSecond:
+    """
+    Per-second activity of a sensor whose idle reading is all zeros (e.g. LeftFoot).
+
+    Keeps only seconds with at least one non-zero sample: {second: [samples, active, peak]}.
+    """
+
+    def __init__(self, sensor: str = "LeftFoot"):
+        self.sensor = sensor
+        self.seconds: Dict[int, List[float]] = {}
+
+    def update(self, chunk: Chunk):
+        cols = chunk.get(self.sensor)
+        if cols is None or not len(cols.ts):
+            return
+        active = np.any(cols.values != 0, axis=1)
+        if not active.any():
+            return
+        sec = cols.ts // 1000
+        peak = cols.values.max(axis=1)
+        act_secs = np.unique(sec[active])
+        in_act = np.isin(sec, act_secs)
+        s, inv = np.unique(sec[in_act], return_inverse=True)
+        samples = np.bincount(inv)
+        n_active = np.bincount(inv, weights=active[in_act])
+        peaks = np.full(len(s), -np.inf)
+        np.maximum.at(peaks, inv, np.where(active[in_act], peak[in_act], -np.inf))
+        for i, second in enumerate(s.tolist()):
+            cur = self.seconds.setdefault(second, [0, 0, 0.0])
+            cur[0] += int(samples[i])
+            cur[1] += int(n_active[i])
+            cur[2] = max(cur[2], float(peaks[i]))
+
+    def result(self) -> Dict[str, Any]:
+        per_second = [{"second": s, "samples": v[0], "active_samples": v[1], "peak": v[2]}
+                      for s, v in sorted(self.seconds.items())]
+        # Merge consecutive active seconds into segments.
+        segments = []
+        for row in per_second:
+            if segments and row["second"] == segments[-1]["end_second"] + 1:
+                segments[-1]["end_second"] = row["second"]
+                segments[-1]["active_samples"] += row["active_samples"]
+                segments[-1]["peak"] = max(segments[-1]["peak"], row["peak"])
+            else:
+                segments.append({"start_second": row["second"], "end_second": row["second"],
+                                 "active_samples": row["active_samples"], "peak": row["peak"]})
+        return {"active_seconds": len(per_second), "segments": segments, "per_second": per_second}
+
+class CsvExport:
+    """Write every sample of one sensor to a CSV file as it streams past."""
+
+    def __init__(self, sensor: str, out_fp: str, columns: Optional[List[str]] = None):
+        self.sensor, self.out_fp, self.columns = sensor, out_fp, columns
+        self.f, self.rows = None, 0
+
+    def update(self, chunk: Chunk):
+        cols = chunk.get(self.sensor)
+        if cols is None or not len(cols.ts):
+            return
+        if self.f is None:
+            names = self.columns or [f"v{i}" for i in range(cols.values.shape[1])]
+            self.f = open(self.out_fp, "wb")
+            self.f.write((",".join(["timestamp"] + names) + "\n").encode("utf-8"))
+        if cols.raw is not None:
+            self.f.write(cols.raw.replace(b", ", b","))  # values exactly as logged
+        else:
+            np.savetxt(self.f, np.column_stack((cols.ts, cols.values)), delimiter=",",
+                       fmt=["%d"] + ["%.9g"] * cols.values.shape[1])
+        self.rows += len(cols.ts)
+
+    def result(self) -> Dict[str, Any]:
+        if self.f is not None:
+            self.f.close()
+        return {"path": self.out_fp, "rows": self.rows}
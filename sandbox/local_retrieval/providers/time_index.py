@@ -0,0 +1,276 @@
+"""
+Sparse time index for timestamped, (mostly) time-ordered text logs.
+
+Every `every`-th line starts a block; the index keeps each block's byte offset
+and the min/max timestamp of its lines. A window query bisects the running
+maximum of block maxima to find the first block that can hold a timestamp
+>= start, reads forward, and stops after the last block whose suffix minimum is
+<= end. Slightly out-of-order lines (nginx writes at request completion) are
+therefore never missed, and only the bytes around the window are read.
+
+Timestamps are integer milliseconds on the wall clock as written in the log:
+nginx's UTC offset and syslog's trailing Z are not applied, so an access log and
+a system log from the same host line up. Supported formats:
+
+  epoch_ms  1705991914583,ACC,...           (pack10 sensor log; 10-digit seconds also accepted)
+  nginx     ... [28/Jul/2025:14:05:01 -0700] "POST ...   (combined / CLF)
+  syslog    2025-07-28T14:05:00Z host msg   (ISO 8601, optional fraction)
+
+The index is stored as JSON in <dir>/.cache/<name>.tidx.json. It is reused while
+the log's size and mtime match, and extended in place when the log has only
+grown (the bytes just before the indexed end are checked first).
+
+  idx = TimeIndex.open(fp)
+  for ts, line in idx.read_range(start_ms, end_ms): ...
+"""
+
+import os, re, json, bisect, hashlib, calendar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+INDEX_VERSION = 1
+DEFAULT_EVERY = 1024   # lines per block
+TAIL_CHECK = 4096      # bytes before the indexed end compared when a log has grown
+
+MONTHS = {m: i for i, m in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1)}  # CLF month names
+_MONTHS_B = {m.encode(): i for m, i in MONTHS.items()}
+
+_EPOCH_RE = re.compile(rb"^(\d{10}|\d{13})(?=[,;\s])")
+_NGINX_RE = re.compile(rb"\[(\d{2})/([A-Za-z]{3})/(\d{4}):(\d{2}):(\d{2}):(\d{2}) [+\-]\d{4}\]")
+_ISO_RE = re.compile(rb"^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:[.,](\d{1,6}))?")
+
+def _epoch_ms(line: bytes) -> Optional[int]:
+    m = _EPOCH_RE.match(line)
+    if not m:
+        return None
+    v = int(m.group(1))
+    return v * 1000 if len(m.group(1)) == 10 else v
+
+def _nginx_ms(line: bytes) -> Optional[int]:
+    m = _NGINX_RE.search(line)
+    if not m:
+        return None
+    d, mon, y, hh, mm, ss = m.groups()
+    month = _MONTHS_B.get(mon[:3].capitalize())
+    if month is None:
+        return None
+    return calendar.timegm((int(y), month, int(d), int(hh), int(mm), int(ss))) * 1000
+
+def _iso_ms(line: bytes) -> Optional[int]:
+    m = _ISO_RE.match(line)
+    if not m:
+        return None
+    y, mo, d, hh, mm, ss, frac = m.groups()
+    ms = int((frac or b"0").ljust(3, b"0")[:3])
+    return calendar.timegm((int(y), int(mo), int(d), int(hh), int(mm), int(ss))) * 1000 + ms
+
+FORMATS: Dict[str, Callable[[bytes], Optional[int]]] = {
+    "epoch_ms": _epoch_ms,
+    "nginx": _nginx_ms,
+    "syslog": _iso_ms,
+}
+
+def detect_format(fp: str, probe_lines: int = 20) -> Optional[str]:
+    """The first format that parses any of the first `probe_lines` lines."""
+    with open(fp, "rb") as f:
+        head = [f.readline() for _ in range(probe_lines)]
+    for name, parse in FORMATS.items():
+        if any(parse(line) is not None for line in head if line):
+            return name
+    return None
+
+def index_path(fp: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(fp)), ".cache", os.path.basename(fp) + ".tidx.json")
+
+def _tail_digest(fp: str, end: int) -> str:
+    with open(fp, "rb") as f:
+        f.seek(max(end - TAIL_CHECK, 0))
+        return hashlib.sha256(f.read(min(end, TAIL_CHECK))).hexdigest()
+
+class TimeIndex:
+    """Block offsets and timestamp bounds for one log file (see module docstring)."""
+
+    def __init__(self, fp: str, fmt: str, every: int = DEFAULT_EVERY):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown log format {fmt!r} (expected one of {sorted(FORMATS)})")
+        self.fp, self.fmt, self.every = fp, fmt, every
+        self.parse = FORMATS[fmt]
+        self.offsets: List[int] = []    # byte offset of each block
+        self.block_min: List[int] = []  # min timestamp per block (blocks without one inherit)
+        self.block_max: List[int] = []
+        self.block_lines: List[int] = []
+        self.size_bytes = 0             # bytes covered by the index
+        self.mtime_ns = 0
+        self._tail = ""                 # sha256 of the TAIL_CHECK bytes before size_bytes
+        self._derive()
+
+    # ---------- build / persist ----------
+
+    @classmethod
+    def open(cls, fp: str, fmt: Optional[str] = None, every: int = DEFAULT_EVERY, persist: bool = True) -> "TimeIndex":
+        """Load the stored index for `fp` if still valid, extend it if the log grew, else build."""
+        with open(fp, "rb") as f:  # opened (not stat'ed) so dependency tracking sees the log
+            st = os.fstat(f.fileno())
+        idx = cls._load(fp)
+        if idx is not None and (fmt is None or idx.fmt == fmt) and idx.every == every:
+            if idx.size_bytes == st.st_size and idx.mtime_ns == st.st_mtime_ns:
+                return idx
+            if st.st_size > idx.size_bytes and idx._tail == _tail_digest(fp, idx.size_bytes):
+                idx._extend(st)
+                if persist:
+                    idx.save()
+                return idx
+        fmt = fmt or detect_format(fp)
+        if fmt is None:
+            raise ValueError(f"no supported timestamp format found in {fp}")
+        idx = cls(fp, fmt, every)
+        idx._extend(st)
+        if persist:
+            idx.save()
+        return idx
+
+    @classmethod
+    def _load(cls, fp: str) -> Optional["TimeIndex"]:
+        try:
+            with open(index_path(fp), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION:
+                return None
+            idx = cls(fp, data["fmt"], data["every"])
+            for k in ("offsets", "block_min", "block_max", "block_lines", "size_bytes", "mtime_ns"):
+                setattr(idx, k, data[k])
+            idx._tail = data["tail_sha256"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        idx._derive()
+        return idx
+
+    def save(self):
+        """Persist next to the log; a read-only log directory just means no reuse."""
+        out = index_path(self.fp)
+        try:
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+        except OSError:
+            return
+        data = {"version": INDEX_VERSION, "fmt": self.fmt, "every": self.every,
+                "size_bytes": self.size_bytes, "mtime_ns": self.mtime_ns, "tail_sha256": self._tail,
+                "offsets": self.offsets, "block_min": self.block_min, "block_max": self.block_max,
+                "block_lines": self.block_lines}
+        tmp = f"{out}.tmp-{os.getpid()}"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, out)
+        except OSError:
+            pass
+
+    def _extend(self, st: os.stat_result):
+        """Index lines from the last (possibly partial) block to the current end of file."""
+        if self.offsets and self.block_lines[-1] < self.every:
+            start = self.offsets.pop()  # re-read the partial last block
+            for k in (self.block_min, self.block_max, self.block_lines):
+                k.pop()
+        else:
+            start = self.size_bytes
+        pos, n, lo, hi = start, 0, None, None
+        with open(self.fp, "rb") as f:
+            f.seek(start)
+            for line in f:
+                if n == 0:
+                    block_start = pos
+                pos += len(line)
+                if not line.endswith(b"\n"):
+                    pos -= len(line)  # partial last line: leave it for the next extension
+                    break
+                ts = self.parse(line)
+                if ts is not None:
+                    lo = ts if lo is None or ts < lo else lo
+                    hi = ts if hi is None or ts > hi else hi
+                n += 1
+                if n == self.every:
+                    self._append_block(block_start, n, lo, hi)
+                    n, lo, hi = 0, None, None
+        if n:
+            self._append_block(block_start, n, lo, hi)
+        self.size_bytes, self.mtime_ns = pos, st.st_mtime_ns
+        self._tail = _tail_digest(self.fp, pos)
+        self._derive()
+
+    def _append_block(self, offset: int, n: int, lo: Optional[int], hi: Optional[int]):
+        # Blocks without any timestamp inherit the previous block's max so bounds stay ordered.
+        prev = self.block_max[-1] if self.block_max else 0
+        self.offsets.append(offset)
+        self.block_min.append(lo if lo is not None else prev)
+        self.block_max.append(hi if hi is not None else prev)
+        self.block_lines.append(n)
+
+    def _derive(self):
+        self.run_max, m = [], None
+        for v in self.block_max:
+            m = v if m is None or v > m else m
+            self.run_max.append(m)
+        self.suffix_min, m = [0] * len(self.block_min), None
+        for i in range(len(self.block_min) - 1, -1, -1):
+            v = self.block_min[i]
+            m = v if m is None or v < m else m
+            self.suffix_min[i] = m
+
+    # ---------- queries ----------
+
+    def span(self) -> Optional[Tuple[int, int]]:
+        """(earliest, latest) timestamp in the indexed part of the log."""
+        if not self.offsets:
+            return None
+        return min(self.block_min), self.run_max[-1]
+
+    def seek(self, start_ms: int) -> int:
+        """Byte offset of the first block that can contain a timestamp >= start_ms."""
+        i = bisect.bisect_left(self.run_max, start_ms)
+        return self.offsets[i] if i < len(self.offsets) else self.size_bytes
+
+    def _stop(self, end_ms: int) -> int:
+        """Byte offset after the last block that can contain a timestamp <= end_ms."""
+        j = bisect.bisect_right(self.suffix_min, end_ms)
+        return self.offsets[j] if j < len(self.offsets) else self.size_bytes
+
+    def read_range(self, start_ms: int, end_ms: int) -> Iterator[Tuple[int, bytes]]:
+        """
+        Yield (timestamp_ms, line) for lines with start_ms <= ts <= end_ms, in file order.
+        Lines without a timestamp (continuations) go with the preceding stamped line.
+        """
+        lo, hi = self.seek(start_ms), self._stop(end_ms)
+        if lo >= hi:
+            return
+        with open(self.fp, "rb") as f:
+            f.seek(lo)
+            pos, cur = lo, None
+            for line in f:
+                if pos >= hi:
+                    break
+                pos += len(line)
+                ts = self.parse(line)
+                cur = ts if ts is not None else cur
+                if cur is not None and start_ms <= cur <= end_ms:
+                    yield cur, line
+
+def wall_clock_ms(y: int, mo: int, d: int, hh: int = 0, mm: int = 0, ss: int = 0) -> int:
+    """Index-scale timestamp for a wall-clock time (no UTC offset applied)."""
+    return calendar.timegm((y, mo, d, hh, mm, ss)) * 1000
+
+def nearest_sample(idx: TimeIndex, sensor: str, ts_ms: int, window_ms: int = 5_000) -> Optional[Tuple[int, List[float]]]:
+    """
+    For an epoch_ms sensor log: the `sensor` row closest to ts_ms within ±window_ms,
+    as (timestamp, values), reading only the blocks around it.
+    """
+    tag = sensor.encode("utf-8")
+    best = None
+    for ts, line in idx.read_range(ts_ms - window_ms, ts_ms + window_ms):
+        parts = line.rstrip(b"\r\n").split(b",")
+        if len(parts) < 3 or parts[1].strip() != tag:
+            continue
+        if best is None or abs(ts - ts_ms) < abs(best[0] - ts_ms):
+            try:
+                best = (ts, [float(v) for v in parts[2:]])
+            except ValueError:
+                continue
+    return best
@@ -1,38 +1,122 @@
-import math
+import json, math
+
+try:
+    import numpy as np
+except ImportError:  # scoring works without NumPy; floats are then compared one by one
+    np = None
+
+FLOAT_TOL = 1e-2
 
 def _norm(v):
     if isinstance(v, float):
         return round(v, 4)
     return v
 
-def score(expected, got):
-    """Return (score_float, details_dict). Compares dict/list scalars with tolerant floats."""
-    def flatten(x, prefix=''):
-        items = {}
-        if isinstance(x, dict):
-            for k, v in x.items():
-                items.update(flatten(v, prefix + '/' + str(k)))
-        elif isinstance(x, list):
-            for i, v in enumerate(x):
-                items.update(flatten(v, prefix + '/' + str(i)))
+def flatten(x, prefix=''):
+    """
+    Flatten nested dicts/lists into parallel (paths, values) lists, e.g. '/a/0/b' -> leaf.
+
+    Iterative (no recursion limit, no per-level dict merging); leaves come out in
+    depth-first order, so dict(zip(paths, values)) keeps the last of any duplicate path.
+    """
+    paths, values = [], []
+    stack = [(prefix, x)]
+    while stack:
+        pfx, v = stack.pop()
+        if isinstance(v, dict):
+            stack.extend((pfx + '/' + str(k), c) for k, c in reversed(list(v.items())))
+        elif isinstance(v, list):
+            stack.extend((pfx + '/' + str(i), c) for i, c in reversed(list(enumerate(v))))
         else:
-            items[prefix or '/'] = _norm(x)
-        return items
+            paths.append(pfx or '/')
+            values.append(_norm(v))
+    return paths, values
+
+def _canon(x) -> str:
+    """Order-insensitive canonical form used to pair up list elements."""
+    if isinstance(x, dict):
+        return "{" + ",".join(f"{json.dumps(str(k))}:{_canon(v)}" for k, v in sorted(x.items(), key=lambda kv: str(kv[0]))) + "}"
+    if isinstance(x, list):
+        return "[" + ",".join(sorted(_canon(v) for v in x)) + "]"
+    return json.dumps(_norm(x), sort_keys=True, default=str)
+
+class _Missing:
+    """Stands in for an expected list slot `got` has no element for; equal to nothing."""
+    def __eq__(self, other):
+        return False
+    __hash__ = object.__hash__
+    def __repr__(self):
+        return "<missing>"
+
+MISSING = _Missing()
+
+def align(expected, got):
+    """
+    Reorder lists in `got` to line up with `expected`, recursively.
 
-    exp = flatten(expected)
-    gotf = flatten(got)
+    Each expected element is paired with an unused got element that is equal up to
+    list order; unpaired got elements fill the remaining slots in their original
+    order, and any surplus goes at the end. When got is shorter, the slots left
+    over hold MISSING, so matched elements keep their expected positions.
+    """
+    if isinstance(expected, dict) and isinstance(got, dict):
+        return {k: align(expected[k], v) if k in expected else v for k, v in got.items()}
+    if not (isinstance(expected, list) and isinstance(got, list)):
+        return got
+    pool = {}
+    for j, g in enumerate(got):
+        pool.setdefault(_canon(g), []).append(j)
+    slots, used = [None] * len(expected), set()
+    for i, e in enumerate(expected):
+        js = pool.get(_canon(e))
+        if js:
+            slots[i] = js.pop(0)
+            used.add(slots[i])
+    rest = iter(j for j in range(len(got)) if j not in used)
+    for i in range(len(slots)):
+        if slots[i] is None:
+            slots[i] = next(rest, None)
+    out = [align(expected[i], got[j]) if j is not None else MISSING for i, j in enumerate(slots)]
+    return out + [got[j] for j in rest]
+
+def _floats_close(ev, gv):
+    """Elementwise |e - g| <= FLOAT_TOL for two equal-length float sequences."""
+    if np is not None:
+        e = np.fromiter(ev, dtype=np.float64, count=len(ev))
+        g = np.fromiter(gv, dtype=np.float64, count=len(gv))
+        with np.errstate(invalid="ignore", over="ignore"):
+            return (np.abs(e - g) <= FLOAT_TOL).tolist()
+    return [abs(e - g) <= FLOAT_TOL for e, g in zip(ev, gv)]
+
+def score(expected, got, unordered=False):
+    """
+    Return (score_float, details_dict). Compares dict/list scalars with tolerant floats.
+
+    Leaves are matched by path; when both sides are floats they match within
+    FLOAT_TOL (compared in bulk), otherwise with ==. With unordered=True, lists
+    are treated as multisets: `got` is first re-ordered to line up with `expected`.
+    """
+    if unordered:
+        got = align(expected, got)
+    exp = dict(zip(*flatten(expected)))
+    gotf = dict(zip(*flatten(got)))
     total = len(exp)
-    correct = 0
-    diffs = {}
-    for k, v in exp.items():
-        gv = gotf.get(k, None)
-        ok = False
-        if isinstance(v, float) and isinstance(gv, float):
-            ok = abs(v - gv) <= 1e-2
-        else:
-            ok = (v == gv)
-        if ok:
-            correct += 1
+
+    keys = list(exp)
+    ev = [exp[k] for k in keys]
+    gv = [gotf.get(k, None) for k in keys]
+    ok = [False] * total
+    float_idx = []
+    for i, (v, g) in enumerate(zip(ev, gv)):
+        if isinstance(v, float) and isinstance(g, float):
+            float_idx.append(i)
         else:
-            diffs[k] = dict(expected=v, got=gv)
+            ok[i] = (v == g)
+    if float_idx:
+        close = _floats_close([ev[i] for i in float_idx], [gv[i] for i in float_idx])
+        for i, c in zip(float_idx, close):
+            ok[i] = bool(c)
+
+    correct = sum(ok)
+    diffs = {k: dict(expected=v, got=None if g is MISSING else g) for k, v, g, hit in zip(keys, ev, gv, ok) if not hit}
     return (correct/total if total else 0.0, dict(total=total, correct=correct, diffs=diffs))
@@ -0,0 +1,163 @@
+"""
+Change detection over local_agent_eval_suite/suite_index.sqlite.
+
+The index's `files` table records pack, rel_path, size_bytes and sha256 for every
+pack file. We add an `mtime_ns` column so a check is one stat per file: a file
+whose size and mtime match its row is unchanged; otherwise it is rehashed and only
+counts as changed if the sha256 differs. New and deleted files always count.
+
+Used by `harness.py --incremental`, and as a command:
+  python suite_index.py status  --packs local_agent_eval_suite
+  python suite_index.py refresh --packs local_agent_eval_suite [--pack pack1 ...] [--workers 8]
+"""
+
+import os, sqlite3, argparse, mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from cache import sha256_file
+
+INDEX_NAME = "suite_index.sqlite"
+IGNORED_DIRS = {".cache", "__pycache__"}  # derived data written next to pack files
+
+def _walk_pack(pack_dir: str) -> Dict[str, os.stat_result]:
+    """rel_path -> stat for every file in a pack (scandir, so one stat per entry)."""
+    out, stack = {}, [pack_dir]
+    while stack:
+        dp = stack.pop()
+        with os.scandir(dp) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    if e.name not in IGNORED_DIRS:
+                        stack.append(e.path)
+                elif e.is_file():
+                    out[os.path.relpath(e.path, pack_dir).replace(os.sep, "/")] = e.stat()
+    return out
+
+class SuiteIndex:
+    def __init__(self, packs_root: str, path: Optional[str] = None):
+        self.root = packs_root
+        self.conn = sqlite3.connect(path or os.path.join(packs_root, INDEX_NAME))
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS files (
+              id INTEGER PRIMARY KEY,
+              pack TEXT NOT NULL,
+              rel_path TEXT NOT NULL,
+              size_bytes INTEGER NOT NULL,
+              sha256 TEXT NOT NULL,
+              content_type TEXT
+            )""")
+        cols = {r[1] for r in self.conn.execute("PRAGMA table_info(files)")}
+        if "mtime_ns" not in cols:
+            self.conn.execute("ALTER TABLE files ADD COLUMN mtime_ns INTEGER")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_files_pack ON files(pack)")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def packs(self) -> List[str]:
+        return sorted(d for d in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, d)) and d not in IGNORED_DIRS)
+
+    def _rows(self, pack: str) -> Dict[str, Tuple[int, int, str, Optional[int]]]:
+        rows = self.conn.execute(
+            "SELECT rel_path, id, size_bytes, sha256, mtime_ns FROM files WHERE pack=?", (pack,))
+        return {r[0]: r[1:] for r in rows}
+
+    def _diff(self, pack: str, rehash: bool, workers: Optional[int]):
+        """
+        Compare a pack on disk with its rows. Returns (changed rel_paths, new hashes),
+        where new hashes maps rel_path -> (stat, sha256) for every file that was rehashed.
+        Same-size files with a stale mtime are always hashed; new and resized files
+        only when `rehash` is set (they are changed either way).
+        """
+        pack_dir = os.path.join(self.root, pack)
+        disk = _walk_pack(pack_dir)
+        rows = self._rows(pack)
+        changed = sorted(set(rows) - set(disk))  # deleted
+        suspects = []
+        for rel, st in disk.items():
+            row = rows.get(rel)
+            if row is None:
+                changed.append(rel)  # new
+                if rehash:
+                    suspects.append(rel)
+            elif row[1] != st.st_size:
+                changed.append(rel)
+                if rehash:
+                    suspects.append(rel)
+            elif row[3] != st.st_mtime_ns:
+                suspects.append(rel)  # same size, touched: decide by content
+        with ThreadPoolExecutor(max_workers=workers) as pool:  # hashlib releases the GIL
+            digests = dict(zip(suspects, pool.map(
+                lambda rel: sha256_file(os.path.join(pack_dir, rel)), suspects)))
+        for rel, digest in digests.items():
+            row = rows.get(rel)
+            if row is not None and row[1] == disk[rel].st_size and row[2] != digest:
+                changed.append(rel)
+        return sorted(set(changed)), {rel: (disk[rel], d) for rel, d in digests.items()}
+
+    def changed_packs(self, packs: Optional[Iterable[str]] = None, workers: Optional[int] = None) -> Dict[str, List[str]]:
+        """pack -> changed rel_paths, for packs that differ from the index."""
+        out = {}
+        for pack in (self.packs() if packs is None else packs):
+            changed, hashed = self._diff(pack, rehash=False, workers=workers)
+            self._remember_mtimes(pack, changed, hashed)
+            if changed:
+                out[pack] = changed
+        return out
+
+    def _remember_mtimes(self, pack: str, changed: List[str], hashed):
+        # Touched-but-identical files get their new mtime so the next check is stat-only.
+        same = [(st.st_mtime_ns, pack, rel) for rel, (st, _) in hashed.items() if rel not in changed]
+        self.conn.executemany("UPDATE files SET mtime_ns=? WHERE pack=? AND rel_path=?", same)
+        self.conn.commit()
+
+    def refresh(self, packs: Optional[Iterable[str]] = None, workers: Optional[int] = None) -> Dict[str, List[str]]:
+        """Bring the index in line with disk (hashing in parallel); returns what changed."""
+        out = {}
+        for pack in (self.packs() if packs is None else packs):
+            changed, hashed = self._diff(pack, rehash=True, workers=workers)
+            self._remember_mtimes(pack, changed, hashed)
+            if not changed:
+                continue
+            rows = self._rows(pack)
+            for rel in changed:
+                if rel not in hashed:
+                    self.conn.execute("DELETE FROM files WHERE id=?", (rows[rel][0],))
+                    continue
+                st, digest = hashed[rel]
+                if rel in rows:
+                    self.conn.execute("UPDATE files SET size_bytes=?, sha256=?, mtime_ns=? WHERE id=?",
+                                      (st.st_size, digest, st.st_mtime_ns, rows[rel][0]))
+                else:
+                    self.conn.execute(
+                        "INSERT INTO files (pack, rel_path, size_bytes, sha256, content_type, mtime_ns) VALUES (?,?,?,?,?,?)",
+                        (pack, rel, st.st_size, digest, mimetypes.guess_type(rel)[0], st.st_mtime_ns))
+            self.conn.commit()
+            out[pack] = changed
+        return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Check or refresh the suite file index.")
+    ap.add_argument("command", choices=["status", "refresh"])
+    ap.add_argument("--packs", required=True, help="Directory containing the unzipped packs")
+    ap.add_argument("--index", default=None, help=f"Index path (default: <packs>/{INDEX_NAME})")
+    ap.add_argument("--pack", action="append", default=None, help="Limit to this pack (repeatable)")
+    ap.add_argument("--workers", type=int, default=None, help="Hashing threads (default: executor default)")
+    args = ap.parse_args()
+
+    idx = SuiteIndex(args.packs, args.index)
+    if args.command == "status":
+        changed = idx.changed_packs(args.pack, args.workers)
+    else:
+        changed = idx.refresh(args.pack, args.workers)
+    idx.close()
+    if not changed:
+        print("[index] up to date")
+    for pack, rels in changed.items():
+        print(f"[index] {pack}: {len(rels)} changed file(s)")
+        for rel in rels:
+            print(f"  {rel}")
+
+if __name__ == "__main__":
+    main()
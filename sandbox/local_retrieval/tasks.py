@@ -6,6 +6,7 @@ import os, json, glob
 # - answer_key_path: list for drilling into the JSON (e.g., ['finance', 'invoice_to_bank_match'])
 # - prompt: the instruction sent to providers; providers should return JSON
 # - extractor: function(model_json) -> comparable object (defaults to identity)
+# - unordered: optional; if True, lists are scored as multisets (order-insensitive)
 
 def _id(x): return x
 
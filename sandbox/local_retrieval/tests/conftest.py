@@ -0,0 +1,4 @@
+import os, sys
+
+# The harness modules (cache, scoring, providers) are imported as top-level names.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,97 @@
+import os, sys, importlib, threading
+
+import pytest
+
+from cache import ResultCache, code_fingerprint, track_files
+
+@pytest.fixture
+def pkg(tmp_path, monkeypatch):
+    """A throwaway provider package: agent -> pipeline -> index, plus an unrelated sibling."""
+    root = tmp_path / "fp_pkg"
+    root.mkdir()
+    (root / "__init__.py").write_text("")
+    (root / "index.py").write_text("def window(x):\n    return x\n")
+    (root / "pipeline.py").write_text("from . import index\n\ndef run(x):\n    return index.window(x)\n")
+    (root / "other.py").write_text("def unused():\n    return 0\n")
+    (root / "agent.py").write_text(
+        "from . import pipeline, other\n\n"
+        "def handler(x):\n    return pipeline.run(x)\n\n"
+        "def unrelated(x):\n    return other.unused()\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield root
+    for name in [m for m in sys.modules if m == "fp_pkg" or m.startswith("fp_pkg.")]:
+        del sys.modules[name]
+
+def _fingerprint(pkg):
+    agent = importlib.import_module("fp_pkg.agent")
+    return code_fingerprint(agent, [agent.handler])
+
+def test_fingerprint_follows_transitive_sibling_imports(pkg):
+    before = _fingerprint(pkg)
+    (pkg / "index.py").write_text("def window(x):\n    return x + 1  # changed\n")
+    assert _fingerprint(pkg) != before
+
+def test_fingerprint_ignores_unreferenced_siblings(pkg):
+    before = _fingerprint(pkg)
+    (pkg / "other.py").write_text("def unused():\n    return 1  # changed\n")
+    assert _fingerprint(pkg) == before
+
+@pytest.fixture
+def store(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+def _put_reading(store, pack, key, names, in_thread=False):
+    def read():
+        for name in names:
+            with open(pack / name) as f:
+                f.read()
+    with track_files() as touched:
+        if in_thread:
+            t = threading.Thread(target=read)
+            t.start()
+            t.join()
+        else:
+            read()
+    store.put(key, {"answer": 1}, touched, str(pack))
+
+def test_edit_invalidates_only_dependent_results(store, tmp_path):
+    pack = tmp_path / "pack"
+    pack.mkdir()
+    (pack / "a.csv").write_text("x\n1\n")
+    (pack / "b.csv").write_text("y\n2\n")
+    _put_reading(store, pack, "ka", ["a.csv"])
+    _put_reading(store, pack, "kb", ["b.csv"])
+    assert store.get("ka", str(pack)) == {"raw": {"answer": 1}}
+
+    (pack / "a.csv").write_text("x\n10\n")
+    assert store.get("ka", str(pack)) is None
+    assert store.get("kb", str(pack)) == {"raw": {"answer": 1}}
+
+def test_files_opened_in_worker_threads_are_dependencies(store, tmp_path):
+    pack = tmp_path / "pack"
+    pack.mkdir()
+    (pack / "part.csv").write_text("x\n1\n")
+    _put_reading(store, pack, "k", ["part.csv"], in_thread=True)
+    assert store.get("k", str(pack)) is not None
+
+    (pack / "part.csv").write_text("x\n2\n")
+    assert store.get("k", str(pack)) is None
+
+def test_deleted_dependency_is_a_miss(store, tmp_path):
+    pack = tmp_path / "pack"
+    pack.mkdir()
+    (pack / "a.csv").write_text("x\n1\n")
+    _put_reading(store, pack, "k", ["a.csv"])
+    os.remove(pack / "a.csv")
+    assert store.get("k", str(pack)) is None
+
+def test_sidecars_are_not_dependencies(store, tmp_path):
+    pack = tmp_path / "pack"
+    (pack / ".cache").mkdir(parents=True)
+    (pack / "a.csv").write_text("x\n1\n")
+    (pack / ".cache" / "a.idx").write_text("derived")
+    _put_reading(store, pack, "k", ["a.csv", ".cache/a.idx"])
+    (pack / ".cache" / "a.idx").write_text("rebuilt")
+    assert store.get("k", str(pack)) is not None
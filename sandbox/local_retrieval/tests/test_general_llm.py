@@ -0,0 +1,89 @@
+import json, threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+from providers import general_llm
+
+class _Stub(BaseHTTPRequestHandler):
+    """generateContent stand-in. Prompts steer it: 'flaky' fails once with 503, 'down' always, 'bad' gets 400."""
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["contents"][0]["parts"][0]["text"].rsplit("\n\n", 1)[-1]
+        server = self.server
+        with server.lock:
+            server.calls[prompt] += 1
+            server.ports.add(self.client_address[1])
+            attempt = server.calls[prompt]
+        if "bad" in prompt:
+            return self._send(400, {"error": "bad request"})
+        if "down" in prompt or ("flaky" in prompt and attempt == 1):
+            return self._send(503, {"error": "unavailable"}, {"Retry-After": "0"})
+        text = f'Sure:\n```json\n{json.dumps({"echo": prompt})}\n```'
+        self._send(200, {"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for k, v in {"Content-Type": "application/json", "Content-Length": str(len(data)), **(headers or {})}.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    server.daemon_threads = True
+    server.lock, server.calls, server.ports = threading.Lock(), Counter(), set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def no_sdk(prompt, api_key):
+        raise ImportError("SDK disabled for the stub")
+    monkeypatch.setattr(general_llm, "_call_gemini_with_sdk", no_sdk)
+    monkeypatch.setattr(general_llm, "API_BASE", f"http://127.0.0.1:{server.server_port}/v1beta")
+    monkeypatch.setattr(general_llm, "BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(general_llm, "MAX_RETRIES", 2)
+    monkeypatch.setattr(general_llm, "_session", None)
+    monkeypatch.setenv(general_llm.API_KEY_ENV, "test-key")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_run_retries_retryable_status(stub):
+    assert general_llm.run("flaky one") == {"echo": "flaky one"}
+    assert stub.calls["flaky one"] == 2
+
+def test_run_gives_up_after_max_retries(stub):
+    out = general_llm.run("down")
+    assert "503" in out["_error"]
+    assert stub.calls["down"] == general_llm.MAX_RETRIES + 1
+
+def test_client_errors_are_not_retried(stub):
+    out = general_llm.run("bad")
+    assert "400" in out["_error"]
+    assert stub.calls["bad"] == 1
+
+def test_run_many_matches_serial_run_and_reuses_connections(stub):
+    prompts = [f"prompt {i}" for i in range(12)] + ["flaky two", "bad"]
+    serial = [general_llm.run(p) for p in prompts]
+    stub.ports.clear()
+    parallel = general_llm.run_many(prompts, concurrency=4)
+    assert parallel == serial
+    assert parallel[0] == {"echo": "prompt 0"}
+    # one keep-alive pool: at most `concurrency` connections for 14+ requests
+    assert len(stub.ports) <= 4
+
+def test_pool_grows_with_concurrency(stub, caplog):
+    prompts = [f"wide {i}" for i in range(40)]
+    with caplog.at_level("WARNING", logger="urllib3.connectionpool"):
+        out = general_llm.run_many(prompts, concurrency=general_llm.MAX_CONCURRENCY + 8)
+    assert out[5] == {"echo": "wide 5"}
+    assert general_llm._get_session().pool_size == general_llm.MAX_CONCURRENCY + 8
+    assert not [r for r in caplog.records if "pool is full" in r.getMessage()]
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from providers import lake
+
+PACK5 = os.path.join(os.path.dirname(__file__), "..", "local_agent_eval_suite", "pack5", "delta_lake")
+
+def test_partition_only_read_keeps_row_count():
+    full = lake.LakeTable(PACK5).read()
+    dates = lake.LakeTable(PACK5).read(["date"])
+    n = len(next(iter(full.values())))
+    assert n > 0
+    assert list(dates["date"]) == list(full["date"])
+
+@pytest.fixture
+def mixed(tmp_path):
+    """Zip codes that look numeric in one part only; a numeric partition key."""
+    for year, body in (("2024", "sku,zip\nA,007\nB,010\n"), ("2025", "sku,zip\nC,A12\nD,\n")):
+        part = tmp_path / f"year={year}"
+        part.mkdir()
+        (part / "part-0.csv").write_text(body)
+    return str(tmp_path)
+
+def test_column_type_is_unified_across_parts(mixed):
+    cols = lake.LakeTable(mixed).read(["zip", "year"])
+    assert list(cols["zip"]) == ["007", "010", "A12", ""]
+    assert list(cols["year"]) == [2024, 2024, 2025, 2025]
+
+def test_missing_values_across_parts_become_nan(tmp_path):
+    for name, body in (("a.csv", "x,y\n1,a\n2,b\n"), ("b.csv", "x,y\n,c\n3,d\n")):
+        (tmp_path / name).write_text(body)
+    x = lake.LakeTable(str(tmp_path)).read(["x"])["x"]
+    assert x[:2].tolist() == [1.0, 2.0] and x[3] == 3.0 and x[2] != x[2]
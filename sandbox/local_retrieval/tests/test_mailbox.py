@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from providers import mailbox
+
+MBOX = """From a@example.com Sat Jul  5 08:15:00 2025
+From: a@example.com
+Subject: Invoice PO-2025-0042
+Message-ID: <m1@example.com>
+
+See INV-3055 and the scan INV-3001_scan.pdf.
+
+From b@example.com Sat Jul  5 09:15:00 2025
+From: b@example.com
+Subject: Re: Invoice PO-2025-0042
+Message-ID: <m2@example.com>
+In-Reply-To: <m1@example.com>
+
+Thanks.
+"""
+
+def test_mentions_keep_identifiers_whole():
+    assert mailbox.mentions_in("PO-2025-0042, INV-3055, INV-3001_scan.pdf, XINV-1, inv-9") == \
+        ["PO-2025-0042", "INV-3055", "INV-3001", "XINV-1"]
+
+def test_charset_names_are_not_mentions():
+    text = ('Content-Type: text/plain; charset=UTF-8\n<meta charset="ISO-8859-1">\n'
+            "=?ISO-8859-1?Q?Rechnung?= for PO-2025-0042")
+    assert mailbox.mentions_in(text) == ["PO-2025-0042"]
+
+@pytest.fixture
+def mbox(tmp_path):
+    fp = tmp_path / "box.mbox"
+    fp.write_text(MBOX)
+    return str(fp)
+
+def test_thread_lookup_by_whole_identifier(mbox):
+    idx = mailbox.MailIndex.open(mbox)
+    try:
+        assert [m["message_id"] for m in idx.thread_mentioning("inv-3055")] == ["<m1@example.com>", "<m2@example.com>"]
+        assert idx.find("PO-2025") == []
+    finally:
+        idx.close()
+
+def test_unwritable_directories_fall_back_to_memory(mbox, monkeypatch):
+    def deny(path, *args, **kwargs):
+        raise PermissionError(13, "read-only file system", path)
+    monkeypatch.setattr(mailbox.os, "makedirs", deny)
+    assert mailbox.sidecar_path(mbox) is None
+    idx = mailbox.MailIndex.open(mbox)
+    try:
+        assert len(idx.messages()) == 2
+    finally:
+        idx.close()
+    assert not os.path.exists(os.path.join(os.path.dirname(mbox), ".cache"))
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from scoring import align, score, MISSING
+
+def test_ordered_lists_compare_by_position():
+    assert score(["A", "B"], ["B", "A"])[0] == 0.0
+
+@pytest.mark.parametrize("got, expected_score", [
+    (["C", "A"], 2 / 3),
+    (["C"], 1 / 3),
+    (["B", "C", "A"], 1.0),
+    (["C", "A", "B", "D"], 1.0),   # surplus elements are ignored
+    ([], 0.0),
+])
+def test_unordered_shorter_got_keeps_slot_positions(got, expected_score):
+    assert score(["A", "B", "C"], got, unordered=True)[0] == pytest.approx(expected_score)
+
+def test_missing_slot_never_matches_expected_none():
+    assert score([None, "B"], ["B"], unordered=True)[0] == 0.5
+
+def test_align_fills_unmatched_slots_in_order():
+    out = align(["A", "B", "C"], ["X", "C"])
+    assert out[0] == "X" and out[1] is MISSING and out[2] == "C"
+
+def test_nested_unordered_lists_of_dicts():
+    expected = {"rows": [{"sku": "A", "qty": 1}, {"sku": "B", "qty": 2}, {"sku": "C", "qty": 3}]}
+    got = {"rows": [{"sku": "C", "qty": 3}, {"sku": "A", "qty": 1}]}
+    s, details = score(expected, got, unordered=True)
+    assert s == pytest.approx(4 / 6)
+    assert set(details["diffs"]) == {"/rows/1/sku", "/rows/1/qty"}
+
+def test_diffs_stay_json_serializable():
+    _, details = score(["A", "B"], ["B"], unordered=True)
+    assert json.loads(json.dumps(details))["diffs"]["/0"] == {"expected": "A", "got": None}
+
+def test_floats_within_tolerance():
+    assert score({"x": 1.0, "y": [2.5]}, {"x": 1.004, "y": [2.6]})[0] == 0.5
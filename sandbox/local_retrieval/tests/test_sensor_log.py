@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pytest
+
+from providers import sensor_log
+
+LOG = """1000,ACC,1.0,2.0,3.0
+1010,GYRO,0.1,0.2,0.3
+1020,ACC,4.0,5.0,6.0
+1030,GYRO,0.4,0.5,0.6
+"""
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    monkeypatch.setattr(sensor_log.tempfile, "gettempdir", lambda: str(tmp_path / "tmp"))
+    fp = tmp_path / "data" / "sensor_log.txt"
+    fp.parent.mkdir()
+    fp.write_text(LOG)
+    return str(fp)
+
+def _deny(allowed=None):
+    real = os.makedirs
+    def makedirs(path, *args, **kwargs):
+        if allowed is None or not str(path).startswith(allowed):
+            raise PermissionError(13, "read-only file system", path)
+        return real(path, *args, **kwargs)
+    return makedirs
+
+def _same(a, b):
+    assert sorted(a) == sorted(b)
+    for name in a:
+        np.testing.assert_array_equal(a[name].ts, b[name].ts)
+        np.testing.assert_array_equal(a[name].values, b[name].values)
+
+def test_read_only_data_dir_uses_temp_sidecar(log, tmp_path, monkeypatch):
+    monkeypatch.setattr(sensor_log.os, "makedirs", _deny(str(tmp_path / "tmp")))
+    cols = sensor_log.load_columns(log)
+    assert os.path.isdir(sensor_log.sidecar_dirs(log)[1])
+    assert not os.path.exists(os.path.dirname(sensor_log.sidecar_dir(log)))
+    monkeypatch.undo()
+    _same(cols, sensor_log.load_columns(log))
+
+def test_nothing_writable_parses_in_memory(log, monkeypatch):
+    monkeypatch.setattr(sensor_log.os, "makedirs", _deny())
+    cols = sensor_log.load_columns(log)
+    assert cols["ACC"].values.tolist() == [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+    assert cols["GYRO"].ts.tolist() == [1010, 1030]